@@ -1,21 +1,70 @@
 import os
+import ftplib
 import tempfile
 import shutil
+import threading
 from pathlib import Path
-import pandas as pd
 import logging
 from typing import Optional, Dict, Any
 import boto3
+from botocore.exceptions import ClientError
 import paramiko
 import re
 import smbclient
 
+from download_cache import cache_downloads, ConexoesReutilizaveis
+from metrics import downloads_importacao
+from spreadsheet_reader import validar_cabecalho
+
 logger = logging.getLogger(__name__)
 
+# Sem resposta do servidor FTP/SFTP por este tempo, a operação falha em vez de travar a importação
+TIMEOUT_CONEXAO = 60
+
+# Clientes boto3 por credencial, reaproveitados entre as importações (são thread-safe)
+_clientes_s3: Dict[tuple, Any] = {}
+_trava_s3 = threading.Lock()
+
+def _cliente_s3(usuario: Optional[str], senha: Optional[str]):
+    with _trava_s3:
+        cliente = _clientes_s3.get((usuario, senha))
+        if cliente is None:
+            cliente = _clientes_s3[usuario, senha] = boto3.client(
+                's3',
+                aws_access_key_id=usuario,
+                aws_secret_access_key=senha
+            )
+        return cliente
+
+def _ftp_viva(ftp: ftplib.FTP) -> bool:
+    ftp.voidcmd("NOOP")
+    return True
+
+def _fechar_ftp(ftp: ftplib.FTP):
+    try:
+        ftp.quit()
+    finally:
+        ftp.close()
+
+def _sftp_viva(sftp: paramiko.SFTPClient) -> bool:
+    return sftp.get_channel().get_transport().is_active() and sftp.normalize(".") is not None
+
+def _fechar_sftp(sftp: paramiko.SFTPClient):
+    transporte = sftp.get_channel().get_transport()
+    try:
+        sftp.close()
+    finally:
+        transporte.close()
+
+conexoes_ftp = ConexoesReutilizaveis(_ftp_viva, _fechar_ftp)
+conexoes_sftp = ConexoesReutilizaveis(_sftp_viva, _fechar_sftp)
+
 class AdvancedImporter:
     def __init__(self, config: Dict[str, Any]):
         self.config = config
         self.temp_file = None
+        # verdadeiro quando a origem remota não mudou e a cópia do cache foi usada
+        self.inalterado = False
     
     def _parse_unc_path(self, unc_path: str) -> Dict[str, str]:
         """Parse UNC path like \\server\share\path\to\file"""
@@ -68,11 +117,31 @@ class AdvancedImporter:
             return None
     
     def cleanup(self):
+        """Remove a cópia temporária (origens local e de rede); as cópias do cache de downloads ficam"""
         if self.temp_file and isinstance(self.temp_file, Path) and self.temp_file.exists():
             try:
                 self.temp_file.unlink()
             except Exception as e:
                 logger.error(f"Erro ao remover arquivo temporário: {e}")
+        self.temp_file = None
+
+    def _temporario(self) -> Path:
+        arquivo = tempfile.NamedTemporaryFile(suffix=".xlsx", delete=False)
+        arquivo.close()
+        self.temp_file = Path(arquivo.name)
+        return self.temp_file
+
+    def _usar_copia(self, url: str, versao: Dict[str, Any]) -> Path:
+        self.inalterado = True
+        downloads_importacao.inc(source=self.config["importType"], result="inalterado")
+        logger.info(f"Planilha sem alterações na origem ({', '.join(f'{c}={v}' for c, v in versao.items())}) "
+                    f"- usando a cópia em cache de {url}")
+        return cache_downloads.caminho(url)
+
+    def _baixar_para_cache(self, url: str, baixar) -> Path:
+        caminho = cache_downloads.gravar(url, baixar)
+        downloads_importacao.inc(source=self.config["importType"], result="baixado")
+        return caminho
     
     def _test_local_file(self) -> Dict[str, Any]:
         file_path = Path(self.config["filePath"])
@@ -81,7 +150,10 @@ class AdvancedImporter:
         if not file_path.is_file():
             return {"success": False, "error": "Caminho não é um arquivo"}
         try:
-            pd.read_excel(file_path, sheet_name="PRODUTIVIDADE", header=2)
+            # Valida só a linha de cabeçalho, sem ler os dados da aba
+            faltando = validar_cabecalho(file_path)
+            if faltando:
+                return {"success": False, "error": f"Colunas obrigatórias ausentes: {', '.join(faltando)}"}
             return {"success": True, "detail": f"Arquivo encontrado: {file_path.name} ({file_path.stat().st_size} bytes)"}
         except Exception as e:
             return {"success": False, "error": f"Arquivo não é um Excel válido: {str(e)}"}
@@ -110,11 +182,7 @@ class AdvancedImporter:
                 return {"success": False, "error": "URL S3 inválida"}
             bucket_name = s3_url.split("/")[2]
             key = "/".join(s3_url.split("/")[3:])
-            s3_client = boto3.client(
-                's3',
-                aws_access_key_id=self.config.get("username"),
-                aws_secret_access_key=self.config.get("password")
-            )
+            s3_client = _cliente_s3(self.config.get("username"), self.config.get("password"))
             s3_client.head_object(Bucket=bucket_name, Key=key)
             return {"success": True, "detail": f"Arquivo S3 acessível: s3://{bucket_name}/{key}"}
         except Exception as e:
@@ -143,7 +211,6 @@ class AdvancedImporter:
                     transport.close()
                     return {"success": False, "error": "Arquivo SFTP não encontrado"}
             else:
-                import ftplib
                 ftp = ftplib.FTP(host)
                 ftp.login(self.config.get("username"), self.config.get("password"))
                 try:
@@ -159,10 +226,7 @@ class AdvancedImporter:
     def _download_local_file(self) -> Optional[Path]:
         try:
             source_path = Path(self.config["filePath"])
-            self.temp_file = tempfile.NamedTemporaryFile(suffix=".xlsx", delete=False)
-            self.temp_file.close()
-            shutil.copy2(source_path, self.temp_file.name)
-            return Path(self.temp_file.name)
+            return Path(shutil.copy2(source_path, self._temporario()))
         except Exception as e:
             logger.error(f"Erro ao copiar arquivo local: {e}")
             return None
@@ -177,59 +241,118 @@ class AdvancedImporter:
                 return None
             
             # Copiar o arquivo local para um arquivo temporário
-            self.temp_file = tempfile.NamedTemporaryFile(suffix=".xlsx", delete=False)
-            self.temp_file.close()
-            shutil.copy2(local_file, self.temp_file.name)
+            temp_file = self._temporario()
+            shutil.copy2(local_file, temp_file)
             
             logger.info(f"Simulando download de rede usando arquivo local: {local_file}")
-            return Path(self.temp_file.name)
+            return temp_file
 
         except Exception as e:
             logger.error(f"Erro ao simular download de rede: {e}")
             return None
     
     def _download_s3_file(self) -> Optional[Path]:
+        """Baixa o objeto só se o ETag mudou desde a cópia em cache (GET condicional, If-None-Match)"""
         try:
             s3_url = self.config["filePath"]
             bucket_name = s3_url.split("/")[2]
             key = "/".join(s3_url.split("/")[3:])
-            s3_client = boto3.client(
-                's3',
-                aws_access_key_id=self.config.get("username"),
-                aws_secret_access_key=self.config.get("password")
-            )
-            self.temp_file = tempfile.NamedTemporaryFile(suffix=".xlsx", delete=False)
-            self.temp_file.close()
-            s3_client.download_file(bucket_name, key, self.temp_file.name)
-            return Path(self.temp_file.name)
+            s3_client = _cliente_s3(self.config.get("username"), self.config.get("password"))
+            with cache_downloads.trava(s3_url):
+                anterior = cache_downloads.consultar(s3_url)
+                parametros = {"Bucket": bucket_name, "Key": key}
+                if anterior and anterior.get("etag"):
+                    parametros["IfNoneMatch"] = anterior["etag"]
+                try:
+                    resposta = s3_client.get_object(**parametros)
+                except ClientError as e:
+                    # 304 Not Modified: a cópia em cache é a versão atual
+                    if e.response.get("ResponseMetadata", {}).get("HTTPStatusCode") == 304:
+                        return self._usar_copia(s3_url, {"etag": anterior["etag"]})
+                    raise
+
+                def baixar(destino: Path) -> Dict[str, Any]:
+                    corpo = resposta["Body"]
+                    try:
+                        with open(destino, "wb") as f:
+                            shutil.copyfileobj(corpo, f, 1024 * 1024)
+                    finally:
+                        corpo.close()
+                    return {"etag": resposta.get("ETag"), "last_modified": resposta.get("LastModified"),
+                            "tamanho": resposta.get("ContentLength")}
+
+                return self._baixar_para_cache(s3_url, baixar)
         except Exception as e:
             logger.error(f"Erro ao baixar arquivo S3: {e}")
             return None
-    
+
+    def _abrir_ftp(self, host: str) -> ftplib.FTP:
+        ftp = ftplib.FTP(host, timeout=TIMEOUT_CONEXAO)
+        ftp.login(self.config.get("username"), self.config.get("password"))
+        return ftp
+
+    def _abrir_sftp(self, host: str) -> paramiko.SFTPClient:
+        transport = paramiko.Transport((host, 22))
+        transport.connect(username=self.config.get("username"), password=self.config.get("password"))
+        sftp = paramiko.SFTPClient.from_transport(transport)
+        sftp.get_channel().settimeout(TIMEOUT_CONEXAO)
+        return sftp
+
+    @staticmethod
+    def _versao_ftp(ftp: ftplib.FTP, file_path: str) -> Dict[str, Any]:
+        """Tamanho (SIZE) e data de modificação (MDTM); None no que o servidor não suportar"""
+        ftp.voidcmd("TYPE I")
+        versao = {}
+        try:
+            versao["tamanho"] = ftp.size(file_path)
+        except ftplib.error_perm:
+            versao["tamanho"] = None
+        try:
+            versao["mdtm"] = ftp.sendcmd(f"MDTM {file_path}").split()[-1]
+        except ftplib.error_perm:
+            versao["mdtm"] = None
+        return versao
+
     def _download_ftp_file(self) -> Optional[Path]:
+        """Baixa o arquivo só se tamanho e data de modificação mudaram desde a cópia em cache.
+
+        FTP usa SIZE/MDTM e SFTP o stat; sem a data de modificação (servidor
+        FTP sem MDTM) o arquivo é sempre baixado. As conexões ficam abertas
+        para as próximas importações (conexoes_ftp e conexoes_sftp).
+        """
         try:
             ftp_url = self.config["filePath"]
             protocol = "sftp" if ftp_url.startswith("sftp://") else "ftp"
             url_parts = ftp_url.replace("ftp://", "").replace("sftp://", "").split("/")
             host = url_parts[0]
             file_path = "/".join(url_parts[1:])
-            self.temp_file = tempfile.NamedTemporaryFile(suffix=".xlsx", delete=False)
-            self.temp_file.close()
-            if protocol == "sftp":
-                transport = paramiko.Transport((host, 22))
-                transport.connect(username=self.config.get("username"), password=self.config.get("password"))
-                sftp = paramiko.SFTPClient.from_transport(transport)
-                sftp.get(file_path, self.temp_file.name)
-                sftp.close()
-                transport.close()
-            else:
-                import ftplib
-                ftp = ftplib.FTP(host)
-                ftp.login(self.config.get("username"), self.config.get("password"))
-                with open(self.temp_file.name, 'wb') as f:
-                    ftp.retrbinary(f'RETR {file_path}', f.write)
-                ftp.quit()
-            return Path(self.temp_file.name)
+            chave = (host, self.config.get("username"), self.config.get("password"))
+            with cache_downloads.trava(ftp_url):
+                anterior = cache_downloads.consultar(ftp_url) or {}
+                if protocol == "sftp":
+                    with conexoes_sftp.conexao(chave, lambda: self._abrir_sftp(host)) as sftp:
+                        atributos = sftp.stat(file_path)
+                        versao = {"tamanho": atributos.st_size, "mtime": atributos.st_mtime}
+                        if versao["mtime"] is not None and all(anterior.get(c) == v for c, v in versao.items()):
+                            return self._usar_copia(ftp_url, versao)
+
+                        def baixar(destino: Path) -> Dict[str, Any]:
+                            sftp.get(file_path, str(destino))
+                            return versao
+
+                        return self._baixar_para_cache(ftp_url, baixar)
+                else:
+                    with conexoes_ftp.conexao(chave, lambda: self._abrir_ftp(host)) as ftp:
+                        versao = self._versao_ftp(ftp, file_path)
+                        if versao["mdtm"] is not None and all(anterior.get(c) == v for c, v in versao.items()):
+                            return self._usar_copia(ftp_url, versao)
+
+                        def baixar(destino: Path) -> Dict[str, Any]:
+                            with open(destino, 'wb') as f:
+                                ftp.retrbinary(f'RETR {file_path}', f.write)
+                            return versao
+
+                        return self._baixar_para_cache(ftp_url, baixar)
         except Exception as e:
             logger.error(f"Erro ao baixar arquivo FTP: {e}")
-            return None 
\ No newline at end of file
+            return None
@@ -1,25 +1,50 @@
 import os
+import io
+import time
+import hashlib
 import datetime as dt
 import pandas as pd
-import sqlite3
 import uvicorn
+from contextlib import contextmanager
 import logging
 import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from email.mime.base import MIMEBase
 from email import encoders
-from fastapi import FastAPI, BackgroundTasks, HTTPException
+from fastapi import FastAPI, BackgroundTasks, HTTPException, Header, Query
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse, JSONResponse, Response
+from openpyxl import Workbook
 from apscheduler.schedulers.background import BackgroundScheduler
 from dotenv import load_dotenv
 from pathlib import Path
 from config_manager import ConfigManager
 from advanced_importer import AdvancedImporter
+from multi_import import baixar_e_ler, preparar_fontes, identificar_origem
+from migrations import aplicar_migracoes
+from import_jobs import GerenciadorImportacoes, ImportJob, ImportacaoCancelada, STATUS_CONCLUIDO
+from database import armazenamento, transacao, consultar, consultar_um, ler_dataframe, pool_leitura
+from data_version import MiddlewareVersaoDados, versao_dados
+from metrics import (MiddlewareMetricas, metricas, duracao_fases_importacao, importacoes,
+                     linhas_importadas, emails_enviados)
+from response_cache import criar_cache
+from log_config import configurar_logging, enfileirar_uvicorn, registrar_amostra
+from fleet_events import CanalEventos, MonitorFrota, EVENTO_IMPORTACAO_FINALIZADA
+from spreadsheet_reader import (LeitorPlanilha, ABA_PRODUTIVIDADE, CABECALHO_PRODUTIVIDADE,
+                                COLUNAS_PRODUTIVIDADE, COLUNAS_OBRIGATORIAS_PRODUTIVIDADE,
+                                ABA_OS, CABECALHO_OS, COLUNAS_OS, hash_arquivo)
+from usage_rollups import atualizar_resumos, converter_registros, inicio_periodo, normalizar_granularidade
+from usage_forecast import previsor_uso, JANELA_DIAS
+from pagination import codificar_cursor, ordenacao_keyset, validar_limite, LIMITE_MAXIMO
+from status_engine import (classify_fleet, para_registros, STATUS_VERMELHO, STATUS_AMARELO,
+                           DIAS_SEM_ATUALIZACAO)
 
-# Configurar logging
-logging.basicConfig(level=logging.INFO)
+# Configurar logging (escrita em segundo plano; ver log_config)
+configurar_logging()
 logger = logging.getLogger(__name__)
+# resumo por fase das importações e, em DEBUG, amostra das linhas importadas
+logger_importacao = logging.getLogger("importacao")
 
 # Carregar variáveis de ambiente
 load_dotenv(".env")
@@ -45,10 +70,27 @@ else:
 
 HORA_IMPORT = os.getenv("HORA_IMPORT", "10:05")
 TZ = os.getenv("TZ", "America/Sao_Paulo")
-DB_PATH = Path("/db/arruda.db")
+# Com início rápido (padrão) a API atende imediatamente com os dados já gravados
+# e a importação inicial roda em segundo plano; com 0 a inicialização aguarda
+INICIO_RAPIDO = os.getenv("INICIO_RAPIDO", "1").strip().lower() not in ("0", "false", "nao", "não")
 
 app = FastAPI(title="Arruda Fleet Care – Fase 1")
 
+# ETag/304 das leituras; registrado antes do CORS para que as respostas 304
+# também recebam os cabeçalhos de CORS
+app.add_middleware(MiddlewareVersaoDados)
+
+# Cache das leituras mais caras; invalidado a cada transação que altera dados
+cache_respostas = criar_cache()
+versao_dados.ao_invalidar(cache_respostas.invalidar)
+if cache_respostas.compartilhado:
+    versao_dados.usar_versao_compartilhada(cache_respostas.versao)
+
+# Eventos enviados aos painéis abertos (/events) quando os dados mudam
+canal_eventos = CanalEventos()
+monitor_frota = MonitorFrota(canal_eventos)
+versao_dados.ao_incrementar(monitor_frota.notificar)
+
 # Adicionar CORS
 app.add_middleware(
     CORSMiddleware,
@@ -56,187 +98,460 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "Last-Modified"],
 )
 
-def slug(c: str) -> str:
-    import unicodedata
-    import re
-    s = unicodedata.normalize("NFKD", c).encode("ascii", "ignore").decode("ascii")
-    return re.sub(r"[^a-z0-9]+", "_", s.lower()).strip("_")
+# Latência por rota (/metrics); por último para ficar por fora e medir também os middlewares acima
+app.add_middleware(MiddlewareMetricas)
 
 def cria_db():
-    """Cria o banco de dados e as tabelas se não existirem"""
+    """Cria o banco de dados e aplica as migrações pendentes"""
     try:
-        DB_PATH.parent.mkdir(exist_ok=True)
-        conn = sqlite3.connect(DB_PATH)
-        cur = conn.cursor()
+        armazenamento.preparar()
+        with transacao() as conn:
+            cur = conn.cursor()
+        
+            versao = aplicar_migracoes(conn, armazenamento)
+        
+            # Popular a tabela de situação na primeira execução
+            total_equip = cur.execute("SELECT COUNT(*) FROM equipamentos").fetchone()[0]
+            total_status = cur.execute("SELECT COUNT(*) FROM equipment_status").fetchone()[0]
+            if total_equip != total_status:
+                atualizar_status_equipamentos(cur)
+
+            # ...e os resumos de leituras, em bancos que já tinham lançamentos antes da migração 7
+            if cur.execute("SELECT 1 FROM lancamentos_resumo LIMIT 1").fetchone() is None:
+                cur.execute("SELECT tag, MIN(data) FROM lancamentos GROUP BY tag")
+                atualizar_resumos(cur, dict(cur.fetchall()))
         
-        cur.execute("""CREATE TABLE IF NOT EXISTS equipamentos(
-            tag TEXT PRIMARY KEY,
-            tipo TEXT NOT NULL,
-            intervalo REAL DEFAULT 0,
-            ultima_manut REAL DEFAULT 0
-        )""")
-        
-        cur.execute("""CREATE TABLE IF NOT EXISTS lancamentos(
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            tag TEXT,
-            data DATE,
-            h_final REAL,
-            FOREIGN KEY(tag) REFERENCES equipamentos(tag)
-        )""")
-        
-        # Novas tabelas para gestão de manutenções
-        cur.execute("""CREATE TABLE IF NOT EXISTS fornecedores(
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            nome TEXT NOT NULL,
-            cnpj TEXT UNIQUE,
-            telefone TEXT,
-            email TEXT,
-            endereco TEXT,
-            especialidade TEXT,
-            ativo BOOLEAN DEFAULT 1
-        )""")
-        
-        cur.execute("""CREATE TABLE IF NOT EXISTS manutencoes(
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            tag TEXT NOT NULL,
-            tipo_manutencao TEXT NOT NULL,
-            data_agendada DATE,
-            data_realizada DATE,
-            fornecedor_id INTEGER,
-            valor_orcado REAL,
-            valor_real REAL,
-            status TEXT DEFAULT 'AGENDADA',
-            observacoes TEXT,
-            proxima_manutencao DATE,
-            horas_km_manutencao REAL,
-            execucao TEXT,
-            responsavel TEXT,
-            reprogramacao TEXT,
-            numero_os TEXT,
-            FOREIGN KEY(tag) REFERENCES equipamentos(tag),
-            FOREIGN KEY(fornecedor_id) REFERENCES fornecedores(id)
-        )""")
-        
-        cur.execute("""CREATE TABLE IF NOT EXISTS checklists_manutencao(
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            manutencao_id INTEGER NOT NULL,
-            item TEXT NOT NULL,
-            status TEXT DEFAULT 'PENDENTE',
-            observacao TEXT,
-            responsavel TEXT,
-            data_conclusao DATETIME,
-            FOREIGN KEY(manutencao_id) REFERENCES manutencoes(id)
-        )""")
-        
-        cur.execute("""CREATE TABLE IF NOT EXISTS agendamentos(
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            manutencao_id INTEGER NOT NULL,
-            data_hora DATETIME NOT NULL,
-            duracao_estimada INTEGER DEFAULT 60,
-            local TEXT,
-            responsavel TEXT,
-            status TEXT DEFAULT 'CONFIRMADO',
-            FOREIGN KEY(manutencao_id) REFERENCES manutencoes(id)
-        )""")
-        
-        conn.commit()
-        conn.close()
-        logger.info("Banco de dados criado/verificado com sucesso")
+        logger.info(f"Banco de dados criado/verificado com sucesso ({armazenamento.descrever()}, schema v{versao})")
     except Exception as e:
         logger.error(f"Erro ao criar banco de dados: {e}")
         raise
 
-def importar_planilha():
-    """Importa dados da planilha Excel para o banco de dados"""
+COLUNAS_FROTA = ["tag", "tipo", "intervalo", "ultima_manut", "atual", "ultima_atualizacao"]
+
+def atualizar_status_equipamentos(cur, tags=None):
+    """Recalcula a tabela equipment_status para as tags informadas (ou para toda a frota)"""
+    consulta = """
+        SELECT e.tag, e.tipo, e.intervalo, e.ultima_manut,
+               MAX(l.h_final) AS atual,
+               MAX(l.data) AS ultima_atualizacao
+        FROM equipamentos e
+        LEFT JOIN lancamentos l ON l.tag = e.tag
+        {filtro}
+        GROUP BY e.tag
+    """
+    if tags is None:
+        lotes = [None]
+    else:
+        tags = list(tags)
+        # Respeitar o limite de parâmetros do SQLite
+        lotes = [tags[i:i + 500] for i in range(0, len(tags), 500)]
+
+    for lote in lotes:
+        if lote is None:
+            linhas = cur.execute(consulta.format(filtro="")).fetchall()
+        else:
+            filtro = f"WHERE e.tag IN ({','.join('?' * len(lote))})"
+            linhas = cur.execute(consulta.format(filtro=filtro), lote).fetchall()
+
+        if not linhas:
+            continue
+        frota = classify_fleet(pd.DataFrame(linhas, columns=COLUNAS_FROTA))
+        colunas = COLUNAS_FROTA + ["uso", "percentual", "status"]
+        armazenamento.substituir(cur, "equipment_status", colunas, "tag", frota[colunas].values.tolist())
+
+def carregar_frota() -> pd.DataFrame:
+    """Lê a situação de todos os equipamentos e classifica a frota para a data de hoje.
+
+    Os dias restantes usam a taxa de uso recente de cada equipamento
+    (usage_forecast), com o uso diário padrão do tipo quando não há histórico suficiente.
+    """
+    with transacao() as conn:
+        frota = ler_dataframe(conn, f"SELECT {', '.join(COLUNAS_FROTA)} FROM equipment_status ORDER BY tag")
+    return classify_fleet(frota, taxa_uso=previsor_uso.taxas_para(frota["tag"]))
+
+@contextmanager
+def _cronometrar(resultado: dict, etapa: str):
+    """Soma a duração do bloco em resultado["tempos"][etapa] (leitura, normalizacao ou gravacao)"""
+    inicio = time.perf_counter()
     try:
-        if PLANILHA is None:
+        yield
+    finally:
+        resultado["tempos"][etapa] += time.perf_counter() - inicio
+
+def _cadastro_equipamentos(primeiras: pd.DataFrame, ultimas: pd.DataFrame) -> pd.DataFrame:
+    """Tipo, intervalo e último horímetro de cada equipamento (colunas tag, tipo, intervalo, h_ult).
+
+    Tipo e intervalo vêm da primeira linha da tag na planilha; o horímetro, do
+    lançamento mais recente (no empate de datas, o que aparece por último).
+    """
+    tipo = (primeiras["atividade"].astype(str).str.strip().str.upper()
+            if "atividade" in primeiras else pd.Series("", index=primeiras.index))
+    if "tipo" in primeiras:
+        # texto não numérico vira 0; célula vazia continua sem intervalo
+        intervalo = pd.to_numeric(primeiras["tipo"], errors="coerce")
+        intervalo = intervalo.mask(intervalo.isna() & primeiras["tipo"].notna(), 0)
+    else:
+        intervalo = pd.Series(0.0, index=primeiras.index)
+    cadastro = pd.DataFrame({"tag": primeiras["tag"], "tipo": tipo, "intervalo": intervalo.astype(float)})
+
+    ultimas = ultimas.sort_values("data", kind="stable").drop_duplicates("tag", keep="last")
+    cadastro["h_ult"] = cadastro["tag"].map(ultimas.set_index("tag")["h_final"])
+    return cadastro.reset_index(drop=True)
+
+def _gravar_equipamentos(cur, cadastro: pd.DataFrame, atualizar: bool = True) -> set:
+    """Cadastra os equipamentos novos e atualiza os existentes em lote; retorna as tags alteradas.
+
+    Com ``atualizar``, o intervalo da planilha substitui o gravado; sem ele,
+    só o horímetro da última manutenção ainda não definido é preenchido.
+    """
+    if cadastro.empty:
+        return set()
+    tags = cadastro["tag"].tolist()
+    linhas = []
+    for i in range(0, len(tags), 500):
+        lote = tags[i:i + 500]
+        cur.execute(f"SELECT tag, intervalo, ultima_manut FROM equipamentos WHERE tag IN ({','.join('?' * len(lote))})",
+                    lote)
+        linhas.extend(cur.fetchall())
+    gravados = pd.DataFrame(linhas, columns=["tag", "intervalo_gravado", "ultima_manut"], dtype=object)
+    dados = cadastro.merge(gravados, on="tag", how="left")
+    novos = ~dados["tag"].isin(gravados["tag"])
+
+    armazenamento.inserir_novos(cur, "equipamentos", ("tag", "tipo", "intervalo"),
+                                dados.loc[novos, ["tag", "tipo", "intervalo"]].values.tolist())
+
+    # equipamentos recém-cadastrados também entram aqui (ultima_manut ainda vazia)
+    sem_manut = dados["ultima_manut"].isna()
+    h_ult = dados["h_ult"].astype(object).where(dados["h_ult"].notna(), None)
+    if atualizar:
+        gravado = pd.to_numeric(dados["intervalo_gravado"], errors="coerce")
+        mesmo_intervalo = (gravado == dados["intervalo"]) | (gravado.isna() & dados["intervalo"].isna())
+        alterar = (~novos & ~mesmo_intervalo) | sem_manut
+        intervalo = dados["intervalo"].astype(object).where(dados["intervalo"].notna(), None)
+        cur.executemany("""UPDATE equipamentos SET ultima_manut = COALESCE(ultima_manut, ?), intervalo = ?
+                           WHERE tag = ?""",
+                        list(zip(h_ult[alterar], intervalo[alterar], dados.loc[alterar, "tag"])))
+    else:
+        alterar = sem_manut
+        cur.executemany("UPDATE equipamentos SET ultima_manut = ? WHERE tag = ? AND ultima_manut IS NULL",
+                        list(zip(h_ult[alterar], dados.loc[alterar, "tag"])))
+    return set(dados.loc[novos | alterar, "tag"])
+
+def _importar_lancamentos(cur, lotes, total: int, job: ImportJob, resultado: dict,
+                          progresso=(15, 65), atualizar_equipamentos: bool = True) -> set:
+    """Importa a aba PRODUTIVIDADE em lotes e retorna as tags com cadastro alterado.
+
+    Cada lote é normalizado e gravado com um único executemany; entre os lotes
+    fica em memória só a primeira e a última linha de cada equipamento, de
+    modo que o consumo não cresce com o tamanho da aba. O cadastro dos
+    equipamentos é calculado e gravado uma vez, em lote, ao final.
+    Com ``atualizar_equipamentos`` falso, equipamentos já cadastrados mantêm
+    o intervalo gravado (regra "keep" da importação de várias fontes).
+    """
+    primeiras = ultimas = None
+    lidas = validas = 0
+    inicio, fim = progresso
+    lotes = iter(lotes)
+
+    while True:
+        # a leitura em streaming acontece a cada lote pedido ao leitor
+        with _cronometrar(resultado, "leitura"):
+            lote = next(lotes, None)
+        if lote is None:
+            break
+        lidas += len(lote)
+
+        with _cronometrar(resultado, "normalizacao"):
+            lote = lote.dropna(subset=["tag", "data", "h_final"])
+            lote = lote.assign(
+                tag=lote["tag"].astype(str).str.strip().str.upper(),
+                # texto ISO (como o sqlite3 grava datas), convertido pelo numpy sem objetos date por linha
+                data=pd.to_datetime(lote["data"]).to_numpy(dtype="datetime64[D]").astype(str),
+                h_final=pd.to_numeric(lote["h_final"], errors="coerce").fillna(0),
+            )
+
+            primeiras = pd.concat([primeiras, lote.drop_duplicates("tag")]).drop_duplicates("tag")
+            recentes = lote.sort_values("data", kind="stable").drop_duplicates("tag", keep="last")
+            ultimas = (pd.concat([ultimas, recentes[["tag", "data", "h_final"]]])
+                         .sort_values("data", kind="stable").drop_duplicates("tag", keep="last"))
+            linhas = lote[["tag", "data", "h_final"]].values.tolist()
+        registrar_amostra(logger_importacao, "Lançamento lido", lote[["tag", "data", "h_final"]], validas,
+                          tabela="lancamentos")
+        validas += len(linhas)
+
+        # lançamentos já existentes (mesma tag, data e h_final) são ignorados
+        with _cronometrar(resultado, "gravacao"):
+            inseridos = armazenamento.inserir_novos(cur, "lancamentos", ("tag", "data", "h_final"), linhas)
+        resultado["lancamentos"]["inseridos"] += inseridos
+        resultado["lancamentos"]["ignorados"] += len(linhas) - inseridos
+        job.registrar_linhas(len(linhas), inicio + (fim - inicio) * min(1, lidas / total))
+
+    if primeiras is None:
+        return set()
+    with _cronometrar(resultado, "normalizacao"):
+        cadastro = _cadastro_equipamentos(primeiras, ultimas)
+    logger_importacao.info(f"{len(cadastro)} equipamentos lidos da aba {ABA_PRODUTIVIDADE}",
+                           extra={"tabela": "equipamentos", "linhas": len(cadastro), "lancamentos": validas})
+    with _cronometrar(resultado, "gravacao"):
+        return _gravar_equipamentos(cur, cadastro, atualizar_equipamentos)
+
+def _resumir_lancamentos_novos(cur, ultimo_id: int, job: ImportJob) -> set:
+    """Atualiza os resumos por período das tags com lançamentos de id > ``ultimo_id``; retorna essas tags"""
+    cur.execute("SELECT tag, MIN(data) FROM lancamentos WHERE id > ? GROUP BY tag", (ultimo_id,))
+    novos_por_tag = dict(cur.fetchall())
+    # resumos reagregados a partir do lançamento novo mais antigo de cada tag
+    job.definir_fase("resumos", 66)
+    atualizar_resumos(cur, novos_por_tag)
+    return set(novos_por_tag)
+
+def _texto(df: pd.DataFrame, coluna: str) -> pd.Series:
+    # mesmo texto que str(valor).strip() em cada célula; coluna ausente vira ""
+    if coluna not in df:
+        return pd.Series("", index=df.index)
+    return df[coluna].map(str).str.strip()
+
+def _importar_manutencoes(cur, df_os, job: ImportJob, resultado: dict, substituir: bool = True):
+    """Importa as OS da aba CONTROLE DE OS, identificadas por (equipamento, nº OS).
+
+    A aba inteira é convertida de uma vez e comparada com as OS já importadas
+    (hash do conteúdo); novas e alteradas são gravadas com um executemany
+    cada. OS já importadas cujo conteúdo mudou são atualizadas; com
+    ``substituir`` falso são mantidas como estão e contadas em ``mantidos``
+    (regra "keep"). Se a mesma OS aparece mais de uma vez, vale a última.
+    Erros de leitura são registrados sem interromper a importação.
+    """
+    try:
+        if df_os is None:
+            raise ValueError(f"Aba {ABA_OS} não pôde ser lida")
+        with _cronometrar(resultado, "gravacao"):
+            existentes = dict(cur.execute("""
+                SELECT chave_importacao, hash_importacao
+                FROM manutencoes
+                WHERE chave_importacao IS NOT NULL
+            """).fetchall())
+
+        with _cronometrar(resultado, "normalizacao"):
+            datas = (df_os["data"] if "data" in df_os else pd.Series("", index=df_os.index)).map(
+                lambda data: data.date().isoformat() if hasattr(data, "date") else str(data))
+            os_ = pd.DataFrame({
+                "tag": _texto(df_os, "equipamento").str.upper(),
+                "tipo_manutencao": _texto(df_os, "tipo_de_manutencao"),
+                "data_agendada": datas,
+                "status": "REALIZADA",
+                "observacoes": _texto(df_os, "observacoes"),
+                "execucao": _texto(df_os, "execucao"),
+                "responsavel": _texto(df_os, "responsavel_da_manutencao"),
+                "reprogramacao": _texto(df_os, "reprogramacao"),
+                "numero_os": _texto(df_os, "n_os"),
+            }, index=df_os.index)
+            os_["hash_importacao"] = [hashlib.sha1("\x1f".join(valores).encode("utf-8")).hexdigest()
+                                      for valores in os_.itertuples(index=False, name=None)]
+            # OS sem número são identificadas apenas pelo conteúdo
+            numerada = (df_os["n_os"].notna() if "n_os" in df_os else False) & (os_["numero_os"] != "")
+            os_["chave_importacao"] = ("hash:" + os_["hash_importacao"]).mask(
+                numerada, os_["tag"] + "|" + os_["numero_os"])
+
+            gravado = os_["chave_importacao"].map(existentes)
+            nova = gravado.isna()
+            # a OS repetida é comparada pela última ocorrência, a que foi gravada
+            ultima = ~os_["chave_importacao"].duplicated(keep="last")
+            diferente = ~nova & ultima & (gravado != os_["hash_importacao"])
+
+            # cada OS nova entra na posição da primeira ocorrência, com o conteúdo da última
+            novas = os_[nova]
+            ordem = novas.drop_duplicates("chave_importacao")["chave_importacao"]
+            novas = novas.drop_duplicates("chave_importacao", keep="last").set_index("chave_importacao").loc[ordem]
+            alteradas = (os_[diferente].drop_duplicates("chave_importacao", keep="last")
+                         if substituir else os_.iloc[:0])
+
+        colunas = ["tag", "tipo_manutencao", "data_agendada", "status", "observacoes", "execucao",
+                   "responsavel", "reprogramacao", "numero_os"]
+        with _cronometrar(resultado, "gravacao"):
+            cur.executemany(f"""
+                INSERT INTO manutencoes ({', '.join(colunas)}, chave_importacao, hash_importacao)
+                VALUES ({', '.join('?' * (len(colunas) + 2))})
+            """, novas.reset_index()[colunas + ["chave_importacao", "hash_importacao"]].values.tolist())
+            cur.executemany(f"""
+                UPDATE manutencoes
+                SET {', '.join(f'{c} = ?' for c in colunas)}, hash_importacao = ?
+                WHERE chave_importacao = ?
+            """, alteradas[colunas + ["hash_importacao", "chave_importacao"]].values.tolist())
+
+        registrar_amostra(logger_importacao, "OS lida", os_[["chave_importacao", "data_agendada", "tipo_manutencao"]],
+                          tabela="manutencoes")
+        resultado["manutencoes"]["ignorados"] += int((~nova & ~diferente).sum())
+        resultado["manutencoes"]["inseridos"] = len(novas)
+        resultado["manutencoes"]["atualizados"] = len(alteradas)
+        if not substituir:
+            resultado["manutencoes"]["mantidos"] = int(diferente.sum())
+        job.registrar_linhas(len(os_))
+    except ImportacaoCancelada:
+        raise
+    except Exception as e:
+        logger.error(f"Erro ao importar OS/manutenções: {e}")
+
+def _novo_resultado(arquivo_hash: str) -> dict:
+    return {
+        "status": "importado",
+        "arquivo_hash": arquivo_hash,
+        "lancamentos": {"inseridos": 0, "ignorados": 0},
+        "manutencoes": {"inseridos": 0, "atualizados": 0, "ignorados": 0},
+        # segundos gastos em cada etapa; a leitura em streaming se intercala com as demais
+        "tempos": {"leitura": 0.0, "normalizacao": 0.0, "gravacao": 0.0, "commit": 0.0},
+    }
+
+def _arredondar_tempos(resultado: dict, total: float = None):
+    tempos = resultado["tempos"]
+    if total is not None:
+        tempos["total"] = total
+    resultado["tempos"] = {etapa: round(segundos, 3) for etapa, segundos in tempos.items()}
+
+def _registrar_fases(origem: str, resultado: dict, job: ImportJob):
+    """Um registro por fase (segundos) e por tabela (contagens) da importação, com os campos estruturados"""
+    for fase, segundos in resultado["tempos"].items():
+        logger_importacao.info(f"{origem}: fase {fase} em {segundos:.3f}s",
+                               extra={"job": job.id, "origem": origem, "fase": fase, "segundos": segundos})
+    for tabela in ("lancamentos", "manutencoes"):
+        contagens = resultado[tabela]
+        logger_importacao.info(f"{origem}: {tabela} " + ", ".join(f"{n} {chave}" for chave, n in contagens.items()),
+                               extra={"job": job.id, "origem": origem, "tabela": tabela, **contagens})
+
+def _planilha_ja_importada(cur, origem: str, arquivo_hash: str) -> bool:
+    """Regra única de "planilha sem alterações": a última importação da mesma origem teve o mesmo hash.
+
+    Vale para a planilha configurada e para cada origem da importação de
+    várias fontes; uma origem que volta a um arquivo importado antes (mas
+    diferente do último) é importada de novo.
+    """
+    ultima = cur.execute("SELECT arquivo_hash FROM importacoes WHERE arquivo = ? ORDER BY id DESC LIMIT 1",
+                         (origem,)).fetchone()
+    return ultima is not None and ultima[0] == arquivo_hash
+
+def _contagens(resultado: dict) -> tuple:
+    """(inseridos, atualizados, ignorados) de uma importação, somando lançamentos e OS"""
+    inseridos = resultado["lancamentos"]["inseridos"] + resultado["manutencoes"]["inseridos"]
+    atualizados = resultado["manutencoes"]["atualizados"]
+    ignorados = resultado["lancamentos"]["ignorados"] + resultado["manutencoes"]["ignorados"]
+    return inseridos, atualizados, ignorados
+
+def _registrar_importacao(cur, arquivo: str, resultado: dict) -> tuple:
+    """Grava a importação em ``importacoes``; retorna (inseridos, atualizados, ignorados)"""
+    inseridos, atualizados, ignorados = _contagens(resultado)
+    cur.execute("""
+        INSERT INTO importacoes (arquivo, arquivo_hash, data_importacao, inseridos, atualizados, ignorados)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, (arquivo, resultado["arquivo_hash"], dt.datetime.now().isoformat(), inseridos, atualizados, ignorados))
+    return inseridos, atualizados, ignorados
+
+def _registrar_importacoes_sem_alteracoes(registros: list):
+    """Grava as importações que não inseriram nem atualizaram nada, fora da transação versionada.
+
+    O registro em ``importacoes`` não muda nenhuma resposta cacheável; gravado
+    junto com a importação, faria uma reimportação forçada sem alterações
+    incrementar a versão dos dados (e invalidar os ETags) à toa.
+    """
+    if not registros:
+        return
+    with transacao(versionar=False) as conn:
+        cur = conn.cursor()
+        for arquivo, resultado in registros:
+            _registrar_importacao(cur, arquivo, resultado)
+
+def importar_planilha(forcar: bool = False, caminho: Path = None, job: ImportJob = None, origem: str = None):
+    """Importa dados da planilha Excel para o banco de dados de forma incremental.
+
+    Lançamentos são identificados por (tag, data, h_final) e OS por
+    (equipamento, nº OS); apenas linhas novas ou alteradas são gravadas.
+    Se o hash da planilha for igual ao da última importação da mesma origem,
+    nada é feito (a menos que ``forcar`` seja verdadeiro).
+
+    ``caminho`` substitui a planilha configurada em CAMINHO_PLANILHA e ``job``
+    recebe a fase/progresso; o cancelamento do job desfaz a transação.
+    ``origem`` identifica a planilha no registro de importações (padrão: o caminho).
+
+    Retorna um dicionário com as contagens de inseridos/atualizados/ignorados
+    e, em ``tempos``, os segundos de leitura, normalização e gravação.
+    """
+    job = job or ImportJob("avulsa")
+    caminho = caminho or PLANILHA
+    origem = origem or str(caminho)
+    inicio = time.perf_counter()
+    try:
+        if caminho is None:
             logger.error("CAMINHO_PLANILHA não configurada. Configure no arquivo .env")
-            return
+            raise ValueError("Planilha não configurada")
             
-        if not PLANILHA.exists():
-            logger.warning(f"Planilha não encontrada: {PLANILHA}")
-            return
+        if not caminho.exists():
+            logger.warning(f"Planilha não encontrada: {caminho}")
+            raise FileNotFoundError(f"Planilha não encontrada: {caminho}")
 
-        df = pd.read_excel(PLANILHA, sheet_name="PRODUTIVIDADE", header=2)
-        df.columns = [slug(c) for c in df.columns]
-        
-        obrig = {"tag", "data", "h_final"}
-        if not obrig.issubset(df.columns):
-            logger.error("Cabeçalho inesperado na planilha!")
-            return
+        job.definir_fase("verificando", 5)
+        arquivo_hash = hash_arquivo(caminho)
+        with transacao() as conn:
+            cur = conn.cursor()
 
-        df = df.dropna(subset=["tag", "data", "h_final"]).copy()
-        df["tag"] = df["tag"].astype(str).str.strip().str.upper()
-        df["data"] = pd.to_datetime(df["data"]).dt.date
-        df["h_final"] = pd.to_numeric(df["h_final"], errors="coerce").fillna(0)
+            if not forcar and _planilha_ja_importada(cur, origem, arquivo_hash):
+                logger.info("Planilha sem alterações desde a última importação - nada a fazer")
+                return {"status": "sem_alteracoes", "arquivo_hash": arquivo_hash}
 
-        conn = sqlite3.connect(DB_PATH)
-        cur = conn.cursor()
+            resultado = _novo_resultado(arquivo_hash)
+            # lançamentos novos recebem id maior que o atual (AUTOINCREMENT)
+            ultimo_id = cur.execute("SELECT COALESCE(MAX(id), 0) FROM lancamentos").fetchone()[0]
 
-        for tag, grp in df.groupby("tag"):
-            h_ult = grp.sort_values("data").iloc[-1]["h_final"]
-            tipo = str(grp.iloc[0]["atividade"]).strip().upper() if "atividade" in grp.columns else ""
-            # Buscar coluna 'Tipo' de forma robusta
-            intervalo_col = next((col for col in grp.columns if col.strip().lower() == "tipo"), None)
-            if intervalo_col:
-                try:
-                    intervalo = float(grp.iloc[0][intervalo_col])
-                except Exception:
-                    intervalo = 0
-            else:
-                intervalo = 0
-            print(f"[IMPORT] {tag}: intervalo lido = {intervalo}")
-            cur.execute("""INSERT OR IGNORE INTO equipamentos(tag,tipo,intervalo) VALUES(?,?,?)""",
-                        (tag, tipo, intervalo))
-            cur.execute("""UPDATE equipamentos SET ultima_manut = COALESCE(ultima_manut, ?), intervalo = ? 
-                           WHERE tag = ?""", (h_ult, intervalo, tag))
-            # lançamentos
-            cur.executemany("""INSERT INTO lancamentos(tag,data,h_final) VALUES(?,?,?)""",
-                            grp[["tag","data","h_final"]].values.tolist())
-
-        # Importar OS/manutenções da aba CONTROLE DE OS
-        try:
-            df_os = pd.read_excel(PLANILHA, sheet_name="CONTROLE DE OS")
-            df_os.columns = [slug(c) for c in df_os.columns]  # slugifica os cabeçalhos
-            for _, row in df_os.iterrows():
-                tag = str(row.get("equipamento", "")).strip().upper()
-                numero_os = str(row.get("n_os", "")).strip()
-                data = row.get("data", "")
-                if hasattr(data, "date"):
-                    data = data.date().isoformat()
-                else:
-                    data = str(data)
-                tipo_manutencao = str(row.get("tipo_de_manutencao", "")).strip()
-                falha = str(row.get("falha_apresentada", "")).strip()
-                execucao = str(row.get("execucao", "")).strip()
-                responsavel = str(row.get("responsavel_da_manutencao", "")).strip() if "responsavel_da_manutencao" in row else ""
-                reprogramacao = str(row.get("reprogramacao", "")).strip() if "reprogramacao" in row else ""
-                observacoes = str(row.get("observacoes", "")).strip() if "observacoes" in row else ""
-                # Inserir manutenção no banco
-                cur.execute("""
-                    INSERT INTO manutencoes (tag, tipo_manutencao, data_agendada, status, observacoes, execucao, responsavel, reprogramacao, numero_os)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    tag,
-                    tipo_manutencao,
-                    data,
-                    "REALIZADA",
-                    observacoes,
-                    execucao,
-                    responsavel,
-                    reprogramacao,
-                    numero_os
-                ))
-                print(f"[IMPORT OS] {tag} | OS: {numero_os} | Data: {data} | Tipo: {tipo_manutencao} | Resp: {responsavel}")
-        except Exception as e:
-            logger.error(f"Erro ao importar OS/manutenções: {e}")
+            # A planilha é aberta uma única vez e só as colunas usadas são lidas
+            job.definir_fase("lendo", 10)
+            with LeitorPlanilha(caminho) as leitor:
+                with _cronometrar(resultado, "leitura"):
+                    cabecalho = set(leitor.cabecalho(ABA_PRODUTIVIDADE, CABECALHO_PRODUTIVIDADE))
+                if not COLUNAS_OBRIGATORIAS_PRODUTIVIDADE.issubset(cabecalho):
+                    logger.error("Cabeçalho inesperado na planilha!")
+                    raise ValueError("Cabeçalho inesperado na planilha")
 
-        conn.commit()
-        conn.close()
-        logger.info(f"Planilha importada com sucesso em {dt.datetime.now()}")
-        
+                job.definir_fase("lancamentos", 15)
+                with _cronometrar(resultado, "leitura"):
+                    total = max(1, (leitor.total_linhas(ABA_PRODUTIVIDADE) or 0) - CABECALHO_PRODUTIVIDADE - 1)
+                lotes = leitor.ler_em_lotes(ABA_PRODUTIVIDADE, CABECALHO_PRODUTIVIDADE, COLUNAS_PRODUTIVIDADE)
+                tags_alteradas = _importar_lancamentos(cur, lotes, total, job, resultado)
+
+                with _cronometrar(resultado, "leitura"):
+                    try:
+                        df_os = leitor.ler_aba(ABA_OS, CABECALHO_OS, COLUNAS_OS)
+                    except Exception as e:
+                        logger.error(f"Erro ao ler aba {ABA_OS}: {e}")
+                        df_os = None
+
+            with _cronometrar(resultado, "gravacao"):
+                tags_alteradas |= _resumir_lancamentos_novos(cur, ultimo_id, job)
+
+                job.definir_fase("status", 70)
+                atualizar_status_equipamentos(cur, tags_alteradas)
+
+            # Importar OS/manutenções da aba CONTROLE DE OS
+            job.definir_fase("manutencoes", 75)
+            _importar_manutencoes(cur, df_os, job, resultado)
+
+            job.definir_fase("gravando", 95)
+            inseridos, atualizados, ignorados = _contagens(resultado)
+            if inseridos or atualizados:
+                with _cronometrar(resultado, "gravacao"):
+                    _registrar_importacao(cur, origem, resultado)
+            inicio_commit = time.perf_counter()
+
+        resultado["tempos"]["commit"] = time.perf_counter() - inicio_commit
+        if not (inseridos or atualizados):
+            _registrar_importacoes_sem_alteracoes([(origem, resultado)])
+        _arredondar_tempos(resultado, time.perf_counter() - inicio)
+        _registrar_fases(caminho.name, resultado, job)
+        logger.info(f"Planilha importada com sucesso em {dt.datetime.now()} - "
+                    f"{inseridos} inseridos, {atualizados} atualizados, {ignorados} ignorados")
+        return resultado
+        
+    except ImportacaoCancelada:
+        logger.info("Importação cancelada - alterações desfeitas")
+        raise
     except Exception as e:
         logger.error(f"Erro ao importar planilha: {e}")
         raise
@@ -244,42 +559,24 @@ def importar_planilha():
 def resumo_dashboard() -> dict:
     """Retorna resumo do dashboard com status dos equipamentos"""
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cur = conn.cursor()
+        with transacao() as conn:
+            cur = conn.cursor()
         
-        q = cur.execute("""
-            SELECT e.tag, e.tipo, e.intervalo, e.ultima_manut,
-                   MAX(l.h_final) AS atual,
-                   MAX(l.data) AS ultima_atualizacao
-            FROM equipamentos e
-            LEFT JOIN lancamentos l ON l.tag = e.tag
-            GROUP BY e.tag
-        """)
+            q = cur.execute("""
+                SELECT status, COUNT(*), MAX(ultima_atualizacao)
+                FROM equipment_status
+                GROUP BY status
+            """)
         
-        status = {"OK": 0, "AMARELO": 0, "VERMELHO": 0, "SEM": 0}
-        ultima_atualizacao_geral = None
+            status = {"OK": 0, "AMARELO": 0, "VERMELHO": 0, "SEM": 0}
+            ultima_atualizacao_geral = None
         
-        for tag, tipo, intv, ult, atual, ult_data in q.fetchall():
-            intv = intv or 0
-            ultima_manut = ult or 0
-            atual_valor = atual if atual is not None else ultima_manut
-            uso = atual_valor - ultima_manut
-            percentual = (uso / intv * 100) if intv > 0 else 0
-            
-            if intv == 0:
-                status["SEM"] += 1
-            elif uso >= intv:
-                status["VERMELHO"] += 1
-            elif uso >= max(intv * 0.9, intv - 20):
-                status["AMARELO"] += 1
-            else:
-                status["OK"] += 1
+            for situacao, quantidade, ult_data in q.fetchall():
+                status[situacao] = quantidade
             
-            # Atualizar data mais recente
-            if ult_data and (ultima_atualizacao_geral is None or ult_data > ultima_atualizacao_geral):
-                ultima_atualizacao_geral = ult_data
-                
-        conn.close()
+                # Atualizar data mais recente
+                if ult_data and (ultima_atualizacao_geral is None or ult_data > ultima_atualizacao_geral):
+                    ultima_atualizacao_geral = ult_data
         
         # Use a data atual se houver dados, senão None
         agora = dt.datetime.now()
@@ -309,68 +606,16 @@ def enviar_relatorio_email():
             return
         
         # Buscar dados para o relatório
-        conn = sqlite3.connect(DB_PATH)
-        cur = conn.cursor()
-        
-        q = cur.execute("""
-            SELECT e.tag, e.tipo, e.intervalo, e.ultima_manut,
-                   MAX(l.h_final) AS atual,
-                   MAX(l.data) AS ultima_atualizacao
-            FROM equipamentos e
-            LEFT JOIN lancamentos l ON l.tag = e.tag
-            GROUP BY e.tag
-        """)
-        
-        equipamentos_criticos = []
-        proximos_manutencao = []
-        sem_atualizacao = []
-        
+        frota = carregar_frota()
         hoje = dt.date.today()
         
-        for tag, tipo, intv, ult, atual, ult_data in q.fetchall():
-            intv = intv or 0
-            ultima_manut = ult or 0
-            atual_valor = atual if atual is not None else ultima_manut
-            uso = atual_valor - ultima_manut
-            percentual = (uso / intv * 100) if intv > 0 else 0
-            
-            # Equipamentos críticos
-            if intv > 0 and percentual >= 100:
-                equipamentos_criticos.append({
-                    "tag": tag,
-                    "tipo": tipo,
-                    "uso": uso,
-                    "intervalo": intv,
-                    "percentual": percentual
-                })
-            
-            # Próximos da manutenção
-            elif intv > 0 and percentual >= 90:
-                proximos_manutencao.append({
-                    "tag": tag,
-                    "tipo": tipo,
-                    "uso": uso,
-                    "intervalo": intv,
-                    "percentual": percentual
-                })
-            
-            # Sem atualização recente
-            if ult_data:
-                # Converter string para date se necessário
-                if isinstance(ult_data, str):
-                    ult_data_date = dt.datetime.strptime(ult_data, '%Y-%m-%d').date()
-                else:
-                    ult_data_date = ult_data
-                
-                if (hoje - ult_data_date).days > 7:
-                    sem_atualizacao.append({
-                        "tag": tag,
-                        "tipo": tipo,
-                        "dias_sem_atualizacao": (hoje - ult_data_date).days,
-                        "ultima_atualizacao": str(ult_data)
-                    })
-        
-        conn.close()
+        equipamentos_criticos = para_registros(
+            frota[frota["status"] == STATUS_VERMELHO], ["tag", "tipo", "uso", "intervalo", "percentual"])
+        proximos_manutencao = para_registros(
+            frota[frota["status"] == STATUS_AMARELO], ["tag", "tipo", "uso", "intervalo", "percentual"])
+        sem_atualizacao = para_registros(
+            frota[frota["dias_sem_atualizacao"] > DIAS_SEM_ATUALIZACAO],
+            ["tag", "tipo", "dias_sem_atualizacao", "ultima_atualizacao"])
         
         # Criar conteúdo do email
         html_content = f"""
@@ -429,21 +674,66 @@ def enviar_relatorio_email():
             server.login(email_from, email_password)
             server.send_message(msg)
         
+        emails_enviados.inc(status="enviado")
         logger.info(f"Relatório enviado por email em {dt.datetime.now()}")
         
     except Exception as e:
+        emails_enviados.inc(status="falhou")
         logger.error(f"Erro ao enviar relatório por email: {e}")
 
 # Variável global para o scheduler
 scheduler = None
 
+# Fila única de importações (manual, agendada e via configuração)
+gerenciador_importacoes = GerenciadorImportacoes()
+gerenciador_importacoes.ao_finalizar(
+    lambda job: canal_eventos.publicar(EVENTO_IMPORTACAO_FINALIZADA, job.para_dict()))
+
+def _registrar_metricas_importacao(job: ImportJob):
+    """Contabiliza no /metrics o status, as linhas e a duração das fases de uma importação finalizada"""
+    importacoes.inc(status=job.status)
+    resultado = job.resultado or {}
+    if "fontes" in resultado:
+        # várias origens: download e leitura de cada planilha e gravação de cada uma na transação comum
+        fases = [{**{f: fonte["tempos"][f] for f in ("download", "leitura") if f in fonte["tempos"]},
+                  **{f: fonte["resultado"]["tempos"][f] for f in ("normalizacao", "gravacao")}}
+                 for fonte in resultado["fontes"] if (fonte["resultado"] or {}).get("tempos")]
+        fases.append({f: resultado["tempos"][f] for f in ("commit", "total")})
+        contagens = [fonte["resultado"] for fonte in resultado["fontes"] if fonte["resultado"]]
+    else:
+        fases = [resultado.get("tempos", {})]
+        contagens = [resultado]
+    for tempos in fases:
+        for fase, segundos in tempos.items():
+            duracao_fases_importacao.observar(segundos, phase=fase)
+    for contagem in contagens:
+        for tabela in ("lancamentos", "manutencoes"):
+            for situacao, quantidade in contagem.get(tabela, {}).items():
+                linhas_importadas.inc(quantidade, table=tabela, result=situacao)
+
+gerenciador_importacoes.ao_finalizar(_registrar_metricas_importacao)
+
+# Importação disparada na inicialização; /health/ready só responde 200 depois dela
+job_inicial = None
+
+def agendar_importacao(forcar: bool = False):
+    """Enfileira a importação da planilha configurada; retorna (job, criado)"""
+    return gerenciador_importacoes.submeter(f"planilha:{PLANILHA}", importar_planilha, forcar=forcar)
+
 @app.on_event("startup")
 def startup():
     """Inicializa o aplicativo e agenda a importação automática"""
     try:
-        global scheduler
+        global scheduler, job_inicial
+        enfileirar_uvicorn()
         cria_db()
-        importar_planilha()  # Importa a última planilha ao iniciar o backend
+        gerenciador_importacoes.marcar_interrompidos()
+        monitor_frota.iniciar()
+        if PLANILHA is not None:
+            # Importa a última planilha ao iniciar o backend
+            job_inicial, _ = agendar_importacao()
+            if not INICIO_RAPIDO:
+                job_inicial.aguardar()
         scheduler = BackgroundScheduler(timezone=TZ)
         
         # Carregar configurações salvas
@@ -453,7 +743,7 @@ def startup():
         if config.get("autoImport") and config.get("enabled"):
             import_time = f"{config.get('importHour', '10')}:{config.get('importMinute', '05')}"
             scheduler.add_job(
-                importar_planilha,
+                agendar_importacao,
                 'cron',
                 hour=int(config.get('importHour', 10)),
                 minute=int(config.get('importMinute', 5)),
@@ -464,7 +754,7 @@ def startup():
         else:
             # Usar configuração padrão se não configurado
             h, m = map(int, HORA_IMPORT.split(":"))
-            scheduler.add_job(importar_planilha, "cron", hour=h, minute=m)
+            scheduler.add_job(agendar_importacao, "cron", hour=h, minute=m)
             logger.info(f"Usando configuração padrão - importação diária às {HORA_IMPORT}")
         
         # Relatório diário por email (às 8:00)
@@ -476,17 +766,69 @@ def startup():
         logger.error(f"Erro na inicialização: {e}")
         raise
 
-@app.get("/import")
-def import_now(tasks: BackgroundTasks):
-    """Endpoint para importar planilha manualmente"""
+@app.on_event("shutdown")
+async def shutdown():
+    """Fecha as conexões do pool de leitura assíncrono e do banco"""
+    await pool_leitura.fechar()
+    armazenamento.fechar()
+
+@app.api_route("/import", methods=["GET", "POST"])
+def import_now(forcar: bool = False):
+    """Endpoint para importar planilha manualmente.
+
+    A importação roda em segundo plano; se já houver uma importação da mesma
+    planilha na fila ou executando, o job existente é retornado.
+    """
     try:
-        tasks.add_task(importar_planilha)
-        return {"detail": "Importação agendada"}
+        job, criado = agendar_importacao(forcar)
+        detalhe = "Importação agendada" if criado else "Importação já em andamento"
+        return {"detail": detalhe, "job_id": job.id, "job": job.para_dict()}
     except Exception as e:
         logger.error(f"Erro ao agendar importação: {e}")
         raise HTTPException(status_code=500, detail="Erro interno do servidor")
 
+@app.get("/import/jobs")
+def import_jobs(limite: int = 20):
+    """Lista as importações em andamento e o histórico recente"""
+    try:
+        return {
+            "ativos": gerenciador_importacoes.ativos(),
+            "historico": gerenciador_importacoes.historico(limite)
+        }
+    except Exception as e:
+        logger.error(f"Erro ao listar importações: {e}")
+        raise HTTPException(status_code=500, detail="Erro interno do servidor")
+
+@app.get("/import/jobs/{job_id}")
+def import_job(job_id: str):
+    """Retorna fase, progresso e resultado de uma importação"""
+    try:
+        job = gerenciador_importacoes.obter(job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail="Importação não encontrada")
+        return job
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Erro ao obter importação {job_id}: {e}")
+        raise HTTPException(status_code=500, detail="Erro interno do servidor")
+
+@app.post("/import/jobs/{job_id}/cancel")
+def cancel_import_job(job_id: str):
+    """Solicita o cancelamento de uma importação na fila ou em execução"""
+    try:
+        job = gerenciador_importacoes.cancelar(job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail="Importação não encontrada ou já finalizada")
+        return {"detail": "Cancelamento solicitado", "job": job.para_dict()}
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Erro ao cancelar importação {job_id}: {e}")
+        raise HTTPException(status_code=500, detail="Erro interno do servidor")
+
 @app.get("/dashboard")
+@cache_respostas.em_cache("dashboard")
 def dashboard():
     """Endpoint para obter resumo do dashboard"""
     try:
@@ -495,81 +837,109 @@ def dashboard():
         logger.error(f"Erro ao obter dashboard: {e}")
         raise HTTPException(status_code=500, detail="Erro interno do servidor")
 
+# Chaves de ordenação aceitas: nome -> coluna (o desempate é sempre a tag)
+ORDENACAO_EQUIPAMENTOS = {"tag": "tag", "percentual": "percentual"}
+
 @app.get("/equipment")
-def equipment_list():
-    """Endpoint para obter lista detalhada de equipamentos"""
+@cache_respostas.em_cache("equipment")
+async def equipment_list(tag: str = None, busca: str = None, status: str = None, tipo: str = None,
+                         ordenar: str = "tag", direcao: str = "asc", limit: int = None, cursor: str = None):
+    """Endpoint para obter lista detalhada de equipamentos.
+
+    Filtros: ``tag`` (exata), ``busca`` (prefixo da tag), ``status`` e ``tipo``.
+    Sem ``limit``/``cursor`` retorna a lista completa; com eles retorna uma página
+    {"equipamentos", "proximo_cursor", "limite"} paginada por chave.
+    """
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cur = conn.cursor()
-        
-        q = cur.execute("""
-            SELECT e.tag, e.tipo, e.intervalo, e.ultima_manut,
-                   MAX(l.h_final) AS atual,
-                   MAX(l.data) AS ultima_atualizacao
-            FROM equipamentos e
-            LEFT JOIN lancamentos l ON l.tag = e.tag
-            GROUP BY e.tag
-            ORDER BY e.tag
-        """)
-        
+        if ordenar not in ORDENACAO_EQUIPAMENTOS or direcao not in ("asc", "desc"):
+            raise HTTPException(status_code=400, detail="Ordenação inválida")
+        paginado = limit is not None or cursor is not None
+
+        condicoes, params = [], []
+        if tag:
+            condicoes.append("tag = ?")
+            params.append(tag.strip().upper())
+        if busca:
+            # faixa na chave primária em vez de LIKE, para usar o índice
+            prefixo = busca.strip().upper()
+            condicoes.append("tag >= ? AND tag < ?")
+            params.extend([prefixo, prefixo + "\uffff"])
+        if status:
+            condicoes.append("status = ?")
+            params.append(status.strip().upper())
+        if tipo:
+            condicoes.append("tipo = ?")
+            params.append(tipo.strip().upper())
+        ordem = ordenacao_keyset(condicoes, params, ordenar, ORDENACAO_EQUIPAMENTOS[ordenar], "tag",
+                                 direcao == "desc", cursor if paginado else None)
+        limite = validar_limite(limit) if paginado else None
+
+        linhas = await consultar(f"""
+            SELECT tag, tipo, intervalo, ultima_manut, atual, ultima_atualizacao, status, percentual
+            FROM equipment_status
+            {"WHERE " + " AND ".join(condicoes) if condicoes else ""}
+            {ordem}
+            {"LIMIT ?" if paginado else ""}
+        """, params + ([limite + 1] if paginado else []))
+
         equipment = []
-        for tag, tipo, intv, ult, atual, ult_data in q.fetchall():
-            # Fix: Properly handle null values
-            ultima_manut = ult or 0
-            atual_valor = atual if atual is not None else ultima_manut
-            intervalo = intv or 0
-            
+        for tag, tipo, intervalo, ultima_manut, atual_valor, ult_data, situacao, percentual in linhas:
             equipment.append({
                 "tag": tag,
                 "tipo": tipo,
                 "intervalo": intervalo,
                 "ultima_manut": ultima_manut,
                 "atual": atual_valor,
-                "ultima_atualizacao": ult_data
+                "ultima_atualizacao": ult_data,
+                "status": situacao,
+                "percentual": percentual
             })
-                
-        conn.close()
-        return equipment
+
+        if not paginado:
+            return equipment
+
+        proximo = None
+        if len(equipment) > limite:
+            equipment = equipment[:limite]
+            ultimo = equipment[-1]
+            proximo = codificar_cursor(ordenar, direcao, ultimo[ordenar], ultimo["tag"])
+        return {"equipamentos": equipment, "proximo_cursor": proximo, "limite": limite}
         
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Erro ao obter lista de equipamentos: {e}")
         raise HTTPException(status_code=500, detail="Erro interno do servidor")
 
 @app.get("/equipment/{tag}")
-def equipment_detail(tag: str):
+@cache_respostas.em_cache("equipment_detail")
+async def equipment_detail(tag: str):
     """Endpoint para obter detalhes de um equipamento específico"""
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cur = conn.cursor()
-        
         # Dados do equipamento
-        cur.execute("""
-            SELECT e.tag, e.tipo, e.intervalo, e.ultima_manut,
-                   MAX(l.h_final) AS atual
-            FROM equipamentos e
-            LEFT JOIN lancamentos l ON l.tag = e.tag
-            WHERE e.tag = ?
-            GROUP BY e.tag
+        equip = await consultar_um("""
+            SELECT tag, tipo, intervalo, ultima_manut, atual
+            FROM equipment_status
+            WHERE tag = ?
         """, (tag,))
-        
-        equip = cur.fetchone()
+
         if not equip:
             raise HTTPException(status_code=404, detail="Equipamento não encontrado")
-            
+
         tag, tipo, intv, ult, atual = equip
-        
+
         # Histórico dos últimos 30 dias
-        cur.execute("""
+        linhas = await consultar("""
             SELECT data, h_final
             FROM lancamentos
             WHERE tag = ?
             ORDER BY data DESC
             LIMIT 30
         """, (tag,))
-        
-        historico = [{"data": str(data), "h_final": h_final} for data, h_final in cur.fetchall()]
-        
-        conn.close()
+
+        historico = [{"data": str(data), "h_final": h_final} for data, h_final in linhas]
         
         return {
             "tag": tag,
@@ -586,24 +956,76 @@ def equipment_detail(tag: str):
         logger.error(f"Erro ao obter detalhes do equipamento {tag}: {e}")
         raise HTTPException(status_code=500, detail="Erro interno do servidor")
 
+@app.get("/equipment/{tag}/history")
+@cache_respostas.em_cache("equipment_history")
+async def equipment_history(tag: str, granularity: str = "dia",
+                            inicio: str = Query(None, alias="from"), fim: str = Query(None, alias="to")):
+    """Histórico de leituras de um equipamento agregado por período.
+
+    ``granularity``: dia, semana ou mes (aceita também daily/weekly/monthly).
+    ``from``/``to`` (AAAA-MM-DD, inclusive) limitam os períodos; o período que
+    contém ``from`` entra inteiro. Cada ponto traz leituras mínima e máxima,
+    quantidade de lançamentos e o uso (horas/km) no período.
+    """
+    try:
+        granularidade = normalizar_granularidade(granularity)
+        try:
+            inicio = dt.date.fromisoformat(inicio) if inicio else None
+            fim = dt.date.fromisoformat(fim) if fim else None
+        except ValueError:
+            raise ValueError("Datas inválidas: use AAAA-MM-DD em from/to")
+
+        filtros, params = ["tag = ?", "granularidade = ?"], [tag, granularidade]
+        if inicio:
+            filtros.append("periodo >= ?")
+            params.append(inicio_periodo(inicio, granularidade).isoformat())
+        if fim:
+            filtros.append("periodo <= ?")
+            params.append(fim.isoformat())
+
+        linhas = await consultar(f"""
+            SELECT periodo, primeira_data, ultima_data, leitura_min, leitura_max, lancamentos, uso
+            FROM lancamentos_resumo
+            WHERE {' AND '.join(filtros)}
+            ORDER BY periodo
+        """, params)
+
+        if not linhas and not await consultar_um("SELECT 1 FROM equipment_status WHERE tag = ?", (tag,)):
+            raise HTTPException(status_code=404, detail="Equipamento não encontrado")
+
+        pontos = converter_registros(linhas)
+        return {
+            "tag": tag,
+            "granularidade": granularidade,
+            "pontos": pontos,
+            "uso_total": round(sum(p["uso"] or 0 for p in pontos), 2)
+        }
+
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Erro ao obter histórico do equipamento {tag}: {e}")
+        raise HTTPException(status_code=500, detail="Erro interno do servidor")
+
 @app.post("/equipment/{tag}/interval")
 def update_equipment_interval(tag: str, intervalo: float):
     """Endpoint para atualizar o intervalo de manutenção de um equipamento"""
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cur = conn.cursor()
+        with transacao() as conn:
+            cur = conn.cursor()
         
-        cur.execute("""
-            UPDATE equipamentos 
-            SET intervalo = ? 
-            WHERE tag = ?
-        """, (intervalo, tag))
+            cur.execute("""
+                UPDATE equipamentos 
+                SET intervalo = ? 
+                WHERE tag = ?
+            """, (intervalo, tag))
         
-        if cur.rowcount == 0:
-            raise HTTPException(status_code=404, detail="Equipamento não encontrado")
+            if cur.rowcount == 0:
+                raise HTTPException(status_code=404, detail="Equipamento não encontrado")
         
-        conn.commit()
-        conn.close()
+            atualizar_status_equipamentos(cur, [tag])
         
         logger.info(f"Intervalo atualizado para {tag}: {intervalo}")
         return {"detail": f"Intervalo atualizado para {tag}"}
@@ -618,22 +1040,21 @@ def update_equipment_interval(tag: str, intervalo: float):
 def edit_equipment_interval(tag: str, intervalo: float):
     """Endpoint para editar o intervalo de manutenção de um equipamento"""
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cur = conn.cursor()
+        with transacao() as conn:
+            cur = conn.cursor()
         
-        # Verificar se o equipamento existe
-        cur.execute("SELECT tag FROM equipamentos WHERE tag = ?", (tag,))
-        if not cur.fetchone():
-            raise HTTPException(status_code=404, detail="Equipamento não encontrado")
+            # Verificar se o equipamento existe
+            cur.execute("SELECT tag FROM equipamentos WHERE tag = ?", (tag,))
+            if not cur.fetchone():
+                raise HTTPException(status_code=404, detail="Equipamento não encontrado")
         
-        cur.execute("""
-            UPDATE equipamentos 
-            SET intervalo = ? 
-            WHERE tag = ?
-        """, (intervalo, tag))
+            cur.execute("""
+                UPDATE equipamentos 
+                SET intervalo = ? 
+                WHERE tag = ?
+            """, (intervalo, tag))
         
-        conn.commit()
-        conn.close()
+            atualizar_status_equipamentos(cur, [tag])
         
         logger.info(f"Intervalo editado para {tag}: {intervalo}")
         return {"detail": f"Intervalo editado para {tag}"}
@@ -648,22 +1069,21 @@ def edit_equipment_interval(tag: str, intervalo: float):
 def delete_equipment_interval(tag: str):
     """Endpoint para remover o intervalo de manutenção de um equipamento"""
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cur = conn.cursor()
+        with transacao() as conn:
+            cur = conn.cursor()
         
-        # Verificar se o equipamento existe
-        cur.execute("SELECT tag FROM equipamentos WHERE tag = ?", (tag,))
-        if not cur.fetchone():
-            raise HTTPException(status_code=404, detail="Equipamento não encontrado")
+            # Verificar se o equipamento existe
+            cur.execute("SELECT tag FROM equipamentos WHERE tag = ?", (tag,))
+            if not cur.fetchone():
+                raise HTTPException(status_code=404, detail="Equipamento não encontrado")
         
-        cur.execute("""
-            UPDATE equipamentos 
-            SET intervalo = 0 
-            WHERE tag = ?
-        """, (tag,))
+            cur.execute("""
+                UPDATE equipamentos 
+                SET intervalo = 0 
+                WHERE tag = ?
+            """, (tag,))
         
-        conn.commit()
-        conn.close()
+            atualizar_status_equipamentos(cur, [tag])
         
         logger.info(f"Intervalo removido para {tag}")
         return {"detail": f"Intervalo removido para {tag}"}
@@ -690,129 +1110,208 @@ def root():
         }
     }
 
+def situacao_dados():
+    """Indica se os dados refletem a planilha atual (importação inicial concluída)"""
+    if PLANILHA is None:
+        importacao_inicial = None
+        pronto = True
+    elif job_inicial is None:
+        importacao_inicial = None
+        pronto = False
+    else:
+        importacao_inicial = {
+            "job_id": job_inicial.id,
+            "status": job_inicial.status,
+            "fase": job_inicial.fase,
+            "progresso": round(job_inicial.progresso, 1)
+        }
+        pronto = job_inicial.status == STATUS_CONCLUIDO
+
+    with transacao() as conn:
+        ultima = conn.execute("SELECT MAX(data_importacao) FROM importacoes").fetchone()[0]
+
+    return {
+        "ready": pronto,
+        "ultima_importacao": ultima,
+        "importacao_inicial": importacao_inicial
+    }
+
 @app.get("/health")
 def health():
-    """Health check endpoint"""
-    return {"status": "healthy", "timestamp": dt.datetime.now().isoformat()}
+    """Health check endpoint (liveness): responde enquanto o processo estiver de pé.
+
+    O campo ``ready`` indica se a importação inicial já terminou; até lá a API
+    serve os últimos dados gravados.
+    """
+    resposta = {"status": "healthy", "timestamp": dt.datetime.now().isoformat(),
+                "clientes_eventos": canal_eventos.conectados}
+    try:
+        resposta.update(situacao_dados())
+    except Exception as e:
+        logger.error(f"Erro ao verificar situação dos dados: {e}")
+        resposta["ready"] = False
+    return resposta
+
+@app.get("/health/ready")
+def health_ready():
+    """Readiness: 200 somente quando os dados estão atualizados, senão 503"""
+    try:
+        situacao = situacao_dados()
+    except Exception as e:
+        logger.error(f"Erro ao verificar situação dos dados: {e}")
+        raise HTTPException(status_code=503, detail="Banco de dados indisponível")
+    if not situacao["ready"]:
+        return JSONResponse(status_code=503, content={"status": "starting", **situacao})
+    return {"status": "ready", **situacao}
+
+@app.get("/metrics")
+def metrics_endpoint():
+    """Métricas do processo no formato texto do Prometheus.
+
+    Latência das requisições por rota, duração dos comandos SQL, fases e
+    linhas das importações e relatórios enviados por email. Com mais de um
+    worker do uvicorn, cada um responde só pelas suas.
+    """
+    return Response(metricas.exportar(), media_type="text/plain; version=0.0.4")
+
+@app.get("/events")
+async def fleet_events(last_event_id: str = Header(None)):
+    """Fluxo Server-Sent Events com as mudanças da frota.
+
+    Eventos: ``status_alterado`` (transições de status por tag),
+    ``novos_criticos`` (tags que passaram a VERMELHO), ``importacao_finalizada``
+    (job de importação encerrado) e ``dados_atualizados`` (qualquer gravação;
+    o cliente recarrega as telas abertas em vez de consultar periodicamente).
+    Ao reconectar, o navegador envia ``Last-Event-ID`` e recebe os eventos perdidos.
+    """
+    return StreamingResponse(
+        canal_eventos.assinar(last_event_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+FORMATOS_EXPORTACAO = {
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "csv": "text/csv",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+def _tabela_exportacao(frota: pd.DataFrame) -> pd.DataFrame:
+    """Monta a planilha 'Status Equipamentos' a partir da frota classificada"""
+    rotulos = {"SEM": "SEM INTERVALO", "VERMELHO": "CRÍTICO", "AMARELO": "ATENÇÃO", "OK": "OK"}
+    return pd.DataFrame({
+        "TAG": frota["tag"],
+        "TIPO": frota["tipo"],
+        "ÚLTIMA MANUTENÇÃO": frota["ultima_manut"],
+        "ATUAL": frota["atual"],
+        "USO DESDE MANUTENÇÃO": frota["uso"],
+        "INTERVALO": frota["intervalo"],
+        "PERCENTUAL": frota["percentual"].map("{:.1f}%".format).where(frota["intervalo"] > 0, "N/A"),
+        "STATUS": frota["status"].map(rotulos),
+        "ÚLTIMA ATUALIZAÇÃO": frota["ultima_atualizacao"].fillna("N/A").astype(str)
+    })
+
+def _resumo_exportacao(frota: pd.DataFrame) -> pd.DataFrame:
+    """Monta a planilha 'Resumo' usando a mesma classificação da planilha de status"""
+    contagem = frota["status"].value_counts()
+    return pd.DataFrame([{
+        "Status": "OK",
+        "Quantidade": int(contagem.get("OK", 0)),
+        "Descrição": "Dentro do intervalo de manutenção"
+    }, {
+        "Status": "ATENÇÃO",
+        "Quantidade": int(contagem.get("AMARELO", 0)),
+        "Descrição": "Próximo da manutenção (90% ou -20 unidades)"
+    }, {
+        "Status": "CRÍTICO",
+        "Quantidade": int(contagem.get("VERMELHO", 0)),
+        "Descrição": "Acima do intervalo de manutenção"
+    }, {
+        "Status": "SEM INTERVALO",
+        "Quantidade": int(contagem.get("SEM", 0)),
+        "Descrição": "Intervalo não definido"
+    }])
+
+def _gerar_xlsx(tabela: pd.DataFrame, resumo: pd.DataFrame) -> io.BytesIO:
+    """Grava o Excel em memória com o openpyxl em modo write-only"""
+    wb = Workbook(write_only=True)
+    for nome, df in (("Status Equipamentos", tabela), ("Resumo", resumo)):
+        ws = wb.create_sheet(nome)
+        ws.append(list(df.columns))
+        for linha in df.itertuples(index=False, name=None):
+            ws.append(list(linha))
+    buffer = io.BytesIO()
+    wb.save(buffer)
+    buffer.seek(0)
+    return buffer
+
+def _gerar_csv(tabela: pd.DataFrame, tamanho_lote: int = 5000):
+    """Gera o CSV em blocos, sem montar o arquivo inteiro em memória"""
+    yield "\ufeff"  # BOM para o Excel reconhecer UTF-8
+    for inicio in range(0, len(tabela), tamanho_lote):
+        yield tabela.iloc[inicio:inicio + tamanho_lote].to_csv(
+            index=False, sep=";", header=(inicio == 0))
+    if tabela.empty:
+        yield tabela.to_csv(index=False, sep=";")
+
+def _blocos(buffer: io.BytesIO, tamanho: int = 64 * 1024):
+    while True:
+        bloco = buffer.read(tamanho)
+        if not bloco:
+            break
+        yield bloco
 
 @app.get("/export")
-def export_dashboard():
-    """Endpoint para exportar dados do dashboard em Excel"""
+def export_dashboard(formato: str = "xlsx"):
+    """Endpoint para exportar dados do dashboard em Excel, CSV ou Parquet"""
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cur = conn.cursor()
+        if formato not in FORMATOS_EXPORTACAO:
+            raise HTTPException(status_code=400, detail=f"Formato inválido. Use: {', '.join(FORMATOS_EXPORTACAO)}")
         
-        # Buscar dados completos
-        q = cur.execute("""
-            SELECT e.tag, e.tipo, e.intervalo, e.ultima_manut,
-                   MAX(l.h_final) AS atual,
-                   MAX(l.data) AS ultima_atualizacao
-            FROM equipamentos e
-            LEFT JOIN lancamentos l ON l.tag = e.tag
-            GROUP BY e.tag
-            ORDER BY e.tag
-        """)
+        # Uma única classificação alimenta a planilha de status e o resumo
+        frota = carregar_frota()
+        tabela = _tabela_exportacao(frota)
         
-        # Criar DataFrame
-        data = []
-        for tag, tipo, intv, ult, atual, ult_data in q.fetchall():
-            intv = intv or 0
-            ultima_manut = ult or 0
-            atual_valor = atual if atual is not None else ultima_manut
-            uso = atual_valor - ultima_manut
-            percentual = (uso / intv * 100) if intv > 0 else 0
-            
-            # Determinar status
-            if intv == 0:
-                status = "SEM INTERVALO"
-            elif uso >= intv:
-                status = "CRÍTICO"
-            elif uso >= max(intv * 0.9, intv - 20):
-                status = "ATENÇÃO"
-            else:
-                status = "OK"
-            
-            data.append({
-                "TAG": tag,
-                "TIPO": tipo,
-                "ÚLTIMA MANUTENÇÃO": ultima_manut,
-                "ATUAL": atual_valor,
-                "USO DESDE MANUTENÇÃO": uso,
-                "INTERVALO": intv,
-                "PERCENTUAL": f"{percentual:.1f}%" if intv > 0 else "N/A",
-                "STATUS": status,
-                "ÚLTIMA ATUALIZAÇÃO": str(ult_data) if ult_data else "N/A"
-            })
-        
-        conn.close()
-        
-        # Criar Excel
-        df = pd.DataFrame(data)
-        
-        # Criar arquivo temporário
         timestamp = dt.datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"fleet_care_status_{timestamp}.xlsx"
-        filepath = f"/tmp/{filename}"
+        filename = f"fleet_care_status_{timestamp}.{formato}"
         
-        with pd.ExcelWriter(filepath, engine='openpyxl') as writer:
-            df.to_excel(writer, sheet_name='Status Equipamentos', index=False)
-            
-            # Adicionar resumo
-            resumo = resumo_dashboard()
-            resumo_df = pd.DataFrame([{
-                "Status": "OK",
-                "Quantidade": resumo["OK"],
-                "Descrição": "Dentro do intervalo de manutenção"
-            }, {
-                "Status": "ATENÇÃO", 
-                "Quantidade": resumo["AMARELO"],
-                "Descrição": "Próximo da manutenção (90% ou -20 unidades)"
-            }, {
-                "Status": "CRÍTICO",
-                "Quantidade": resumo["VERMELHO"], 
-                "Descrição": "Acima do intervalo de manutenção"
-            }, {
-                "Status": "SEM INTERVALO",
-                "Quantidade": resumo["SEM"],
-                "Descrição": "Intervalo não definido"
-            }])
-            
-            resumo_df.to_excel(writer, sheet_name='Resumo', index=False)
-        
-        # Ler arquivo e retornar
-        with open(filepath, 'rb') as f:
-            content = f.read()
-        
-        # Limpar arquivo temporário
-        os.remove(filepath)
-        
-        from fastapi.responses import Response
-        return Response(
-            content=content,
-            media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        if formato == "xlsx":
+            conteudo = _blocos(_gerar_xlsx(tabela, _resumo_exportacao(frota)))
+        elif formato == "csv":
+            conteudo = _gerar_csv(tabela)
+        else:
+            buffer = io.BytesIO()
+            try:
+                tabela.to_parquet(buffer, index=False)
+            except ImportError:
+                raise HTTPException(status_code=400, detail="Exportação em Parquet requer o pacote pyarrow")
+            buffer.seek(0)
+            conteudo = _blocos(buffer)
+        
+        return StreamingResponse(
+            conteudo,
+            media_type=FORMATOS_EXPORTACAO[formato],
             headers={"Content-Disposition": f"attachment; filename={filename}"}
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Erro ao exportar dashboard: {e}")
         raise HTTPException(status_code=500, detail="Erro interno do servidor")
 
 @app.get("/dashboard/tags")
-def get_all_tags():
+async def get_all_tags():
     """Endpoint para obter todas as TAGs reconhecidas pelo sistema"""
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cur = conn.cursor()
-        
         # Buscar todas as TAGs ordenadas
-        cur.execute("""
+        linhas = await consultar("""
             SELECT DISTINCT tag 
             FROM equipamentos 
             ORDER BY tag
         """)
-        
-        tags = [row[0] for row in cur.fetchall()]
-        conn.close()
+
+        tags = [row[0] for row in linhas]
         
         return {
             "total_tags": len(tags),
@@ -824,112 +1323,120 @@ def get_all_tags():
         logger.error(f"Erro ao obter TAGs: {e}")
         raise HTTPException(status_code=500, detail="Erro interno do servidor")
 
+def _alertas_frota(frota: pd.DataFrame) -> dict:
+    """Listas de alertas e estatísticas da frota já classificada"""
+    # Alertas críticos (VERMELHO) e próximos da manutenção (AMARELO)
+    alertas_criticos = para_registros(
+        frota[frota["status"] == STATUS_VERMELHO],
+        ["tag", "tipo", "uso", "intervalo", "percentual", "ultima_atualizacao"])
+    proximos_manutencao = para_registros(
+        frota[frota["status"] == STATUS_AMARELO],
+        ["tag", "tipo", "uso", "intervalo", "percentual", "dias_restantes"])
+    
+    # Sem atualização recente (>7 dias)
+    sem_atualizacao = para_registros(
+        frota[frota["dias_sem_atualizacao"] > DIAS_SEM_ATUALIZACAO],
+        ["tag", "tipo", "dias_sem_atualizacao", "ultima_atualizacao"])
+    
+    km = frota["tipo"] == "KM"
+    total_kms = float(frota.loc[km, "atual"].sum())
+    total_horimetros = float(frota.loc[~km, "atual"].sum())
+    
+    return {
+        "alertas_criticos": alertas_criticos,
+        "proximos_manutencao": proximos_manutencao,
+        "sem_atualizacao": sem_atualizacao,
+        "estatisticas": {
+            "total_equipamentos": len(frota),
+            "total_horimetros": total_horimetros,
+            "total_kms": total_kms,
+            "equipamentos_criticos": len(alertas_criticos),
+            "proximos_manutencao": len(proximos_manutencao),
+            "sem_atualizacao_recente": len(sem_atualizacao)
+        }
+    }
+
 @app.get("/dashboard/alerts")
+@cache_respostas.em_cache("dashboard_alerts")
 def get_dashboard_alerts():
     """Endpoint para obter alertas críticos e estatísticas detalhadas"""
     try:
-        conn = sqlite3.connect(DB_PATH)
+        return _alertas_frota(carregar_frota())
+    except Exception as e:
+        logger.error(f"Erro ao obter alertas do dashboard: {e}")
+        raise HTTPException(status_code=500, detail="Erro interno do servidor")
+
+# Partes do snapshot; as que dependem da frota são calculadas a partir de uma única leitura
+CAMPOS_SNAPSHOT = ("resumo", "alertas_criticos", "proximos_manutencao", "sem_atualizacao",
+                   "estatisticas", "equipamentos", "manutencoes_recentes")
+
+def _resumo_frota(frota: pd.DataFrame) -> dict:
+    """Mesmo formato de resumo_dashboard, calculado a partir da frota já carregada"""
+    contagem = frota["status"].value_counts()
+    status = {s: int(contagem.get(s, 0)) for s in ("OK", "AMARELO", "VERMELHO", "SEM")}
+    tem_dados = frota["ultima_atualizacao"].notna().any()
+    agora = dt.datetime.now()
+    return {**status, "ultima_atualizacao": agora.strftime("%d/%m/%Y às %H:%M") if tem_dados else None}
+
+def _manutencoes_recentes(limite: int) -> list:
+    with transacao() as conn:
         cur = conn.cursor()
+        cur.execute("""
+            SELECT m.id, m.tag, m.tipo_manutencao, m.data_agendada, m.status, f.nome
+            FROM manutencoes m
+            LEFT JOIN fornecedores f ON m.fornecedor_id = f.id
+            ORDER BY m.data_agendada DESC, m.id DESC
+            LIMIT ?
+        """, (limite,))
+        return [{
+            "id": row[0],
+            "tag": row[1],
+            "tipo_manutencao": row[2],
+            "data_agendada": row[3],
+            "status": row[4],
+            "fornecedor_nome": row[5]
+        } for row in cur.fetchall()]
+
+@app.get("/dashboard/snapshot")
+@cache_respostas.em_cache("dashboard_snapshot")
+def dashboard_snapshot(campos: str = None, limite_manutencoes: int = 20):
+    """Tudo o que a visão geral exibe em uma única resposta.
+
+    A frota é carregada e classificada uma vez para resumo, alertas e lista de
+    equipamentos. ``campos`` (separados por vírgula) limita a resposta às
+    partes pedidas: resumo, alertas_criticos, proximos_manutencao,
+    sem_atualizacao, estatisticas, equipamentos e manutencoes_recentes.
+    """
+    try:
+        pedidos = [c.strip() for c in campos.split(",") if c.strip()] if campos else list(CAMPOS_SNAPSHOT)
+        invalidos = [c for c in pedidos if c not in CAMPOS_SNAPSHOT]
+        if invalidos:
+            raise HTTPException(status_code=400, detail=f"Campos inválidos: {', '.join(invalidos)}")
+        if not 1 <= limite_manutencoes <= LIMITE_MAXIMO:
+            raise HTTPException(status_code=400, detail=f"limite_manutencoes deve estar entre 1 e {LIMITE_MAXIMO}")
+
+        snapshot = {}
+        if any(c != "manutencoes_recentes" for c in pedidos):
+            frota = carregar_frota()
+            if "resumo" in pedidos:
+                snapshot["resumo"] = _resumo_frota(frota)
+            if any(c in pedidos for c in ("alertas_criticos", "proximos_manutencao", "sem_atualizacao", "estatisticas")):
+                alertas = _alertas_frota(frota)
+                snapshot.update({c: alertas[c] for c in alertas if c in pedidos})
+            if "equipamentos" in pedidos:
+                snapshot["equipamentos"] = para_registros(frota, [
+                    "tag", "tipo", "intervalo", "ultima_manut", "atual", "ultima_atualizacao",
+                    "uso", "percentual", "status", "dias_restantes", "dias_sem_atualizacao"])
+        if "manutencoes_recentes" in pedidos:
+            snapshot["manutencoes_recentes"] = _manutencoes_recentes(limite_manutencoes)
+
+        snapshot["gerado_em"] = dt.datetime.now().isoformat()
+        return snapshot
         
-        # Buscar dados completos
-        q = cur.execute("""
-            SELECT e.tag, e.tipo, e.intervalo, e.ultima_manut,
-                   MAX(l.h_final) AS atual,
-                   MAX(l.data) AS ultima_atualizacao
-            FROM equipamentos e
-            LEFT JOIN lancamentos l ON l.tag = e.tag
-            GROUP BY e.tag
-        """)
-        
-        equipamentos = []
-        alertas_criticos = []
-        proximos_manutencao = []
-        sem_atualizacao = []
-        total_horimetros = 0
-        total_kms = 0
-        
-        hoje = dt.date.today()
-        
-        for tag, tipo, intv, ult, atual, ult_data in q.fetchall():
-            intv = intv or 0
-            ultima_manut = ult or 0
-            atual_valor = atual if atual is not None else ultima_manut
-            uso = atual_valor - ultima_manut
-            percentual = (uso / intv * 100) if intv > 0 else 0
-            
-            # Acumular totais
-            if tipo == "KM":
-                total_kms += atual_valor
-            else:
-                total_horimetros += atual_valor
-            
-            # Verificar alertas críticos (100% ou mais)
-            if intv > 0 and percentual >= 100:
-                alertas_criticos.append({
-                    "tag": tag,
-                    "tipo": tipo,
-                    "uso": uso,
-                    "intervalo": intv,
-                    "percentual": percentual,
-                    "ultima_atualizacao": str(ult_data) if ult_data else None
-                })
-            
-            # Verificar próximos da manutenção (90-99%)
-            elif intv > 0 and percentual >= 90:
-                proximos_manutencao.append({
-                    "tag": tag,
-                    "tipo": tipo,
-                    "uso": uso,
-                    "intervalo": intv,
-                    "percentual": percentual,
-                    "dias_restantes": max(0, int((intv - uso) / (8 if tipo == "HORAS" else 100)))
-                })
-            
-            # Verificar sem atualização recente (>7 dias)
-            if ult_data:
-                # Converter string para date se necessário
-                if isinstance(ult_data, str):
-                    ult_data_date = dt.datetime.strptime(ult_data, '%Y-%m-%d').date()
-                else:
-                    ult_data_date = ult_data
-                
-                if (hoje - ult_data_date).days > 7:
-                    sem_atualizacao.append({
-                        "tag": tag,
-                        "tipo": tipo,
-                        "dias_sem_atualizacao": (hoje - ult_data_date).days,
-                        "ultima_atualizacao": str(ult_data)
-                    })
-            
-            equipamentos.append({
-                "tag": tag,
-                "tipo": tipo,
-                "intervalo": intv,
-                "ultima_manut": ult or 0,
-                "atual": atual or ult or 0,
-                "uso": uso,
-                "percentual": percentual,
-                "ultima_atualizacao": str(ult_data) if ult_data else None
-            })
-        
-        conn.close()
-        
-        return {
-            "alertas_criticos": alertas_criticos,
-            "proximos_manutencao": proximos_manutencao,
-            "sem_atualizacao": sem_atualizacao,
-            "estatisticas": {
-                "total_equipamentos": len(equipamentos),
-                "total_horimetros": total_horimetros,
-                "total_kms": total_kms,
-                "equipamentos_criticos": len(alertas_criticos),
-                "proximos_manutencao": len(proximos_manutencao),
-                "sem_atualizacao_recente": len(sem_atualizacao)
-            }
-        }
-        
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Erro ao obter alertas do dashboard: {e}")
+        logger.error(f"Erro ao gerar snapshot do dashboard: {e}")
         raise HTTPException(status_code=500, detail="Erro interno do servidor")
 
 @app.post("/send-report")
@@ -944,24 +1451,57 @@ def send_report_manual(tasks: BackgroundTasks):
 
 # ===== ENDPOINTS DE GESTÃO DE MANUTENÇÕES =====
 
+# Chaves de ordenação aceitas: nome -> coluna (o desempate é sempre o id)
+ORDENACAO_MANUTENCOES = {"data": "m.data_agendada", "id": "m.id"}
+
 @app.get("/maintenance")
-def get_maintenance_list():
-    """Lista todas as manutenções"""
+async def get_maintenance_list(tag: str = None, status: str = None, data_inicio: str = None, data_fim: str = None,
+                               fornecedor_id: int = None, ordenar: str = "data", direcao: str = "desc",
+                               limit: int = None, cursor: str = None):
+    """Lista as manutenções, opcionalmente filtradas e paginadas.
+
+    Filtros: ``tag``, ``status``, ``data_inicio``/``data_fim`` (data agendada,
+    AAAA-MM-DD, inclusive) e ``fornecedor_id``. Com ``limit``/``cursor`` a resposta
+    traz também ``proximo_cursor`` (None na última página) e ``limite``.
+    """
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cur = conn.cursor()
-        
-        cur.execute("""
+        if ordenar not in ORDENACAO_MANUTENCOES or direcao not in ("asc", "desc"):
+            raise HTTPException(status_code=400, detail="Ordenação inválida")
+        paginado = limit is not None or cursor is not None
+
+        condicoes, params = [], []
+        if tag:
+            condicoes.append("m.tag = ?")
+            params.append(tag.strip().upper())
+        if status:
+            condicoes.append("m.status = ?")
+            params.append(status.strip().upper())
+        if data_inicio:
+            condicoes.append("m.data_agendada >= ?")
+            params.append(dt.date.fromisoformat(data_inicio).isoformat())
+        if data_fim:
+            condicoes.append("m.data_agendada < ?")
+            params.append((dt.date.fromisoformat(data_fim) + dt.timedelta(days=1)).isoformat())
+        if fornecedor_id is not None:
+            condicoes.append("m.fornecedor_id = ?")
+            params.append(fornecedor_id)
+        ordem = ordenacao_keyset(condicoes, params, ordenar, ORDENACAO_MANUTENCOES[ordenar], "m.id",
+                                 direcao == "desc", cursor if paginado else None)
+        limite = validar_limite(limit) if paginado else None
+
+        linhas = await consultar(f"""
             SELECT m.id, m.tag, m.tipo_manutencao, m.data_agendada, m.data_realizada,
                    m.valor_orcado, m.valor_real, m.status, m.observacoes,
                    f.nome as fornecedor_nome, f.telefone as fornecedor_telefone
             FROM manutencoes m
             LEFT JOIN fornecedores f ON m.fornecedor_id = f.id
-            ORDER BY m.data_agendada DESC, m.id DESC
-        """)
-        
+            {"WHERE " + " AND ".join(condicoes) if condicoes else ""}
+            {ordem}
+            {"LIMIT ?" if paginado else ""}
+        """, params + ([limite + 1] if paginado else []))
+
         manutencoes = []
-        for row in cur.fetchall():
+        for row in linhas:
             manutencoes.append({
                 "id": row[0],
                 "tag": row[1],
@@ -975,10 +1515,22 @@ def get_maintenance_list():
                 "fornecedor_nome": row[9],
                 "fornecedor_telefone": row[10]
             })
+
+        if not paginado:
+            return {"manutencoes": manutencoes}
+
+        proximo = None
+        if len(manutencoes) > limite:
+            manutencoes = manutencoes[:limite]
+            ultima = manutencoes[-1]
+            valor = ultima["data_agendada"] if ordenar == "data" else ultima["id"]
+            proximo = codificar_cursor(ordenar, direcao, valor, ultima["id"])
+        return {"manutencoes": manutencoes, "proximo_cursor": proximo, "limite": limite}
         
-        conn.close()
-        return {"manutencoes": manutencoes}
-        
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Erro ao listar manutenções: {e}")
         raise HTTPException(status_code=500, detail="Erro interno do servidor")
@@ -987,41 +1539,36 @@ def get_maintenance_list():
 def create_maintenance(manutencao: dict):
     """Cria uma nova manutenção"""
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cur = conn.cursor()
+        with transacao() as conn:
+            cur = conn.cursor()
         
-        cur.execute("""
-            INSERT INTO manutencoes (tag, tipo_manutencao, data_agendada, fornecedor_id, 
-                                   valor_orcado, observacoes, status)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-        """, (
-            manutencao["tag"],
-            manutencao["tipo_manutencao"],
-            manutencao.get("data_agendada"),
-            manutencao.get("fornecedor_id"),
-            manutencao.get("valor_orcado"),
-            manutencao.get("observacoes"),
-            manutencao.get("status", "AGENDADA")
-        ))
-        
-        manutencao_id = cur.lastrowid
-        
-        # Criar agendamento se data_agendada fornecida
-        if manutencao.get("data_agendada"):
-            cur.execute("""
-                INSERT INTO agendamentos (manutencao_id, data_hora, duracao_estimada, 
-                                        local, responsavel)
-                VALUES (?, ?, ?, ?, ?)
+            manutencao_id = armazenamento.inserir_retornando_id(cur, """
+                INSERT INTO manutencoes (tag, tipo_manutencao, data_agendada, fornecedor_id, 
+                                       valor_orcado, observacoes, status)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
             """, (
-                manutencao_id,
-                manutencao["data_agendada"] + " 08:00:00",  # Horário padrão
-                manutencao.get("duracao_estimada", 60),
-                manutencao.get("local", "Oficina"),
-                manutencao.get("responsavel")
+                manutencao["tag"],
+                manutencao["tipo_manutencao"],
+                manutencao.get("data_agendada"),
+                manutencao.get("fornecedor_id"),
+                manutencao.get("valor_orcado"),
+                manutencao.get("observacoes"),
+                manutencao.get("status", "AGENDADA")
             ))
         
-        conn.commit()
-        conn.close()
+            # Criar agendamento se data_agendada fornecida
+            if manutencao.get("data_agendada"):
+                cur.execute("""
+                    INSERT INTO agendamentos (manutencao_id, data_hora, duracao_estimada, 
+                                            local, responsavel)
+                    VALUES (?, ?, ?, ?, ?)
+                """, (
+                    manutencao_id,
+                    manutencao["data_agendada"] + " 08:00:00",  # Horário padrão
+                    manutencao.get("duracao_estimada", 60),
+                    manutencao.get("local", "Oficina"),
+                    manutencao.get("responsavel")
+                ))
         
         return {"id": manutencao_id, "message": "Manutenção criada com sucesso"}
         
@@ -1029,35 +1576,115 @@ def create_maintenance(manutencao: dict):
         logger.error(f"Erro ao criar manutenção: {e}")
         raise HTTPException(status_code=500, detail="Erro interno do servidor")
 
+# Declarada antes de /maintenance/{manutencao_id} para não ser capturada por ela
+@app.get("/maintenance/schedule")
+@cache_respostas.em_cache("maintenance_schedule")
+def get_maintenance_schedule():
+    """Obtém agenda de manutenções"""
+    try:
+        with transacao() as conn:
+            cur = conn.cursor()
+        
+            cur.execute("""
+                SELECT m.id, m.tag, m.tipo_manutencao, m.data_agendada, m.status,
+                       f.nome as fornecedor_nome, a.data_hora, a.local, a.responsavel
+                FROM manutencoes m
+                LEFT JOIN fornecedores f ON m.fornecedor_id = f.id
+                LEFT JOIN agendamentos a ON m.id = a.manutencao_id
+                WHERE m.data_agendada IS NOT NULL
+                ORDER BY m.data_agendada ASC, m.id ASC
+            """)
+        
+            agenda = []
+            for row in cur.fetchall():
+                agenda.append({
+                    "id": row[0],
+                    "tag": row[1],
+                    "tipo_manutencao": row[2],
+                    "data_agendada": row[3],
+                    "status": row[4],
+                    "fornecedor_nome": row[5],
+                    "data_hora": row[6],
+                    "local": row[7],
+                    "responsavel": row[8]
+                })
+        
+        return {"agenda": agenda}
+        
+    except Exception as e:
+        logger.error(f"Erro ao obter agenda: {e}")
+        raise HTTPException(status_code=500, detail="Erro interno do servidor")
+
+@app.get("/maintenance/predictions")
+@cache_respostas.em_cache("maintenance_predictions")
+def get_maintenance_predictions(horizonte_dias: int = None, tag: str = None):
+    """Previsão da próxima manutenção de cada equipamento com intervalo definido.
+
+    A data prevista projeta o uso restante até o intervalo com a taxa de uso
+    recente do equipamento (``origem_taxa`` = historico) ou, sem histórico
+    suficiente, com o uso diário padrão do tipo (``padrao``). Ordenada pela
+    data prevista; ``horizonte_dias`` limita às previstas até N dias a partir de hoje.
+    """
+    try:
+        if horizonte_dias is not None and horizonte_dias < 0:
+            raise HTTPException(status_code=400, detail="horizonte_dias não pode ser negativo")
+
+        frota = carregar_frota()
+        frota = frota[frota["intervalo"] > 0]
+        if tag:
+            frota = frota[frota["tag"] == tag.strip().upper()]
+        if horizonte_dias is not None:
+            # sem previsão (equipamento parado antes de vencer) fica fora do horizonte
+            frota = frota[(frota["dias_restantes"] <= horizonte_dias).fillna(False)]
+
+        taxas = previsor_uso.taxas()
+        dias = frota["dias_restantes"].astype(float)
+        frota = frota.assign(
+            taxa_uso=frota["taxa_uso"].round(2),
+            origem_taxa=frota["tag"].map(taxas["taxa_diaria"]).notna().map({True: "historico", False: "padrao"}),
+            dias_amostra=frota["tag"].map(taxas["dias_amostra"]),
+            data_prevista=(pd.Timestamp(dt.date.today()) + pd.to_timedelta(dias, unit="D")).dt.strftime("%Y-%m-%d"),
+        ).sort_values(["dias_restantes", "tag"], na_position="last")
+
+        return {
+            "previsoes": para_registros(frota, [
+                "tag", "tipo", "atual", "uso", "intervalo", "percentual", "status", "taxa_uso",
+                "origem_taxa", "dias_amostra", "dias_restantes", "data_prevista", "ultima_atualizacao"]),
+            "janela_dias": JANELA_DIAS,
+            "gerado_em": dt.datetime.now().isoformat()
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Erro ao calcular previsões de manutenção: {e}")
+        raise HTTPException(status_code=500, detail="Erro interno do servidor")
+
 @app.get("/maintenance/{manutencao_id}")
-def get_maintenance_detail(manutencao_id: int):
+async def get_maintenance_detail(manutencao_id: int):
     """Obtém detalhes de uma manutenção específica"""
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cur = conn.cursor()
-        
         # Buscar manutenção
-        cur.execute("""
+        manutencao = await consultar_um("""
             SELECT m.*, f.nome as fornecedor_nome, f.telefone, f.email, f.endereco
             FROM manutencoes m
             LEFT JOIN fornecedores f ON m.fornecedor_id = f.id
             WHERE m.id = ?
         """, (manutencao_id,))
-        
-        manutencao = cur.fetchone()
+
         if not manutencao:
             raise HTTPException(status_code=404, detail="Manutenção não encontrada")
-        
+
         # Buscar checklist
-        cur.execute("""
+        linhas = await consultar("""
             SELECT id, item, status, observacao, responsavel, data_conclusao
             FROM checklists_manutencao
             WHERE manutencao_id = ?
             ORDER BY id
         """, (manutencao_id,))
-        
+
         checklist = []
-        for row in cur.fetchall():
+        for row in linhas:
             checklist.append({
                 "id": row[0],
                 "item": row[1],
@@ -1066,17 +1693,17 @@ def get_maintenance_detail(manutencao_id: int):
                 "responsavel": row[4],
                 "data_conclusao": row[5]
             })
-        
+
         # Buscar agendamentos
-        cur.execute("""
+        linhas = await consultar("""
             SELECT id, data_hora, duracao_estimada, local, responsavel, status
             FROM agendamentos
             WHERE manutencao_id = ?
             ORDER BY data_hora
         """, (manutencao_id,))
-        
+
         agendamentos = []
-        for row in cur.fetchall():
+        for row in linhas:
             agendamentos.append({
                 "id": row[0],
                 "data_hora": row[1],
@@ -1085,9 +1712,7 @@ def get_maintenance_detail(manutencao_id: int):
                 "responsavel": row[4],
                 "status": row[5]
             })
-        
-        conn.close()
-        
+
         return {
             "manutencao": {
                 "id": manutencao[0],
@@ -1111,6 +1736,8 @@ def get_maintenance_detail(manutencao_id: int):
             "agendamentos": agendamentos
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Erro ao obter detalhes da manutenção: {e}")
         raise HTTPException(status_code=500, detail="Erro interno do servidor")
@@ -1119,30 +1746,28 @@ def get_maintenance_detail(manutencao_id: int):
 def update_maintenance(manutencao_id: int, manutencao: dict):
     """Atualiza uma manutenção"""
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cur = conn.cursor()
-        
-        # Verificar se existe
-        cur.execute("SELECT id FROM manutencoes WHERE id = ?", (manutencao_id,))
-        if not cur.fetchone():
-            raise HTTPException(status_code=404, detail="Manutenção não encontrada")
+        with transacao() as conn:
+            cur = conn.cursor()
+        
+            # Verificar se existe
+            cur.execute("SELECT id FROM manutencoes WHERE id = ?", (manutencao_id,))
+            if not cur.fetchone():
+                raise HTTPException(status_code=404, detail="Manutenção não encontrada")
+        
+            # Atualizar campos fornecidos
+            campos = []
+            valores = []
+            for campo, valor in manutencao.items():
+                if campo in ["tag", "tipo_manutencao", "data_agendada", "data_realizada", 
+                            "fornecedor_id", "valor_orcado", "valor_real", "status", 
+                            "observacoes", "proxima_manutencao", "horas_km_manutencao"]:
+                    campos.append(f"{campo} = ?")
+                    valores.append(valor)
+        
+            if campos:
+                valores.append(manutencao_id)
+                cur.execute(f"UPDATE manutencoes SET {', '.join(campos)} WHERE id = ?", valores)
         
-        # Atualizar campos fornecidos
-        campos = []
-        valores = []
-        for campo, valor in manutencao.items():
-            if campo in ["tag", "tipo_manutencao", "data_agendada", "data_realizada", 
-                        "fornecedor_id", "valor_orcado", "valor_real", "status", 
-                        "observacoes", "proxima_manutencao", "horas_km_manutencao"]:
-                campos.append(f"{campo} = ?")
-                valores.append(valor)
-        
-        if campos:
-            valores.append(manutencao_id)
-            cur.execute(f"UPDATE manutencoes SET {', '.join(campos)} WHERE id = ?", valores)
-            conn.commit()
-        
-        conn.close()
         return {"message": "Manutenção atualizada com sucesso"}
         
     except Exception as e:
@@ -1150,20 +1775,17 @@ def update_maintenance(manutencao_id: int, manutencao: dict):
         raise HTTPException(status_code=500, detail="Erro interno do servidor")
 
 @app.get("/suppliers")
-def get_suppliers():
+async def get_suppliers():
     """Lista todos os fornecedores"""
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cur = conn.cursor()
-        
-        cur.execute("""
+        linhas = await consultar("""
             SELECT id, nome, cnpj, telefone, email, endereco, especialidade, ativo
             FROM fornecedores
             ORDER BY nome
         """)
-        
+
         fornecedores = []
-        for row in cur.fetchall():
+        for row in linhas:
             fornecedores.append({
                 "id": row[0],
                 "nome": row[1],
@@ -1174,8 +1796,7 @@ def get_suppliers():
                 "especialidade": row[6],
                 "ativo": bool(row[7])
             })
-        
-        conn.close()
+
         return {"fornecedores": fornecedores}
         
     except Exception as e:
@@ -1186,24 +1807,20 @@ def get_suppliers():
 def create_supplier(fornecedor: dict):
     """Cria um novo fornecedor"""
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cur = conn.cursor()
+        with transacao() as conn:
+            cur = conn.cursor()
         
-        cur.execute("""
-            INSERT INTO fornecedores (nome, cnpj, telefone, email, endereco, especialidade)
-            VALUES (?, ?, ?, ?, ?, ?)
-        """, (
-            fornecedor["nome"],
-            fornecedor.get("cnpj"),
-            fornecedor.get("telefone"),
-            fornecedor.get("email"),
-            fornecedor.get("endereco"),
-            fornecedor.get("especialidade")
-        ))
-        
-        fornecedor_id = cur.lastrowid
-        conn.commit()
-        conn.close()
+            fornecedor_id = armazenamento.inserir_retornando_id(cur, """
+                INSERT INTO fornecedores (nome, cnpj, telefone, email, endereco, especialidade)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, (
+                fornecedor["nome"],
+                fornecedor.get("cnpj"),
+                fornecedor.get("telefone"),
+                fornecedor.get("email"),
+                fornecedor.get("endereco"),
+                fornecedor.get("especialidade")
+            ))
         
         return {"id": fornecedor_id, "message": "Fornecedor criado com sucesso"}
         
@@ -1215,16 +1832,13 @@ def create_supplier(fornecedor: dict):
 def add_checklist_item(manutencao_id: int, item: dict):
     """Adiciona item ao checklist de uma manutenção"""
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cur = conn.cursor()
-        
-        cur.execute("""
-            INSERT INTO checklists_manutencao (manutencao_id, item, responsavel)
-            VALUES (?, ?, ?)
-        """, (manutencao_id, item["item"], item.get("responsavel")))
+        with transacao() as conn:
+            cur = conn.cursor()
         
-        conn.commit()
-        conn.close()
+            cur.execute("""
+                INSERT INTO checklists_manutencao (manutencao_id, item, responsavel)
+                VALUES (?, ?, ?)
+            """, (manutencao_id, item["item"], item.get("responsavel")))
         
         return {"message": "Item adicionado ao checklist"}
         
@@ -1236,23 +1850,20 @@ def add_checklist_item(manutencao_id: int, item: dict):
 def update_checklist_item(item_id: int, item: dict):
     """Atualiza item do checklist"""
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cur = conn.cursor()
+        with transacao() as conn:
+            cur = conn.cursor()
         
-        cur.execute("""
-            UPDATE checklists_manutencao 
-            SET status = ?, observacao = ?, responsavel = ?, data_conclusao = ?
-            WHERE id = ?
-        """, (
-            item.get("status", "PENDENTE"),
-            item.get("observacao"),
-            item.get("responsavel"),
-            item.get("data_conclusao"),
-            item_id
-        ))
-        
-        conn.commit()
-        conn.close()
+            cur.execute("""
+                UPDATE checklists_manutencao 
+                SET status = ?, observacao = ?, responsavel = ?, data_conclusao = ?
+                WHERE id = ?
+            """, (
+                item.get("status", "PENDENTE"),
+                item.get("observacao"),
+                item.get("responsavel"),
+                item.get("data_conclusao"),
+                item_id
+            ))
         
         return {"message": "Item do checklist atualizado"}
         
@@ -1260,70 +1871,30 @@ def update_checklist_item(item_id: int, item: dict):
         logger.error(f"Erro ao atualizar item do checklist: {e}")
         raise HTTPException(status_code=500, detail="Erro interno do servidor")
 
-@app.get("/maintenance/schedule")
-def get_maintenance_schedule():
-    """Obtém agenda de manutenções"""
-    try:
-        conn = sqlite3.connect(DB_PATH)
-        cur = conn.cursor()
-        
-        cur.execute("""
-            SELECT m.id, m.tag, m.tipo_manutencao, m.data_agendada, m.status,
-                   f.nome as fornecedor_nome, a.data_hora, a.local, a.responsavel
-            FROM manutencoes m
-            LEFT JOIN fornecedores f ON m.fornecedor_id = f.id
-            LEFT JOIN agendamentos a ON m.id = a.manutencao_id
-            WHERE m.data_agendada IS NOT NULL
-            ORDER BY m.data_agendada ASC
-        """)
-        
-        agenda = []
-        for row in cur.fetchall():
-            agenda.append({
-                "id": row[0],
-                "tag": row[1],
-                "tipo_manutencao": row[2],
-                "data_agendada": row[3],
-                "status": row[4],
-                "fornecedor_nome": row[5],
-                "data_hora": row[6],
-                "local": row[7],
-                "responsavel": row[8]
-            })
-        
-        conn.close()
-        return {"agenda": agenda}
-        
-    except Exception as e:
-        logger.error(f"Erro ao obter agenda: {e}")
-        raise HTTPException(status_code=500, detail="Erro interno do servidor")
-
 @app.put("/suppliers/{supplier_id}")
 def update_supplier(supplier_id: int, fornecedor: dict):
     """Atualiza um fornecedor"""
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cur = conn.cursor()
+        with transacao() as conn:
+            cur = conn.cursor()
+        
+            # Verificar se existe
+            cur.execute("SELECT id FROM fornecedores WHERE id = ?", (supplier_id,))
+            if not cur.fetchone():
+                raise HTTPException(status_code=404, detail="Fornecedor não encontrado")
+        
+            # Atualizar campos fornecidos
+            campos = []
+            valores = []
+            for campo, valor in fornecedor.items():
+                if campo in ["nome", "cnpj", "telefone", "email", "endereco", "especialidade", "ativo"]:
+                    campos.append(f"{campo} = ?")
+                    valores.append(valor)
+        
+            if campos:
+                valores.append(supplier_id)
+                cur.execute(f"UPDATE fornecedores SET {', '.join(campos)} WHERE id = ?", valores)
         
-        # Verificar se existe
-        cur.execute("SELECT id FROM fornecedores WHERE id = ?", (supplier_id,))
-        if not cur.fetchone():
-            raise HTTPException(status_code=404, detail="Fornecedor não encontrado")
-        
-        # Atualizar campos fornecidos
-        campos = []
-        valores = []
-        for campo, valor in fornecedor.items():
-            if campo in ["nome", "cnpj", "telefone", "email", "endereco", "especialidade", "ativo"]:
-                campos.append(f"{campo} = ?")
-                valores.append(valor)
-        
-        if campos:
-            valores.append(supplier_id)
-            cur.execute(f"UPDATE fornecedores SET {', '.join(campos)} WHERE id = ?", valores)
-            conn.commit()
-        
-        conn.close()
         return {"message": "Fornecedor atualizado com sucesso"}
         
     except Exception as e:
@@ -1334,22 +1905,20 @@ def update_supplier(supplier_id: int, fornecedor: dict):
 def delete_supplier(supplier_id: int):
     """Exclui um fornecedor"""
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cur = conn.cursor()
+        with transacao() as conn:
+            cur = conn.cursor()
         
-        # Verificar se existe
-        cur.execute("SELECT id FROM fornecedores WHERE id = ?", (supplier_id,))
-        if not cur.fetchone():
-            raise HTTPException(status_code=404, detail="Fornecedor não encontrado")
+            # Verificar se existe
+            cur.execute("SELECT id FROM fornecedores WHERE id = ?", (supplier_id,))
+            if not cur.fetchone():
+                raise HTTPException(status_code=404, detail="Fornecedor não encontrado")
         
-        # Verificar se está sendo usado em manutenções
-        cur.execute("SELECT COUNT(*) FROM manutencoes WHERE fornecedor_id = ?", (supplier_id,))
-        if cur.fetchone()[0] > 0:
-            raise HTTPException(status_code=400, detail="Fornecedor não pode ser excluído pois está sendo usado em manutenções")
+            # Verificar se está sendo usado em manutenções
+            cur.execute("SELECT COUNT(*) FROM manutencoes WHERE fornecedor_id = ?", (supplier_id,))
+            if cur.fetchone()[0] > 0:
+                raise HTTPException(status_code=400, detail="Fornecedor não pode ser excluído pois está sendo usado em manutenções")
         
-        cur.execute("DELETE FROM fornecedores WHERE id = ?", (supplier_id,))
-        conn.commit()
-        conn.close()
+            cur.execute("DELETE FROM fornecedores WHERE id = ?", (supplier_id,))
         
         return {"message": "Fornecedor excluído com sucesso"}
         
@@ -1361,21 +1930,18 @@ def delete_supplier(supplier_id: int):
 def delete_maintenance(manutencao_id: int):
     """Exclui uma manutenção"""
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cur = conn.cursor()
-        
-        # Verificar se existe
-        cur.execute("SELECT id FROM manutencoes WHERE id = ?", (manutencao_id,))
-        if not cur.fetchone():
-            raise HTTPException(status_code=404, detail="Manutenção não encontrada")
+        with transacao() as conn:
+            cur = conn.cursor()
         
-        # Excluir em cascata
-        cur.execute("DELETE FROM checklists_manutencao WHERE manutencao_id = ?", (manutencao_id,))
-        cur.execute("DELETE FROM agendamentos WHERE manutencao_id = ?", (manutencao_id,))
-        cur.execute("DELETE FROM manutencoes WHERE id = ?", (manutencao_id,))
+            # Verificar se existe
+            cur.execute("SELECT id FROM manutencoes WHERE id = ?", (manutencao_id,))
+            if not cur.fetchone():
+                raise HTTPException(status_code=404, detail="Manutenção não encontrada")
         
-        conn.commit()
-        conn.close()
+            # Excluir em cascata
+            cur.execute("DELETE FROM checklists_manutencao WHERE manutencao_id = ?", (manutencao_id,))
+            cur.execute("DELETE FROM agendamentos WHERE manutencao_id = ?", (manutencao_id,))
+            cur.execute("DELETE FROM manutencoes WHERE id = ?", (manutencao_id,))
         
         return {"message": "Manutenção excluída com sucesso"}
         
@@ -1387,12 +1953,10 @@ def delete_maintenance(manutencao_id: int):
 def delete_checklist_item(item_id: int):
     """Exclui item do checklist"""
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cur = conn.cursor()
+        with transacao() as conn:
+            cur = conn.cursor()
         
-        cur.execute("DELETE FROM checklists_manutencao WHERE id = ?", (item_id,))
-        conn.commit()
-        conn.close()
+            cur.execute("DELETE FROM checklists_manutencao WHERE id = ?", (item_id,))
         
         return {"message": "Item do checklist excluído"}
         
@@ -1446,37 +2010,175 @@ def test_config_connection(config: dict):
         logger.error(f"Erro ao testar conexão: {e}")
         raise HTTPException(status_code=500, detail="Erro interno do servidor")
 
-@app.post("/api/config/import")
-def import_with_config(config: dict):
-    """Endpoint para importar usando configurações específicas"""
+def _importar_com_config(config: dict, job: ImportJob = None):
+    """Baixa a planilha da origem configurada e importa a cópia temporária"""
+    importer = AdvancedImporter(config)
     try:
-        importer = AdvancedImporter(config)
+        if job is not None:
+            job.definir_fase("baixando", 0)
+        inicio = time.perf_counter()
         temp_file = importer.download_file()
-        
+        download = round(time.perf_counter() - inicio, 3)
         if not temp_file:
-            raise HTTPException(status_code=400, detail="Erro ao baixar arquivo")
-        
+            raise RuntimeError(f"Erro ao baixar arquivo ({config['importType']})")
+        resultado = importar_planilha(caminho=temp_file, job=job, origem=identificar_origem(config))
+        resultado.setdefault("tempos", {})["download"] = download
+        logger_importacao.info(f"{config['importType']}: fase download em {download:.3f}s",
+                               extra={"job": job.id if job else None, "origem": config["importType"],
+                                      "fase": "download", "segundos": download})
+        return resultado
+    finally:
+        importer.cleanup()
+
+def importar_fontes(fontes: list, forcar: bool = False, job: ImportJob = None):
+    """Importa as planilhas de várias origens (uma por site) em uma única transação.
+
+    Downloads e leituras rodam em paralelo (multi_import.baixar_e_ler); a
+    gravação segue a ordem crescente de prioridade, de modo que, com a regra
+    "replace", a origem de maior prioridade prevalece no intervalo dos
+    equipamentos e nas OS presentes em mais de uma planilha. Origens cuja
+    planilha não mudou desde a última importação delas são puladas
+    (``_planilha_ja_importada``), a menos que ``forcar`` seja verdadeiro.
+    Origens que falham são relatadas sem impedir as demais; se nenhuma puder
+    ser lida, a importação falha.
+    """
+    job = job or ImportJob("fontes")
+    inicio = time.perf_counter()
+    try:
+        baixar_e_ler(fontes, job)
+        lidas = sorted((f for f in fontes if f.dados is not None), key=lambda f: f.prioridade)
+        if not lidas:
+            raise RuntimeError("Nenhuma origem pôde ser baixada e lida")
+
+        inicio_gravacao = time.perf_counter()
+        with transacao() as conn:
+            cur = conn.cursor()
+            ultimo_id = cur.execute("SELECT COALESCE(MAX(id), 0) FROM lancamentos").fetchone()[0]
+            tags_alteradas = set()
+            sem_alteracoes = []
+            faixa = 25 / len(lidas)
+
+            for i, fonte in enumerate(lidas):
+                t = time.perf_counter()
+                if not forcar and _planilha_ja_importada(cur, fonte.origem, fonte.arquivo_hash):
+                    fonte.resultado = {"status": "sem_alteracoes", "arquivo_hash": fonte.arquivo_hash}
+                    continue
+
+                substituir = fonte.regra == "replace"
+                resultado = _novo_resultado(fonte.arquivo_hash)
+                job.definir_fase(f"lancamentos ({fonte.nome})", 40 + i * faixa)
+                total = max(1, fonte.linhas)
+                tags_alteradas |= _importar_lancamentos(cur, fonte.lotes(), total, job, resultado,
+                                                        progresso=(40 + i * faixa, 40 + (i + 1) * faixa),
+                                                        atualizar_equipamentos=substituir)
+                _importar_manutencoes(cur, fonte.dados["os"], job, resultado, substituir)
+                inseridos, atualizados, _ = _contagens(resultado)
+                if inseridos or atualizados:
+                    _registrar_importacao(cur, fonte.origem, resultado)
+                else:
+                    sem_alteracoes.append((fonte.origem, resultado))
+                _arredondar_tempos(resultado)
+                _registrar_fases(fonte.nome, resultado, job)
+                fonte.resultado = resultado
+                fonte.tempos["gravacao"] = round(time.perf_counter() - t, 3)
+
+            tags_alteradas |= _resumir_lancamentos_novos(cur, ultimo_id, job)
+            job.definir_fase("status", 70)
+            atualizar_status_equipamentos(cur, tags_alteradas)
+            job.definir_fase("gravando", 95)
+            inicio_commit = time.perf_counter()
+
+        _registrar_importacoes_sem_alteracoes(sem_alteracoes)
+        fim = time.perf_counter()
+        importadas = [f for f in lidas if f.resultado["status"] == "importado"]
+        if len(lidas) < len(fontes):
+            status = "parcial"
+        else:
+            status = "importado" if importadas else "sem_alteracoes"
+        logger.info(f"Importação de {len(fontes)} origens concluída ({status}) em {fim - inicio:.1f}s - "
+                    f"{len(importadas)} importadas, {len(fontes) - len(lidas)} com erro")
+        return {
+            "status": status,
+            "fontes": [f.para_dict() for f in fontes],
+            "tempos": {
+                "download_e_leitura": round(inicio_gravacao - inicio, 3),
+                "gravacao": round(inicio_commit - inicio_gravacao, 3),
+                "commit": round(fim - inicio_commit, 3),
+                "total": round(fim - inicio, 3)
+            }
+        }
+
+    except ImportacaoCancelada:
+        logger.info("Importação de várias origens cancelada - alterações desfeitas")
+        raise
+    except Exception as e:
+        logger.error(f"Erro ao importar várias origens: {e}")
+        raise
+    finally:
+        for fonte in fontes:
+            fonte.descartar_lotes()
+
+@app.post("/api/config/import/sources")
+def import_sources(config: dict, forcar: bool = False):
+    """Importa de uma vez as planilhas de várias origens.
+
+    Corpo: {"sources": [{"name", "importType", "filePath", "username",
+    "password", "priority", "conflictRule"}, ...]}. Roda na fila de
+    importações; o resultado por origem (contagens, tempos de download,
+    leitura e gravação) aparece em /import/jobs/{job_id}.
+    """
+    try:
         try:
-            # Usar o arquivo temporário para importação
-            global PLANILHA
-            original_planilha = PLANILHA
-            PLANILHA = temp_file
-            
-            # Executar importação
-            importar_planilha()
-            
-            return {"detail": f"Importação realizada com sucesso usando {config['importType']}"}
-        finally:
-            # Restaurar configuração original e limpar
-            PLANILHA = original_planilha
-            importer.cleanup()
-            
+            fontes = preparar_fontes(config.get("sources"))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        origem = "fontes:" + ",".join(sorted(f.nome for f in fontes))
+        job, criado = gerenciador_importacoes.submeter(origem, importar_fontes, fontes, forcar=forcar)
+        detalhe = "Importação iniciada" if criado else "Importação já em andamento"
+        return {
+            "detail": f"{detalhe} ({len(fontes)} origens)",
+            "job_id": job.id,
+            "job": job.para_dict()
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Erro ao agendar importação de várias origens: {e}")
+        raise HTTPException(status_code=500, detail="Erro interno do servidor")
+
+@app.post("/api/config/import")
+def import_with_config(config: dict):
+    """Endpoint para importar usando configurações específicas.
+
+    O download e a importação rodam na fila de importações; acompanhe o
+    andamento em /import/jobs/{job_id}.
+    """
+    try:
+        if config.get("importType") not in ("local", "network", "s3", "ftp"):
+            raise HTTPException(status_code=400, detail="Tipo de importação não suportado")
+        origem = f"{config['importType']}:{config.get('filePath', '')}"
+        job, criado = gerenciador_importacoes.submeter(origem, _importar_com_config, config)
+        detalhe = "Importação iniciada" if criado else "Importação já em andamento"
+        return {
+            "detail": f"{detalhe} usando {config['importType']}",
+            "job_id": job.id,
+            "job": job.para_dict()
+        }
     except HTTPException:
         raise
     except Exception as e:
         logger.error(f"Erro na importação com configuração: {e}")
         raise HTTPException(status_code=500, detail="Erro interno do servidor")
 
+@app.get("/api/cache/stats")
+def cache_stats():
+    """Contadores do cache de respostas (acertos, falhas, despejos, invalidações)"""
+    try:
+        return {"versao_dados": versao_dados.versao, **cache_respostas.estatisticas()}
+    except Exception as e:
+        logger.error(f"Erro ao obter estatísticas do cache: {e}")
+        raise HTTPException(status_code=500, detail="Erro interno do servidor")
+
 def update_scheduler_config(config):
     """Atualiza o agendamento baseado nas configurações"""
     try:
@@ -1490,7 +2192,7 @@ def update_scheduler_config(config):
             # Adicionar novo job
             import_time = f"{config.get('importHour', '10')}:{config.get('importMinute', '05')}"
             scheduler.add_job(
-                importar_planilha,
+                agendar_importacao,
                 'cron',
                 hour=int(config.get('importHour', 10)),
                 minute=int(config.get('importMinute', 5)),
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Benchmark da gravação da importação (equipamentos, lançamentos e OS)
+
+Compara a gravação em lote do importador (_importar_lancamentos e
+_importar_manutencoes) com a gravação antiga, que emitia INSERT/UPDATE por
+equipamento e percorria a aba de OS com iterrows. As abas sintéticas são
+geradas já lidas (mesmas colunas do spreadsheet_reader), porque a leitura do
+arquivo é igual nos dois casos. Cada caminho grava em um SQLite temporário,
+primeiro com o banco vazio e depois reimportando a mesma planilha, e ao final
+o conteúdo gravado pelos dois é comparado.
+
+Uso (a partir de backend/):
+    python benchmarks/bench_import.py [linhas] [equipamentos] [os]
+"""
+
+import os
+import sys
+import time
+import hashlib
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+PASTA = tempfile.mkdtemp(prefix="bench_import_")
+os.environ["DATABASE_URL"] = f"sqlite:///{PASTA}/bench.db"
+os.environ.pop("CAMINHO_PLANILHA", None)
+
+import app  # noqa: E402
+from database import armazenamento, transacao  # noqa: E402
+from import_jobs import ImportJob  # noqa: E402
+from spreadsheet_reader import TAMANHO_LOTE  # noqa: E402
+
+LINHAS_PADRAO = 500_000
+EQUIPAMENTOS_PADRAO = 2_000
+OS_PADRAO = 20_000
+
+def gerar_planilha(linhas: int, equipamentos: int, n_os: int, seed: int = 42):
+    """Abas PRODUTIVIDADE e CONTROLE DE OS sintéticas, como saem da leitura"""
+    rng = np.random.default_rng(seed)
+    dias = max(1, linhas // equipamentos)
+    tags = np.array([f"EQ-{i:05d}" for i in range(equipamentos)])
+    horas = rng.random(equipamentos) < 0.7
+    tag = np.tile(tags, dias)[:linhas]
+    dia = np.repeat(np.arange(dias), equipamentos)[:linhas]
+    uso = np.where(np.tile(horas, dias)[:linhas], rng.uniform(0, 12, linhas), rng.uniform(0, 300, linhas))
+    produtividade = pd.DataFrame({
+        "tag": tag,
+        "data": pd.Timestamp("2023-01-01") + pd.to_timedelta(dia, unit="D"),
+        "h_final": np.round(1000 + dia * np.where(np.tile(horas, dias)[:linhas], 8, 200) + uso, 1),
+        "atividade": np.where(np.tile(horas, dias)[:linhas], "HORAS", "KM"),
+        "tipo": np.where(np.tile(horas, dias)[:linhas], 250.0, 10000.0),
+    })
+
+    os_tags = rng.choice(tags, n_os)
+    manutencoes = pd.DataFrame({
+        "equipamento": os_tags,
+        "n_os": np.arange(1, n_os + 1).astype(float),
+        "data": pd.Timestamp("2023-01-01") + pd.to_timedelta(rng.integers(0, dias, n_os), unit="D"),
+        "tipo_de_manutencao": rng.choice(["PREVENTIVA", "CORRETIVA"], n_os),
+        "falha_apresentada": "",
+        "execucao": rng.choice(["TROCA DE ÓLEO", "FILTROS", "REVISÃO GERAL"], n_os),
+        "responsavel_da_manutencao": rng.choice(["OFICINA", "CAMPO"], n_os),
+        "reprogramacao": np.nan,
+        "observacoes": np.nan,
+    })
+    return produtividade, manutencoes
+
+def lotes_de(df: pd.DataFrame):
+    for inicio in range(0, len(df), TAMANHO_LOTE):
+        yield df.iloc[inicio:inicio + TAMANHO_LOTE]
+
+def produtividade_em_lote(cur, produtividade, job, resultado):
+    app._importar_lancamentos(cur, lotes_de(produtividade), len(produtividade), job, resultado)
+
+def os_em_lote(cur, manutencoes, job, resultado):
+    app._importar_manutencoes(cur, manutencoes, job, resultado)
+
+def produtividade_por_tag(cur, produtividade, job, resultado):
+    """Gravação usada antes da importação em lote: comandos por equipamento"""
+    df = produtividade.dropna(subset=["tag", "data", "h_final"]).copy()
+    df["tag"] = df["tag"].astype(str).str.strip().str.upper()
+    df["data"] = pd.to_datetime(df["data"]).dt.date
+    df["h_final"] = pd.to_numeric(df["h_final"], errors="coerce").fillna(0)
+    for tag, grp in df.groupby("tag"):
+        h_ult = grp.sort_values("data").iloc[-1]["h_final"]
+        tipo = str(grp.iloc[0]["atividade"]).strip().upper() if "atividade" in grp.columns else ""
+        intervalo_col = next((col for col in grp.columns if col.strip().lower() == "tipo"), None)
+        try:
+            intervalo = float(grp.iloc[0][intervalo_col]) if intervalo_col else 0
+        except Exception:
+            intervalo = 0
+        cur.execute("INSERT OR IGNORE INTO equipamentos(tag, tipo, intervalo) VALUES (?, ?, ?)",
+                    (tag, tipo, intervalo))
+        cur.execute("""UPDATE equipamentos SET ultima_manut = COALESCE(ultima_manut, ?), intervalo = ?
+                       WHERE tag = ?""", (h_ult, intervalo, tag))
+        cur.executemany("INSERT OR IGNORE INTO lancamentos(tag, data, h_final) VALUES (?, ?, ?)",
+                        grp[["tag", "data", "h_final"]].values.tolist())
+
+def os_por_linha(cur, manutencoes, job, resultado):
+    """Gravação usada antes da importação em lote: iterrows e um comando por OS"""
+    existentes = dict(cur.execute("""
+        SELECT chave_importacao, hash_importacao FROM manutencoes WHERE chave_importacao IS NOT NULL
+    """).fetchall())
+    for _, row in manutencoes.iterrows():
+        tag = str(row.get("equipamento", "")).strip().upper()
+        numero_os = str(row.get("n_os", "")).strip()
+        data = row.get("data", "")
+        data = data.date().isoformat() if hasattr(data, "date") else str(data)
+        valores = (tag, str(row.get("tipo_de_manutencao", "")).strip(), data, "REALIZADA",
+                   str(row.get("observacoes", "")).strip(), str(row.get("execucao", "")).strip(),
+                   str(row.get("responsavel_da_manutencao", "")).strip(),
+                   str(row.get("reprogramacao", "")).strip(), numero_os)
+        impressao = hashlib.sha1("\x1f".join(valores).encode("utf-8")).hexdigest()
+        chave = f"{tag}|{numero_os}" if pd.notna(row.get("n_os")) and numero_os else f"hash:{impressao}"
+        if existentes.get(chave) == impressao:
+            continue
+        if chave in existentes:
+            cur.execute("""
+                UPDATE manutencoes
+                SET tag = ?, tipo_manutencao = ?, data_agendada = ?, status = ?, observacoes = ?,
+                    execucao = ?, responsavel = ?, reprogramacao = ?, numero_os = ?, hash_importacao = ?
+                WHERE chave_importacao = ?
+            """, valores + (impressao, chave))
+        else:
+            cur.execute("""
+                INSERT INTO manutencoes (tag, tipo_manutencao, data_agendada, status, observacoes, execucao,
+                                         responsavel, reprogramacao, numero_os, chave_importacao, hash_importacao)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, valores + (chave, impressao))
+        existentes[chave] = impressao
+
+def limpar_banco():
+    with transacao() as conn:
+        for tabela in ("lancamentos", "equipamentos", "manutencoes"):
+            conn.execute(f"DELETE FROM {tabela}")
+
+def medir(gravar_produtividade, gravar_os, produtividade, manutencoes) -> tuple:
+    """Tempos (produtividade, OS) de uma importação completa, em uma transação"""
+    job, resultado = ImportJob("benchmark"), app._novo_resultado("benchmark")
+    with transacao() as conn:
+        cur = conn.cursor()
+        inicio = time.perf_counter()
+        gravar_produtividade(cur, produtividade, job, resultado)
+        meio = time.perf_counter()
+        gravar_os(cur, manutencoes, job, resultado)
+        fim = time.perf_counter()
+    return meio - inicio, fim - meio
+
+def conteudo_banco():
+    with transacao(versionar=False) as conn:
+        return (conn.execute("SELECT tag, tipo, intervalo, ultima_manut FROM equipamentos ORDER BY tag").fetchall(),
+                conn.execute("SELECT COUNT(*) FROM lancamentos").fetchone()[0],
+                conn.execute("""SELECT chave_importacao, hash_importacao FROM manutencoes
+                                ORDER BY chave_importacao""").fetchall())
+
+def main():
+    argumentos = [int(a) for a in sys.argv[1:4]]
+    linhas, equipamentos, n_os = argumentos + [LINHAS_PADRAO, EQUIPAMENTOS_PADRAO, OS_PADRAO][len(argumentos):]
+    app.cria_db()
+    produtividade, manutencoes = gerar_planilha(linhas, equipamentos, n_os)
+    print(f"{linhas:,} lançamentos, {equipamentos:,} equipamentos, {n_os:,} OS ({armazenamento.descrever()})")
+    caminhos = {"por tag": (produtividade_por_tag, os_por_linha),
+                "em lote": (produtividade_em_lote, os_em_lote)}
+    print(f"{'gravação':>8} | {'importação':>12} | {'produtividade (s)':>17} | {'OS (s)':>7} | {'total (s)':>9}")
+    tempos = {}
+    conteudo = {}
+    for nome, funcoes in caminhos.items():
+        limpar_banco()
+        for rodada in ("banco vazio", "reimportação"):
+            produtividade_s, os_s = medir(*funcoes, produtividade, manutencoes)
+            tempos[nome, rodada] = produtividade_s + os_s
+            print(f"{nome:>8} | {rodada:>12} | {produtividade_s:>17.2f} | {os_s:>7.2f} | {produtividade_s + os_s:>9.2f}")
+        conteudo[nome] = conteudo_banco()
+
+    for rodada in ("banco vazio", "reimportação"):
+        print(f"ganho ({rodada}): {tempos['por tag', rodada] / tempos['em lote', rodada]:.1f}x")
+    print("mesmo conteúdo gravado:", "sim" if conteudo["por tag"] == conteudo["em lote"] else "NÃO")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Benchmark do classificador de status da frota (status_engine.classify_fleet)
+
+Compara a passada vetorizada com o laço Python equivalente ao código antigo
+para frotas sintéticas de 10 mil a 100 mil equipamentos.
+
+Uso (a partir de backend/):
+    python benchmarks/bench_status.py [tamanho ...]
+"""
+
+import sys
+import time
+import datetime as dt
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from status_engine import classify_fleet  # noqa: E402
+
+TAMANHOS_PADRAO = [10_000, 50_000, 100_000]
+
+def gerar_frota(n: int, seed: int = 42) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    tipo = np.where(rng.random(n) < 0.7, "HORAS", "KM")
+    intervalo = np.where(tipo == "HORAS", 250.0, 10000.0)
+    intervalo[rng.random(n) < 0.05] = 0
+    ultima_manut = rng.uniform(0, 5000, n)
+    atual = ultima_manut + rng.uniform(0, 1.2, n) * np.where(tipo == "HORAS", 250, 10000)
+    hoje = np.datetime64(dt.date.today())
+    ultima_atualizacao = (hoje - rng.integers(0, 30, n).astype("timedelta64[D]")).astype(str)
+    return pd.DataFrame({
+        "tag": [f"EQ-{i:06d}" for i in range(n)],
+        "tipo": tipo,
+        "intervalo": intervalo,
+        "ultima_manut": ultima_manut,
+        "atual": atual,
+        "ultima_atualizacao": ultima_atualizacao,
+    })
+
+def classificar_laco(linhas):
+    """Implementação linha a linha usada antes do classify_fleet"""
+    hoje = dt.date.today()
+    saida = []
+    for tag, tipo, intv, ult, atual, ult_data in linhas:
+        intv = intv or 0
+        ultima_manut = ult or 0
+        atual_valor = atual if atual is not None else ultima_manut
+        uso = atual_valor - ultima_manut
+        percentual = (uso / intv * 100) if intv > 0 else 0
+        if intv == 0:
+            status = "SEM"
+        elif uso >= intv:
+            status = "VERMELHO"
+        elif uso >= max(intv * 0.9, intv - 20):
+            status = "AMARELO"
+        else:
+            status = "OK"
+        dias = (hoje - dt.datetime.strptime(ult_data, "%Y-%m-%d").date()).days
+        saida.append((tag, uso, percentual, status, dias))
+    return saida
+
+def medir(func, *args, repeticoes: int = 3) -> float:
+    melhor = float("inf")
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        func(*args)
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor
+
+def main():
+    tamanhos = [int(a) for a in sys.argv[1:]] or TAMANHOS_PADRAO
+    print(f"{'equipamentos':>12} | {'vetorizado (s)':>14} | {'laço (s)':>10} | {'linhas/s vet.':>14} | ganho")
+    for n in tamanhos:
+        frota = gerar_frota(n)
+        linhas = frota.values.tolist()
+        t_vet = medir(classify_fleet, frota)
+        t_laco = medir(classificar_laco, linhas)
+        print(f"{n:>12} | {t_vet:>14.4f} | {t_laco:>10.4f} | {n / t_vet:>14,.0f} | {t_laco / t_vet:.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Benchmark da importação e das principais leituras da API em escala realista
+
+Gera (ou reaproveita) uma planilha sintética com gerar_planilha.py, importa
+em um SQLite temporário e mede:
+
+- importação com o banco vazio e reimportação da mesma planilha (forçada),
+  separando leitura, normalização e gravação (``tempos`` do resultado de
+  importar_planilha);
+- os endpoints de leitura, chamados pelo app ASGI no próprio processo (sem
+  rede nem uvicorn), com o cache de respostas vazio a cada requisição
+  ("frio") e com o cache já preenchido.
+
+O resultado vai para um JSON em benchmarks/resultados/ com a versão (commit)
+medida; ``--comparar`` mostra a variação em relação a um JSON anterior, para
+que regressões apareçam entre versões.
+
+Uso (a partir de backend/):
+    python benchmarks/bench_suite.py [--equipamentos N] [--dias N] [--os N] [--requisicoes N]
+                                     [--planilha arquivo.xlsx] [--saida resultado.json]
+                                     [--comparar anterior.json]
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import platform
+import statistics
+import subprocess
+import tempfile
+import datetime as dt
+from pathlib import Path
+from urllib.parse import urlencode
+
+PASTA_BENCHMARKS = Path(__file__).resolve().parent
+sys.path.insert(0, str(PASTA_BENCHMARKS.parent))
+sys.path.insert(0, str(PASTA_BENCHMARKS))
+
+from gerar_planilha import (gerar_planilha, nome_padrao, EQUIPAMENTOS_PADRAO,  # noqa: E402
+                            DIAS_PADRAO, OS_PADRAO)
+
+PASTA_RESULTADOS = PASTA_BENCHMARKS / "resultados"
+PASTA_PLANILHAS = Path(tempfile.gettempdir()) / "fleetcare-bench"
+
+# (caminho, parâmetros); {tag} é o primeiro equipamento da planilha sintética
+ENDPOINTS = [
+    ("/dashboard", {}),
+    ("/equipment", {}),
+    ("/equipment", {"limit": 100}),
+    ("/equipment/{tag}", {}),
+    ("/equipment/{tag}/history", {"granularity": "mes"}),
+    ("/dashboard/alerts", {}),
+    ("/dashboard/snapshot", {}),
+    ("/maintenance", {"limit": 100}),
+    ("/maintenance/predictions", {}),
+]
+
+# variação a partir da qual --comparar aponta regressão
+LIMITE_REGRESSAO = 1.2
+
+def versao_codigo() -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=PASTA_BENCHMARKS,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        alterado = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"],
+                                       cwd=PASTA_BENCHMARKS, capture_output=True, text=True).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return {"commit": None, "alterado": None}
+    return {"commit": commit, "alterado": alterado}
+
+def estatisticas(tempos_ms: list) -> dict:
+    ordenados = sorted(tempos_ms)
+    p95 = ordenados[min(len(ordenados) - 1, int(round(0.95 * (len(ordenados) - 1))))]
+    return {
+        "mediana_ms": round(statistics.median(ordenados), 2),
+        "p95_ms": round(p95, 2),
+        "media_ms": round(statistics.fmean(ordenados), 2),
+        "min_ms": round(ordenados[0], 2),
+    }
+
+def medir_importacao(app, caminho: Path) -> dict:
+    resultados = {}
+    for rodada in ("banco_vazio", "reimportacao"):
+        inicio = time.perf_counter()
+        resultado = app.importar_planilha(forcar=True, caminho=caminho)
+        resultados[rodada] = {
+            "segundos": round(time.perf_counter() - inicio, 3),
+            "tempos": resultado["tempos"],
+            "lancamentos": resultado["lancamentos"],
+            "manutencoes": resultado["manutencoes"],
+        }
+        print(f"  {rodada:<13} {resultados[rodada]['segundos']:>7.2f}s  "
+              + "  ".join(f"{etapa} {segundos:.2f}s" for etapa, segundos in resultado["tempos"].items()))
+    return resultados
+
+async def medir_endpoints(app, tag: str, requisicoes: int) -> dict:
+    import httpx
+
+    resultados = {}
+    transporte = httpx.ASGITransport(app=app.app)
+    async with httpx.AsyncClient(transport=transporte, base_url="http://bench") as cliente:
+        for caminho, parametros in ENDPOINTS:
+            url = caminho.format(tag=tag)
+            nome = caminho + (f"?{urlencode(parametros)}" if parametros else "")
+            medidas = {"frio": [], "em_cache": []}
+            status = set()
+            for modo in medidas:
+                for _ in range(requisicoes):
+                    if modo == "frio":
+                        app.cache_respostas.invalidar()
+                    inicio = time.perf_counter()
+                    resposta = await cliente.get(url, params=parametros)
+                    medidas[modo].append((time.perf_counter() - inicio) * 1000)
+                    status.add(resposta.status_code)
+            resultados[nome] = {"status": sorted(status), **{modo: estatisticas(t) for modo, t in medidas.items()}}
+            print(f"  {nome:<42} frio {resultados[nome]['frio']['mediana_ms']:>8.2f} ms   "
+                  f"em cache {resultados[nome]['em_cache']['mediana_ms']:>8.2f} ms   status {sorted(status)}")
+    await app.pool_leitura.fechar()
+    return resultados
+
+def comparar(atual: dict, anterior: dict):
+    """Mostra a razão atual/anterior das métricas presentes nos dois resultados"""
+    print(f"\nComparação com {anterior['versao'].get('commit')} ({anterior['data']}):")
+    if anterior.get("parametros") != atual["parametros"]:
+        print("  atenção: parâmetros diferentes entre as execuções; os tempos não são comparáveis")
+    linhas = []
+    for rodada, medida in atual["importacao"].items():
+        antes = anterior.get("importacao", {}).get(rodada)
+        if antes:
+            linhas.append((f"importação {rodada}", antes["segundos"], medida["segundos"], "s"))
+            for etapa, segundos in medida["tempos"].items():
+                if etapa in antes.get("tempos", {}):
+                    linhas.append((f"  {etapa}", antes["tempos"][etapa], segundos, "s"))
+    for nome, medida in atual["endpoints"].items():
+        antes = anterior.get("endpoints", {}).get(nome)
+        if antes:
+            linhas.append((f"{nome} (frio)", antes["frio"]["mediana_ms"], medida["frio"]["mediana_ms"], "ms"))
+    for nome, antes, agora, unidade in linhas:
+        razao = agora / antes if antes else float("inf")
+        aviso = "  <- REGRESSÃO" if razao >= LIMITE_REGRESSAO else ""
+        print(f"  {nome:<45} {antes:>9.2f} -> {agora:>9.2f} {unidade:<2} ({razao:.2f}x){aviso}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark da importação e dos endpoints de leitura")
+    parser.add_argument("--equipamentos", type=int, default=EQUIPAMENTOS_PADRAO)
+    parser.add_argument("--dias", type=int, default=DIAS_PADRAO)
+    parser.add_argument("--os", type=int, default=OS_PADRAO, dest="n_os")
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--requisicoes", type=int, default=20, help="requisições por endpoint e modo")
+    parser.add_argument("--planilha", type=Path, help="usa esta planilha em vez de gerar uma sintética")
+    parser.add_argument("--saida", type=Path, help="arquivo JSON do resultado")
+    parser.add_argument("--comparar", type=Path, help="JSON de uma execução anterior")
+    args = parser.parse_args()
+
+    if args.planilha:
+        planilha = args.planilha
+    else:
+        planilha = PASTA_PLANILHAS / nome_padrao(args.equipamentos, args.dias, args.n_os, args.semente)
+        if not planilha.exists():
+            print(f"Gerando {planilha} ...")
+            gerar_planilha(planilha, args.equipamentos, args.dias, args.n_os, args.semente)
+
+    # banco temporário e nenhuma planilha configurada: o app não importa nada sozinho
+    banco = tempfile.mkdtemp(prefix="bench_suite_")
+    os.environ["DATABASE_URL"] = f"sqlite:///{banco}/bench.db"
+    os.environ.pop("CAMINHO_PLANILHA", None)
+    import app
+
+    app.cria_db()
+    print(f"Importação de {planilha.name}:")
+    importacao = medir_importacao(app, planilha)
+    print(f"Endpoints ({args.requisicoes} requisições por modo):")
+    endpoints = asyncio.run(medir_endpoints(app, "EQ-00000", args.requisicoes))
+
+    resultado = {
+        "versao": versao_codigo(),
+        "data": dt.datetime.now().isoformat(timespec="seconds"),
+        "ambiente": {
+            "python": platform.python_version(),
+            "plataforma": platform.platform(),
+            "cpus": os.cpu_count(),
+            "motor_planilha": os.getenv("MOTOR_PLANILHA", "auto"),
+        },
+        "parametros": {
+            "planilha": str(planilha) if args.planilha else None,
+            "equipamentos": args.equipamentos,
+            "dias": args.dias,
+            "os": args.n_os,
+            "semente": args.semente,
+            "requisicoes": args.requisicoes,
+        },
+        "importacao": importacao,
+        "endpoints": endpoints,
+    }
+    saida = args.saida or PASTA_RESULTADOS / f"bench_{dt.datetime.now():%Y%m%d_%H%M%S}_{resultado['versao']['commit'] or 'sem_git'}.json"
+    saida.parent.mkdir(parents=True, exist_ok=True)
+    saida.write_text(json.dumps(resultado, indent=2, ensure_ascii=False), encoding="utf-8")
+    print(f"\nResultado gravado em {saida}")
+
+    if args.comparar:
+        comparar(resultado, json.loads(args.comparar.read_text(encoding="utf-8")))
+
+if __name__ == "__main__":
+    main()
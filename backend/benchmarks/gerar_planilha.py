@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Gerador de planilhas sintéticas no formato da planilha de produtividade
+
+Cria as abas PRODUTIVIDADE (título, linha em branco e cabeçalho na 3ª linha,
+um lançamento por equipamento e dia) e CONTROLE DE OS com o tamanho de frota,
+os dias de histórico e o volume de OS informados. A mesma semente gera
+sempre a mesma planilha, para que medições de versões diferentes sejam
+comparáveis.
+
+Uso (a partir de backend/):
+    python benchmarks/gerar_planilha.py saida.xlsx [--equipamentos N] [--dias N] [--os N] [--semente N]
+"""
+
+import sys
+import argparse
+import datetime as dt
+from pathlib import Path
+
+import numpy as np
+from openpyxl import Workbook
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from spreadsheet_reader import ABA_PRODUTIVIDADE, ABA_OS  # noqa: E402
+
+EQUIPAMENTOS_PADRAO = 500
+DIAS_PADRAO = 365
+OS_PADRAO = 5_000
+INICIO = dt.date(2024, 1, 1)
+
+CABECALHO_PRODUTIVIDADE = ["TAG", "DATA", "H INICIAL", "H FINAL", "ATIVIDADE", "TIPO", "OPERADOR"]
+CABECALHO_OS = ["EQUIPAMENTO", "N° OS", "DATA", "TIPO DE MANUTENÇÃO", "FALHA APRESENTADA", "EXECUÇÃO",
+                "RESPONSÁVEL DA MANUTENÇÃO", "REPROGRAMAÇÃO", "OBSERVAÇÕES"]
+
+def nome_padrao(equipamentos: int, dias: int, n_os: int, semente: int) -> str:
+    return f"frota_{equipamentos}eq_{dias}d_{n_os}os_s{semente}.xlsx"
+
+def gerar_planilha(caminho: Path, equipamentos: int = EQUIPAMENTOS_PADRAO, dias: int = DIAS_PADRAO,
+                   n_os: int = OS_PADRAO, semente: int = 42) -> Path:
+    """Grava a planilha sintética em ``caminho`` e retorna o caminho.
+
+    70% dos equipamentos medem horas (até 12 h/dia, revisão a cada 250 h) e o
+    restante quilômetros (até 300 km/dia, revisão a cada 10.000 km). Cerca de
+    2% dos dias ficam sem lançamento, como nas folgas reais da operação.
+    """
+    rng = np.random.default_rng(semente)
+    tags = [f"EQ-{i:05d}" for i in range(equipamentos)]
+    horas = rng.random(equipamentos) < 0.7
+    atividade = np.where(horas, "HORAS", "KM")
+    intervalo = np.where(horas, 250, 10000)
+    uso_maximo = np.where(horas, 12.0, 300.0)
+    leitura = np.round(rng.uniform(0, 5000, equipamentos), 1)
+
+    wb = Workbook(write_only=True)
+    produtividade = wb.create_sheet(ABA_PRODUTIVIDADE)
+    produtividade.append(["RELATÓRIO DE PRODUTIVIDADE - DADOS SINTÉTICOS"])
+    produtividade.append([])
+    produtividade.append(CABECALHO_PRODUTIVIDADE)
+    for dia in range(dias):
+        data = dt.datetime.combine(INICIO + dt.timedelta(days=dia), dt.time())
+        uso = np.round(rng.uniform(0, 1, equipamentos) * uso_maximo, 1)
+        lancou = rng.random(equipamentos) >= 0.02
+        for i in np.flatnonzero(lancou):
+            inicial = leitura[i]
+            leitura[i] = round(inicial + uso[i], 1)
+            produtividade.append([tags[i], data, float(inicial), float(leitura[i]), atividade[i],
+                                  int(intervalo[i]), "OPERADOR"])
+
+    controle = wb.create_sheet(ABA_OS)
+    controle.append(CABECALHO_OS)
+    equipamento = rng.integers(0, equipamentos, n_os)
+    dia = np.sort(rng.integers(0, dias, n_os))
+    preventiva = rng.random(n_os) < 0.6
+    for numero in range(n_os):
+        data = dt.datetime.combine(INICIO + dt.timedelta(days=int(dia[numero])), dt.time())
+        controle.append([tags[equipamento[numero]], 1000 + numero, data,
+                         "PREVENTIVA" if preventiva[numero] else "CORRETIVA",
+                         "" if preventiva[numero] else "VAZAMENTO",
+                         "TROCA DE ÓLEO E FILTROS" if preventiva[numero] else "REPARO",
+                         "OFICINA", "", ""])
+
+    caminho = Path(caminho)
+    caminho.parent.mkdir(parents=True, exist_ok=True)
+    wb.save(caminho)
+    return caminho
+
+def main():
+    parser = argparse.ArgumentParser(description="Gera uma planilha sintética de produtividade e OS")
+    parser.add_argument("saida", type=Path)
+    parser.add_argument("--equipamentos", type=int, default=EQUIPAMENTOS_PADRAO)
+    parser.add_argument("--dias", type=int, default=DIAS_PADRAO)
+    parser.add_argument("--os", type=int, default=OS_PADRAO, dest="n_os")
+    parser.add_argument("--semente", type=int, default=42)
+    args = parser.parse_args()
+    caminho = gerar_planilha(args.saida, args.equipamentos, args.dias, args.n_os, args.semente)
+    print(f"{caminho}: {args.equipamentos} equipamentos x {args.dias} dias, {args.n_os} OS")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+import time
+import uuid
+import logging
+import threading
+import datetime as dt
+from email.utils import format_datetime, parsedate_to_datetime
+
+from starlette.concurrency import run_in_threadpool
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.responses import Response
+
+logger = logging.getLogger(__name__)
+
+# Por quanto tempo (segundos) a versão compartilhada lida do Redis vale antes de ser lida de novo
+INTERVALO_VERSAO_COMPARTILHADA = 1.0
+
+class VersaoDados:
+    """Contador global de versão dos dados do banco.
+
+    É incrementado a cada transação que altera linhas (ver database.transacao);
+    as respostas de leitura usam a versão como ETag, de modo que um cliente
+    com a versão atual recebe 304 sem que a consulta seja executada.
+    """
+
+    def __init__(self):
+        self._trava = threading.Lock()
+        # Identifica o processo: após reiniciar, todas as ETags antigas deixam de valer
+        self._instancia = uuid.uuid4().hex[:8]
+        self.versao = 0
+        self.atualizado_em = dt.datetime.now(dt.timezone.utc).replace(microsecond=0)
+        self._invalidadores = []
+        self._ouvintes = []
+        self._versao_compartilhada = None
+        self._compartilhada = None
+        self._lida_em = 0.0
+
+    def ao_invalidar(self, funcao):
+        """Registra uma função chamada antes de cada nova versão ser publicada (ex.: invalidar caches)"""
+        self._invalidadores.append(funcao)
+
+    def ao_incrementar(self, funcao):
+        """Registra uma função chamada depois de cada nova versão (ex.: notificar os painéis)"""
+        self._ouvintes.append(funcao)
+
+    def usar_versao_compartilhada(self, ler_versao):
+        """Usa nas ETags e no Last-Modified uma versão compartilhada entre os workers.
+
+        ``ler_versao()`` retorna (versão, instante da última alteração em
+        segundos desde a época ou None), ex.: a geração do cache no Redis. O
+        valor lido vale por INTERVALO_VERSAO_COMPARTILHADA segundos.
+        """
+        self._versao_compartilhada = ler_versao
+        self._compartilhada = None
+        self._lida_em = 0.0
+
+    def incrementar(self):
+        # Os caches são esvaziados antes de a versão nova ser publicada: uma
+        # leitura que já vê a ETag nova nunca recebe do cache a resposta antiga
+        # (que o cliente guardaria com a ETag nova e receberia 304 para sempre).
+        # No intervalo, a leitura recebe a ETag antiga, no máximo com os dados novos.
+        self._notificar(self._invalidadores)
+        with self._trava:
+            self.versao += 1
+            self.atualizado_em = dt.datetime.now(dt.timezone.utc).replace(microsecond=0)
+        # a própria alteração precisa aparecer já na próxima leitura deste processo
+        self._lida_em = 0.0
+        self._notificar(self._ouvintes)
+
+    def _notificar(self, funcoes):
+        for funcao in funcoes:
+            try:
+                funcao()
+            except Exception as e:
+                logger.error(f"Erro ao notificar nova versão dos dados: {e}")
+
+    def _vencida(self) -> bool:
+        return (self._versao_compartilhada is not None
+                and time.monotonic() - self._lida_em >= INTERVALO_VERSAO_COMPARTILHADA)
+
+    def _ler_compartilhada(self):
+        """Lê a versão compartilhada (chamada de rede: no loop asyncio use ``estado_atual``)"""
+        try:
+            versao, instante = self._versao_compartilhada()
+            atualizado_em = (dt.datetime.fromtimestamp(instante, dt.timezone.utc).replace(microsecond=0)
+                             if instante else self.atualizado_em)
+            self._compartilhada = ("c", versao, atualizado_em)
+        except Exception as e:
+            logger.error(f"Erro ao ler versão compartilhada dos dados: {e}")
+            self._compartilhada = None
+        self._lida_em = time.monotonic()
+
+    def _estado(self, ler: bool = True) -> tuple:
+        """(instância, versão, última alteração) usados na ETag e no Last-Modified"""
+        if ler and self._vencida():
+            self._ler_compartilhada()
+        if self._versao_compartilhada is not None and self._compartilhada is not None:
+            return self._compartilhada
+        return self._instancia, self.versao, self.atualizado_em
+
+    async def estado_atual(self) -> tuple:
+        """Como ``_estado``, para o loop asyncio: a leitura no Redis vai para o threadpool"""
+        if self._vencida():
+            await run_in_threadpool(self._ler_compartilhada)
+        return self._estado(ler=False)
+
+    def etag(self, estado: tuple = None) -> str:
+        instancia, versao, _ = estado or self._estado()
+        # A data entra na ETag porque alertas e dias sem atualização mudam na virada do dia
+        return f'W/"{instancia}-{versao}-{dt.date.today().isoformat()}"'
+
+    def ultima_modificacao(self, estado: tuple = None) -> str:
+        _, _, atualizado_em = estado or self._estado()
+        return format_datetime(atualizado_em, usegmt=True)
+
+    def nao_modificado(self, if_none_match: str = None, if_modified_since: str = None, estado: tuple = None) -> bool:
+        """Aplica as regras de requisição condicional (If-None-Match tem precedência)"""
+        estado = estado or self._estado()
+        if if_none_match:
+            etag = self.etag(estado)
+            return any(valor.strip() in (etag, "*") for valor in if_none_match.split(","))
+        if if_modified_since:
+            try:
+                desde = parsedate_to_datetime(if_modified_since)
+            except (TypeError, ValueError):
+                return False
+            if desde.tzinfo is None:
+                return False
+            return estado[2] <= desde and desde.astimezone().date() == dt.date.today()
+        return False
+
+versao_dados = VersaoDados()
+
+# Rotas GET que não dependem só do banco (estado do processo, jobs, configuração,
+# documentação, métricas), o fluxo de eventos, que nunca termina, e a exportação,
+# que é transmitida aos poucos e não deve ser acumulada nem trocada por um 304
+ROTAS_SEM_ETAG = ("/health", "/import", "/api/", "/docs", "/redoc", "/openapi.json", "/events", "/metrics",
+                  "/export")
+
+class MiddlewareVersaoDados(BaseHTTPMiddleware):
+    """Acrescenta ETag/Last-Modified às leituras e responde 304 quando o cliente já tem a versão atual"""
+
+    async def dispatch(self, request, call_next):
+        caminho = request.url.path
+        if request.method != "GET" or caminho == "/" or caminho.startswith(ROTAS_SEM_ETAG):
+            return await call_next(request)
+
+        # com a versão no Redis, a leitura (no máximo uma por segundo) não roda no loop
+        estado = await versao_dados.estado_atual()
+        cabecalhos = {
+            "ETag": versao_dados.etag(estado),
+            "Last-Modified": versao_dados.ultima_modificacao(estado),
+            "Cache-Control": "no-cache",
+        }
+        if versao_dados.nao_modificado(request.headers.get("if-none-match"),
+                                       request.headers.get("if-modified-since"), estado):
+            return Response(status_code=304, headers=cabecalhos)
+
+        response = await call_next(request)
+        if response.status_code == 200:
+            response.headers.update(cabecalhos)
+        return response
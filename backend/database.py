@@ -0,0 +1,144 @@
+import os
+import time
+import asyncio
+import logging
+from contextlib import contextmanager, asynccontextmanager
+
+import aiosqlite
+import pandas as pd
+from starlette.concurrency import run_in_threadpool
+
+from data_version import versao_dados
+from metrics import medir_sql
+from storage import criar_armazenamento, PRAGMAS
+
+logger = logging.getLogger(__name__)
+
+# Banco configurado em DATABASE_URL (SQLite em /db/arruda.db por padrão ou PostgreSQL)
+armazenamento = criar_armazenamento()
+
+def get_conexao():
+    """Retorna uma conexão do armazenamento configurado.
+
+    No SQLite é a conexão da thread atual; no PostgreSQL é uma conexão do
+    pool, que deve ser devolvida com ``armazenamento.devolver`` (``transacao``
+    já faz isso).
+    """
+    return armazenamento.conexao()
+
+@contextmanager
+def transacao(versionar: bool = True):
+    """Fornece uma conexão dentro de uma transação.
+
+    Confirma ao sair do bloco normalmente e desfaz as alterações se uma
+    exceção for lançada. Se a transação alterou alguma linha, a versão dos
+    dados (ETag das leituras) é incrementada após o commit; ``versionar=False``
+    é para gravações que não afetam as respostas cacheáveis (ex.: jobs de importação).
+    """
+    conn = armazenamento.conexao()
+    alteracoes = conn.total_changes
+    try:
+        try:
+            yield conn
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+    finally:
+        armazenamento.devolver(conn)
+    if versionar and conn.total_changes != alteracoes:
+        versao_dados.incrementar()
+
+def fechar_conexao():
+    """Fecha a conexão da thread atual, se houver"""
+    armazenamento.fechar_thread()
+
+def ler_dataframe(conn, sql: str, params=()):
+    """Executa a consulta e devolve um DataFrame (com qualquer um dos bancos)"""
+    cur = conn.execute(sql, params)
+    colunas = [coluna[0] for coluna in cur.description]
+    return pd.DataFrame(cur.fetchall(), columns=colunas)
+
+class PoolLeitura:
+    """Conexões aiosqlite somente leitura usadas pelos endpoints ``async def``.
+
+    Cada conexão aiosqlite tem uma thread própria; as consultas não ocupam o
+    threadpool do Starlette, que fica para as gravações e os cálculos com
+    pandas. As conexões são abertas sob demanda, até ``tamanho``, e presas ao
+    loop asyncio em que foram criadas.
+    """
+
+    def __init__(self, tamanho: int = 4):
+        self.tamanho = tamanho
+        self._loop = None
+        self._livres = None
+        self._todas = []
+
+    def _preparar(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # conexões de um loop anterior (ex.: reinício do servidor em testes) não podem ser reaproveitadas
+            for conn in self._todas:
+                conn.stop()
+            self._loop = loop
+            self._livres = asyncio.Queue()
+            self._todas = []
+
+    async def _abrir(self) -> aiosqlite.Connection:
+        conn = await aiosqlite.connect(armazenamento.caminho, timeout=30)
+        for pragma, valor in PRAGMAS.items():
+            await conn.execute(f"PRAGMA {pragma} = {valor}")
+        await conn.execute("PRAGMA query_only = ON")
+        return conn
+
+    @asynccontextmanager
+    async def conexao(self):
+        self._preparar()
+        if self._livres.empty() and len(self._todas) < self.tamanho:
+            conn = await self._abrir()
+            self._todas.append(conn)
+        else:
+            conn = await self._livres.get()
+        try:
+            yield conn
+        finally:
+            # encerra a transação de leitura para não segurar o snapshot do WAL
+            if conn.in_transaction:
+                await conn.rollback()
+            self._livres.put_nowait(conn)
+
+    async def fechar(self):
+        for conn in self._todas:
+            try:
+                await conn.close()
+            except Exception as e:
+                logger.error(f"Erro ao fechar conexão de leitura: {e}")
+        self._todas = []
+        self._loop = None
+
+pool_leitura = PoolLeitura(int(os.getenv("DB_POOL_LEITURA", 4)))
+
+def _consultar_sincrono(sql: str, params=()) -> list:
+    with transacao(versionar=False) as conn:
+        return conn.execute(sql, params).fetchall()
+
+async def consultar(sql: str, params=()) -> list:
+    """Executa uma consulta de leitura no pool assíncrono e retorna todas as linhas.
+
+    O pool aiosqlite só existe para o SQLite; com o PostgreSQL a consulta usa o
+    pool de conexões do armazenamento no threadpool.
+    """
+    if armazenamento.nome != "sqlite":
+        return await run_in_threadpool(_consultar_sincrono, sql, params)
+    async with pool_leitura.conexao() as conn:
+        # uma única ida à thread da conexão (execute + fetchall)
+        inicio = time.perf_counter()
+        try:
+            return await conn.execute_fetchall(sql, params)
+        finally:
+            medir_sql(sql, time.perf_counter() - inicio)
+
+async def consultar_um(sql: str, params=()):
+    """Como ``consultar``, mas retorna só a primeira linha (ou None)"""
+    linhas = await consultar(sql, params)
+    return linhas[0] if linhas else None
@@ -0,0 +1,138 @@
+import os
+import json
+import time
+import hashlib
+import logging
+import tempfile
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Cópias locais das planilhas remotas (S3, FTP, SFTP) e os metadados da versão
+# baixada (ETag, Last-Modified, tamanho, data de modificação). Na próxima
+# importação o AdvancedImporter pergunta à origem se o arquivo mudou e, se não
+# mudou, usa a cópia sem transferir nada.
+# Configuração (variável de ambiente):
+#   IMPORT_CACHE_DOWNLOADS   pasta do cache (padrão: <tmp>/fleetcare-downloads)
+PASTA_PADRAO = Path(tempfile.gettempdir()) / "fleetcare-downloads"
+
+# Conexões FTP/SFTP ociosas por mais tempo que isso são fechadas em vez de reaproveitadas
+OCIOSA_MAX_SEGUNDOS = 300
+
+class CacheDownloads:
+    """Uma cópia e um JSON de metadados por URL de origem, em ``pasta``.
+
+    A cópia é gravada em um arquivo parcial e só então substitui a anterior
+    (os.replace), e os metadados são gravados depois dela: uma falha no meio
+    do caminho nunca deixa metadados novos apontando para uma cópia antiga.
+    """
+
+    def __init__(self, pasta: Path = None):
+        self.pasta = Path(pasta or os.getenv("IMPORT_CACHE_DOWNLOADS") or PASTA_PADRAO)
+        self._trava = threading.Lock()
+        self._travas: Dict[str, threading.Lock] = {}
+
+    def _chave(self, url: str) -> str:
+        return hashlib.sha1(url.encode("utf-8")).hexdigest()[:20]
+
+    def caminho(self, url: str) -> Path:
+        return self.pasta / f"{self._chave(url)}.xlsx"
+
+    def _arquivo_metadados(self, url: str) -> Path:
+        return self.pasta / f"{self._chave(url)}.json"
+
+    @contextmanager
+    def trava(self, url: str):
+        """Uma verificação/download por vez para a mesma origem (importações em paralelo)"""
+        with self._trava:
+            trava = self._travas.setdefault(self._chave(url), threading.Lock())
+        with trava:
+            yield
+
+    def consultar(self, url: str) -> Optional[Dict[str, Any]]:
+        """Metadados da cópia em cache, ou None se não houver cópia íntegra"""
+        try:
+            metadados = json.loads(self._arquivo_metadados(url).read_text(encoding="utf-8"))
+            if metadados.get("url") != url or self.caminho(url).stat().st_size != metadados.get("bytes"):
+                return None
+            return metadados
+        except (OSError, ValueError):
+            return None
+
+    def gravar(self, url: str, baixar: Callable[[Path], Dict[str, Any]]) -> Path:
+        """Baixa uma nova cópia com ``baixar(destino)``, que retorna os metadados da origem"""
+        self.pasta.mkdir(parents=True, exist_ok=True)
+        fd, parcial = tempfile.mkstemp(dir=self.pasta, suffix=".parcial")
+        os.close(fd)
+        try:
+            metadados = baixar(Path(parcial))
+            destino = self.caminho(url)
+            os.replace(parcial, destino)
+        except BaseException:
+            Path(parcial).unlink(missing_ok=True)
+            raise
+        metadados = {**metadados, "url": url, "bytes": destino.stat().st_size, "baixado_em": time.time()}
+        arquivo = self._arquivo_metadados(url)
+        temporario = arquivo.with_suffix(".json.parcial")
+        temporario.write_text(json.dumps(metadados, ensure_ascii=False, default=str), encoding="utf-8")
+        os.replace(temporario, arquivo)
+        return destino
+
+class ConexoesReutilizaveis:
+    """Conexões abertas (FTP, SFTP) mantidas entre as importações, por (host, usuário).
+
+    ``viva(conexao)`` confirma que uma conexão ociosa ainda responde antes de
+    reaproveitá-la; se não responder, ou se ficou ociosa por mais de
+    OCIOSA_MAX_SEGUNDOS, é fechada com ``fechar`` e outra é aberta. Uma
+    conexão em que ocorreu erro é descartada.
+    """
+
+    def __init__(self, viva: Callable[[Any], bool], fechar: Callable[[Any], None]):
+        self._viva = viva
+        self._fechar = fechar
+        self._trava = threading.Lock()
+        self._ociosas: Dict[Any, list] = {}
+
+    def _descartar(self, conexao):
+        try:
+            self._fechar(conexao)
+        except Exception:
+            pass
+
+    def _ociosa(self, chave):
+        while True:
+            with self._trava:
+                ociosas = self._ociosas.get(chave)
+                if not ociosas:
+                    return None
+                conexao, desde = ociosas.pop()
+            if time.monotonic() - desde <= OCIOSA_MAX_SEGUNDOS:
+                try:
+                    if self._viva(conexao):
+                        return conexao
+                except Exception:
+                    pass
+            self._descartar(conexao)
+
+    @contextmanager
+    def conexao(self, chave, abrir: Callable[[], Any]):
+        conexao = self._ociosa(chave) or abrir()
+        try:
+            yield conexao
+        except BaseException:
+            self._descartar(conexao)
+            raise
+        with self._trava:
+            self._ociosas.setdefault(chave, []).append((conexao, time.monotonic()))
+
+    def fechar(self):
+        with self._trava:
+            ociosas, self._ociosas = self._ociosas, {}
+        for lista in ociosas.values():
+            for conexao, _ in lista:
+                self._descartar(conexao)
+
+cache_downloads = CacheDownloads()
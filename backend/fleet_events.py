@@ -0,0 +1,178 @@
+import json
+import uuid
+import asyncio
+import logging
+import threading
+import datetime as dt
+from collections import deque
+from typing import Any, Dict, Optional
+
+from database import transacao
+from data_version import versao_dados
+
+logger = logging.getLogger(__name__)
+
+# Tipos de evento enviados em /events
+EVENTO_DADOS_ATUALIZADOS = "dados_atualizados"
+EVENTO_STATUS_ALTERADO = "status_alterado"
+EVENTO_NOVOS_CRITICOS = "novos_criticos"
+EVENTO_IMPORTACAO_FINALIZADA = "importacao_finalizada"
+
+STATUS_CRITICO = "VERMELHO"
+
+class CanalEventos:
+    """Distribui eventos para os clientes conectados via Server-Sent Events.
+
+    ``publicar`` pode ser chamado de qualquer thread (endpoints síncronos,
+    executor de importações); cada cliente tem uma fila no loop asyncio da
+    sua conexão. Os últimos eventos ficam guardados para que um cliente que
+    reconecta com ``Last-Event-ID`` receba o que perdeu.
+    """
+
+    def __init__(self, max_historico: int = 200, max_fila: int = 100, intervalo_ping: float = 15.0):
+        self._trava = threading.Lock()
+        self._assinantes = set()
+        self._historico = deque(maxlen=max_historico)
+        self._ultimo_id = 0
+        # Os ids enviados levam a instância: após reiniciar o processo, um
+        # Last-Event-ID antigo não se confunde com os novos eventos
+        self._instancia = uuid.uuid4().hex[:8]
+        self.max_fila = max_fila
+        self.intervalo_ping = intervalo_ping
+
+    @property
+    def conectados(self) -> int:
+        return len(self._assinantes)
+
+    def publicar(self, tipo: str, dados: Dict[str, Any]):
+        with self._trava:
+            self._ultimo_id += 1
+            evento = (self._ultimo_id, tipo, json.dumps(dados, default=str, ensure_ascii=False))
+            self._historico.append(evento)
+            assinantes = list(self._assinantes)
+        for loop, fila in assinantes:
+            try:
+                loop.call_soon_threadsafe(self._entregar, fila, evento)
+            except RuntimeError:
+                # loop já encerrado; a conexão é descartada ao sair do gerador
+                pass
+
+    @staticmethod
+    def _entregar(fila: asyncio.Queue, evento):
+        try:
+            fila.put_nowait(evento)
+        except asyncio.QueueFull:
+            # cliente lento: descarta os eventos pendentes e pede que recarregue tudo
+            while not fila.empty():
+                fila.get_nowait()
+            fila.put_nowait((evento[0], EVENTO_DADOS_ATUALIZADOS, json.dumps({"ressincronizar": True})))
+
+    def _pendentes(self, ultimo_id: Optional[str]):
+        """Eventos posteriores a ``ultimo_id``; None se o histórico não os cobre mais"""
+        if not ultimo_id:
+            return []
+        instancia, _, numero = ultimo_id.partition("-")
+        if instancia != self._instancia or not numero.isdigit() or int(numero) > self._ultimo_id:
+            return None
+        numero = int(numero)
+        mais_antigo = self._historico[0][0] if self._historico else self._ultimo_id + 1
+        if numero + 1 < mais_antigo:
+            return None
+        return [e for e in self._historico if e[0] > numero]
+
+    async def assinar(self, ultimo_id: Optional[str] = None):
+        """Gerador com o fluxo text/event-stream de um cliente"""
+        loop = asyncio.get_running_loop()
+        fila = asyncio.Queue(maxsize=self.max_fila)
+        assinante = (loop, fila)
+        with self._trava:
+            pendentes = self._pendentes(ultimo_id)
+            self._assinantes.add(assinante)
+            atual = self._ultimo_id
+        try:
+            yield "retry: 5000\n\n"
+            if pendentes is None:
+                # reconexão depois de muitos eventos: o cliente deve recarregar tudo
+                pendentes = [(atual, EVENTO_DADOS_ATUALIZADOS, json.dumps({"ressincronizar": True}))]
+            for evento in pendentes:
+                yield self._formatar(evento)
+            while True:
+                try:
+                    evento = await asyncio.wait_for(fila.get(), self.intervalo_ping)
+                except asyncio.TimeoutError:
+                    # comentário mantém a conexão aberta em proxies com timeout de ociosidade
+                    yield ": ping\n\n"
+                    continue
+                yield self._formatar(evento)
+        finally:
+            with self._trava:
+                self._assinantes.discard(assinante)
+
+    def _formatar(self, evento) -> str:
+        id_evento, tipo, dados = evento
+        return f"id: {self._instancia}-{id_evento}\nevent: {tipo}\ndata: {dados}\n\n"
+
+class MonitorFrota:
+    """Compara a situação da frota antes e depois de cada alteração no banco.
+
+    ``notificar`` é registrado em ``versao_dados.ao_incrementar`` e apenas
+    acorda uma thread própria, de modo que a transação que alterou os dados
+    não espera pela comparação; alterações em sequência (ex.: uma importação
+    seguida de edições) são agrupadas em um único ciclo.
+    """
+
+    def __init__(self, canal: CanalEventos, atraso: float = 0.5):
+        self.canal = canal
+        self.atraso = atraso
+        self._sinal = threading.Event()
+        self._situacao: Dict[str, tuple] = {}
+        self._thread = None
+
+    def iniciar(self):
+        """Carrega a situação atual e inicia a thread de comparação"""
+        self._situacao = self._ler_situacao()
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._executar, name="monitor-frota", daemon=True)
+            self._thread.start()
+
+    def notificar(self):
+        self._sinal.set()
+
+    def _executar(self):
+        while True:
+            self._sinal.wait()
+            # espera as gravações em sequência terminarem antes de comparar
+            while self._sinal.wait(self.atraso):
+                self._sinal.clear()
+            try:
+                self.verificar()
+            except Exception as e:
+                logger.error(f"Erro ao comparar situação da frota: {e}")
+
+    def verificar(self):
+        """Publica as mudanças de status desde a última verificação"""
+        anterior, atual = self._situacao, self._ler_situacao()
+        self._situacao = atual
+
+        mudancas = []
+        for tag, (status, percentual) in atual.items():
+            status_anterior = anterior.get(tag, (None, None))[0]
+            if status != status_anterior:
+                mudancas.append({"tag": tag, "de": status_anterior, "para": status, "percentual": percentual})
+        removidos = sorted(set(anterior) - set(atual))
+
+        if mudancas or removidos:
+            self.canal.publicar(EVENTO_STATUS_ALTERADO, {"mudancas": mudancas, "removidos": removidos})
+        criticos = [m["tag"] for m in mudancas if m["para"] == STATUS_CRITICO]
+        if criticos:
+            self.canal.publicar(EVENTO_NOVOS_CRITICOS, {"tags": criticos})
+        self.canal.publicar(EVENTO_DADOS_ATUALIZADOS, {
+            "versao": versao_dados.versao,
+            "em": dt.datetime.now().isoformat(),
+        })
+
+    @staticmethod
+    def _ler_situacao() -> Dict[str, tuple]:
+        with transacao(versionar=False) as conn:
+            linhas = conn.execute("SELECT tag, status, percentual FROM equipment_status").fetchall()
+        return {tag: (status, percentual) for tag, status, percentual in linhas}
@@ -0,0 +1,244 @@
+import json
+import uuid
+import queue
+import threading
+import logging
+import datetime as dt
+from typing import Optional, Dict, Any
+
+from database import armazenamento, transacao
+
+logger = logging.getLogger(__name__)
+
+STATUS_NA_FILA = "na_fila"
+STATUS_EXECUTANDO = "executando"
+STATUS_CONCLUIDO = "concluido"
+STATUS_FALHOU = "falhou"
+STATUS_CANCELADO = "cancelado"
+STATUS_INTERROMPIDO = "interrompido"
+
+STATUS_ATIVOS = (STATUS_NA_FILA, STATUS_EXECUTANDO)
+
+COLUNAS_JOB = ["id", "origem", "status", "fase", "progresso", "linhas_processadas",
+               "criado_em", "iniciado_em", "concluido_em", "duracao", "resultado", "erro"]
+
+class ImportacaoCancelada(Exception):
+    """Lançada dentro da importação quando o job é cancelado"""
+
+class ImportJob:
+    """Estado de uma importação: fase, progresso, linhas processadas e resultado.
+
+    A função de importação recebe o job e informa o andamento por meio de
+    ``definir_fase`` e ``registrar_linhas``; ambos interrompem a execução com
+    ``ImportacaoCancelada`` se o cancelamento tiver sido solicitado.
+    """
+
+    def __init__(self, origem: str):
+        self.id = uuid.uuid4().hex[:12]
+        self.origem = origem
+        self.status = STATUS_NA_FILA
+        self.fase = STATUS_NA_FILA
+        self.progresso = 0.0
+        self.linhas_processadas = 0
+        self.criado_em = dt.datetime.now()
+        self.iniciado_em = None
+        self.concluido_em = None
+        self.resultado = None
+        self.erro = None
+        self._cancelar = threading.Event()
+        self._finalizado = threading.Event()
+
+    def definir_fase(self, fase: str, progresso: float = None):
+        self.verificar_cancelamento()
+        self.fase = fase
+        if progresso is not None:
+            self.progresso = progresso
+
+    def registrar_linhas(self, quantidade: int, progresso: float = None):
+        self.verificar_cancelamento()
+        self.linhas_processadas += quantidade
+        if progresso is not None:
+            self.progresso = progresso
+
+    def verificar_cancelamento(self):
+        if self._cancelar.is_set():
+            raise ImportacaoCancelada(f"Importação {self.id} cancelada")
+
+    def aguardar(self, timeout: float = None) -> bool:
+        """Bloqueia até o job terminar (com qualquer status)"""
+        return self._finalizado.wait(timeout)
+
+    @property
+    def duracao(self) -> Optional[float]:
+        if not self.iniciado_em:
+            return None
+        fim = self.concluido_em or dt.datetime.now()
+        return round((fim - self.iniciado_em).total_seconds(), 3)
+
+    def para_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "origem": self.origem,
+            "status": self.status,
+            "fase": self.fase,
+            "progresso": round(self.progresso, 1),
+            "linhas_processadas": self.linhas_processadas,
+            "cancelamento_solicitado": self._cancelar.is_set(),
+            "criado_em": self.criado_em.isoformat(),
+            "iniciado_em": self.iniciado_em.isoformat() if self.iniciado_em else None,
+            "concluido_em": self.concluido_em.isoformat() if self.concluido_em else None,
+            "duracao": self.duracao,
+            "resultado": self.resultado,
+            "erro": self.erro
+        }
+
+class GerenciadorImportacoes:
+    """Fila de importações executadas uma de cada vez por uma thread dedicada.
+
+    Cada origem (planilha padrão, configuração do sistema, ...) só pode ter um
+    job ativo: submeter novamente a mesma origem enquanto ela está na fila ou
+    executando devolve o job existente. Como há um único executor, importações
+    de origens diferentes nunca gravam no banco ao mesmo tempo.
+    """
+
+    def __init__(self, max_em_memoria: int = 50):
+        self._fila = queue.Queue()
+        self._jobs: Dict[str, ImportJob] = {}
+        self._ativos: Dict[str, ImportJob] = {}
+        self._trava = threading.Lock()
+        self._executor = None
+        self._max_em_memoria = max_em_memoria
+        self._ouvintes = []
+
+    def ao_finalizar(self, funcao):
+        """Registra uma função chamada com o job ao fim de cada importação (qualquer status)"""
+        self._ouvintes.append(funcao)
+
+    def submeter(self, origem: str, funcao, *args, **kwargs):
+        """Enfileira ``funcao(*args, job=job, **kwargs)``; retorna (job, criado)"""
+        with self._trava:
+            existente = self._ativos.get(origem)
+            if existente is not None:
+                return existente, False
+            job = ImportJob(origem)
+            self._jobs[job.id] = job
+            self._ativos[origem] = job
+            self._descartar_antigos()
+            self._iniciar_executor()
+        try:
+            self._registrar(job)
+            self._fila.put((job, funcao, args, kwargs))
+        except BaseException:
+            # sem o registro (ex.: banco bloqueado) o job não existe: a origem fica livre de novo
+            with self._trava:
+                if self._ativos.get(origem) is job:
+                    del self._ativos[origem]
+                self._jobs.pop(job.id, None)
+            raise
+        logger.info(f"Importação {job.id} enfileirada ({origem})")
+        return job, True
+
+    def cancelar(self, job_id: str) -> Optional[ImportJob]:
+        """Solicita o cancelamento; jobs na fila nem chegam a executar"""
+        job = self._jobs.get(job_id)
+        if job is not None and job.status in STATUS_ATIVOS:
+            job._cancelar.set()
+            logger.info(f"Cancelamento solicitado para a importação {job_id}")
+        return job
+
+    def obter(self, job_id: str) -> Optional[Dict[str, Any]]:
+        job = self._jobs.get(job_id)
+        if job is not None:
+            return job.para_dict()
+        historico = self.historico(job_id=job_id)
+        return historico[0] if historico else None
+
+    def ativos(self):
+        with self._trava:
+            return [job.para_dict() for job in self._ativos.values()]
+
+    def historico(self, limite: int = 20, job_id: str = None):
+        """Lista as importações registradas no banco, da mais recente para a mais antiga"""
+        consulta = """
+            SELECT id, origem, status, fase, progresso, linhas_processadas,
+                   criado_em, iniciado_em, concluido_em, duracao, resultado, erro
+            FROM importacao_jobs
+        """
+        with transacao() as conn:
+            if job_id:
+                linhas = conn.execute(consulta + " WHERE id = ?", (job_id,)).fetchall()
+            else:
+                linhas = conn.execute(consulta + " ORDER BY criado_em DESC LIMIT ?", (limite,)).fetchall()
+        registros = []
+        for linha in linhas:
+            registro = dict(zip(COLUNAS_JOB, linha))
+            registro["resultado"] = json.loads(registro["resultado"]) if registro["resultado"] else None
+            registros.append(registro)
+        return registros
+
+    def marcar_interrompidos(self):
+        """Marca como interrompidos os jobs que estavam ativos quando o processo parou"""
+        with transacao(versionar=False) as conn:
+            conn.execute(f"""
+                UPDATE importacao_jobs SET status = ?
+                WHERE status IN ({','.join('?' * len(STATUS_ATIVOS))})
+            """, (STATUS_INTERROMPIDO, *STATUS_ATIVOS))
+
+    def _iniciar_executor(self):
+        if self._executor is None or not self._executor.is_alive():
+            self._executor = threading.Thread(target=self._executar, name="importacoes", daemon=True)
+            self._executor.start()
+
+    def _executar(self):
+        while True:
+            job, funcao, args, kwargs = self._fila.get()
+            try:
+                job.verificar_cancelamento()
+                job.status = STATUS_EXECUTANDO
+                job.iniciado_em = dt.datetime.now()
+                job.fase = "iniciando"
+                self._registrar(job)
+                job.resultado = funcao(*args, job=job, **kwargs)
+                job.status = STATUS_CONCLUIDO
+                job.fase = STATUS_CONCLUIDO
+                job.progresso = 100.0
+            except ImportacaoCancelada:
+                job.status = STATUS_CANCELADO
+                logger.info(f"Importação {job.id} cancelada na fase '{job.fase}'")
+            except Exception as e:
+                job.status = STATUS_FALHOU
+                job.erro = str(e)
+                logger.error(f"Importação {job.id} falhou: {e}")
+            finally:
+                job.concluido_em = dt.datetime.now()
+                with self._trava:
+                    self._ativos.pop(job.origem, None)
+                try:
+                    self._registrar(job)
+                except Exception as e:
+                    logger.error(f"Erro ao registrar importação {job.id}: {e}")
+                job._finalizado.set()
+                for funcao in self._ouvintes:
+                    try:
+                        funcao(job)
+                    except Exception as e:
+                        logger.error(f"Erro ao notificar fim da importação {job.id}: {e}")
+                self._fila.task_done()
+
+    def _descartar_antigos(self):
+        finalizados = [j for j in self._jobs.values() if j.status not in STATUS_ATIVOS]
+        excesso = len(self._jobs) - self._max_em_memoria
+        for job in sorted(finalizados, key=lambda j: j.criado_em)[:max(0, excesso)]:
+            del self._jobs[job.id]
+
+    def _registrar(self, job: ImportJob):
+        with transacao(versionar=False) as conn:
+            armazenamento.substituir(conn.cursor(), "importacao_jobs", COLUNAS_JOB, "id", [(
+                job.id, job.origem, job.status, job.fase, job.progresso, job.linhas_processadas,
+                job.criado_em.isoformat(),
+                job.iniciado_em.isoformat() if job.iniciado_em else None,
+                job.concluido_em.isoformat() if job.concluido_em else None,
+                job.duracao,
+                json.dumps(job.resultado, default=str) if job.resultado is not None else None,
+                job.erro
+            )])
@@ -0,0 +1,131 @@
+import os
+import sys
+import json
+import queue
+import atexit
+import logging
+import datetime as dt
+from logging.handlers import QueueHandler, QueueListener
+
+# Logging do processo: os registros vão para uma fila e são formatados e
+# escritos por uma thread própria, de modo que a importação e as requisições
+# nunca esperam pela escrita no stdout/stderr (PYTHONUNBUFFERED=1 no container).
+# Configuração (variáveis de ambiente):
+#   LOG_NIVEL              nível do log da aplicação (padrão INFO)
+#   LOG_NIVEL_IMPORTACAO   nível do logger "importacao" (padrão: o de LOG_NIVEL); em DEBUG
+#                          registra uma amostra das linhas importadas
+#   LOG_AMOSTRA_LINHAS     com o logger "importacao" em DEBUG, registra 1 a cada N linhas (padrão 1000)
+#   LOG_FORMATO            "texto" (padrão) ou "json" (um objeto por linha, com os campos estruturados)
+LOG_NIVEL = os.getenv("LOG_NIVEL", "INFO").upper()
+LOG_NIVEL_IMPORTACAO = os.getenv("LOG_NIVEL_IMPORTACAO", "").upper()
+LOG_AMOSTRA_LINHAS = max(1, int(os.getenv("LOG_AMOSTRA_LINHAS", 1000) or 1000))
+LOG_FORMATO = os.getenv("LOG_FORMATO", "texto").lower()
+
+# mesmo formato do logging.basicConfig usado antes
+FORMATO_TEXTO = "%(levelname)s:%(name)s:%(message)s"
+
+# atributos de todo LogRecord; o que vier além disso é campo estruturado (extra=...)
+_ATRIBUTOS_PADRAO = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "taskName"}
+
+_ouvintes = []
+
+def campos_extras(record: logging.LogRecord) -> dict:
+    """Campos estruturados do registro (passados em ``extra``)"""
+    return {chave: valor for chave, valor in vars(record).items()
+            if chave not in _ATRIBUTOS_PADRAO and not chave.startswith("_")}
+
+class FormatadorTexto(logging.Formatter):
+    """Formato de texto habitual, seguido dos campos estruturados como chave=valor"""
+
+    def format(self, record):
+        texto = super().format(record)
+        extras = campos_extras(record)
+        if extras:
+            texto += " | " + " ".join(f"{chave}={valor}" for chave, valor in extras.items())
+        return texto
+
+class FormatadorJson(logging.Formatter):
+    """Um objeto JSON por linha, para coletores de log (Loki, CloudWatch, ELK...)"""
+
+    def format(self, record):
+        dados = {
+            "ts": dt.datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "nivel": record.levelname,
+            "logger": record.name,
+            "mensagem": record.getMessage(),
+            **campos_extras(record),
+        }
+        if record.exc_info:
+            dados["excecao"] = self.formatException(record.exc_info)
+        return json.dumps(dados, ensure_ascii=False, default=str)
+
+class HandlerFila(QueueHandler):
+    """QueueHandler que enfileira o registro sem formatá-lo.
+
+    A formatação (inclusive dos argumentos da mensagem) fica para a thread do
+    QueueListener, com os formatadores dos handlers originais; a fila é do
+    próprio processo, então o registro não precisa ser serializado.
+    """
+
+    def prepare(self, record):
+        return record
+
+def enfileirar_handlers(logger: logging.Logger):
+    """Passa os handlers do logger para uma thread de escrita, atrás de uma fila.
+
+    O logger fica só com um ``HandlerFila``; os handlers originais continuam
+    escrevendo o que escreviam, com o mesmo formato e nível, mas fora da
+    thread que registrou a mensagem.
+    """
+    handlers = [h for h in logger.handlers if not isinstance(h, QueueHandler)]
+    if not handlers:
+        return
+    fila = queue.SimpleQueue()
+    ouvinte = QueueListener(fila, *handlers, respect_handler_level=True)
+    for handler in handlers:
+        logger.removeHandler(handler)
+    logger.addHandler(HandlerFila(fila))
+    ouvinte.start()
+    _ouvintes.append(ouvinte)
+
+def encerrar_logging():
+    """Escreve os registros ainda na fila e encerra as threads de escrita"""
+    while _ouvintes:
+        _ouvintes.pop().stop()
+
+def configurar_logging():
+    """Configura o logger raiz (nível, formato e escrita em segundo plano); chamadas repetidas são ignoradas"""
+    raiz = logging.getLogger()
+    if any(isinstance(h, QueueHandler) for h in raiz.handlers):
+        return
+    saida = logging.StreamHandler(sys.stderr)
+    saida.setFormatter(FormatadorJson() if LOG_FORMATO == "json" else FormatadorTexto(FORMATO_TEXTO))
+    raiz.addHandler(saida)
+    raiz.setLevel(LOG_NIVEL)
+    if LOG_NIVEL_IMPORTACAO:
+        logging.getLogger("importacao").setLevel(LOG_NIVEL_IMPORTACAO)
+    enfileirar_handlers(raiz)
+
+def enfileirar_uvicorn():
+    """Coloca os logs do uvicorn (inclusive o de acesso) atrás da fila.
+
+    O uvicorn configura os próprios handlers ao iniciar, depois da importação
+    do app; por isso é chamado no startup.
+    """
+    for nome in ("uvicorn", "uvicorn.access"):
+        enfileirar_handlers(logging.getLogger(nome))
+
+def registrar_amostra(logger: logging.Logger, mensagem: str, df, inicio: int = 0, **campos):
+    """Registra em DEBUG 1 a cada LOG_AMOSTRA_LINHAS linhas de ``df``, com as colunas como campos.
+
+    ``inicio`` é a posição da primeira linha de ``df`` na aba, para que a
+    amostragem continue entre os lotes. Não faz nada (nem percorre o
+    DataFrame) se o logger não estiver em DEBUG.
+    """
+    if not logger.isEnabledFor(logging.DEBUG) or df is None or len(df) == 0:
+        return
+    posicoes = range((-inicio) % LOG_AMOSTRA_LINHAS, len(df), LOG_AMOSTRA_LINHAS)
+    for posicao, linha in zip(posicoes, df.iloc[posicoes.start::LOG_AMOSTRA_LINHAS].to_dict("records")):
+        logger.debug(mensagem, extra={**campos, "linha": inicio + posicao, **linha})
+
+atexit.register(encerrar_logging)
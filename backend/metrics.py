@@ -0,0 +1,228 @@
+import os
+import time
+import bisect
+import logging
+import threading
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Dict, Sequence, Tuple
+
+from starlette.routing import Match
+
+logger = logging.getLogger(__name__)
+
+# Métricas do processo no formato texto do Prometheus, expostas em /metrics.
+# Cada worker do uvicorn tem as suas; o Prometheus soma as séries dos workers.
+# Configuração (variável de ambiente):
+#   SQL_LENTO_MS   registra no log os comandos SQL mais lentos que isso (padrão 0 = desligado)
+SQL_LENTO_MS = float(os.getenv("SQL_LENTO_MS", 0) or 0)
+
+# Faixas (segundos) dos histogramas de requisições/SQL e das fases da importação
+LIMITES_PADRAO = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+LIMITES_IMPORTACAO = (0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+
+# Rotas que não entram no histograma de requisições: o fluxo de eventos fica
+# aberto enquanto o painel estiver aberto e distorceria as latências
+ROTAS_SEM_METRICA = ("/events",)
+
+OPERACOES_SQL = ("SELECT", "INSERT", "UPDATE", "DELETE", "CREATE", "DROP", "ALTER", "PRAGMA", "WITH")
+
+def _escapar(valor: str) -> str:
+    return str(valor).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _numero(valor: float) -> str:
+    if valor == float("inf"):
+        return "+Inf"
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+class _Metrica:
+    tipo = "untyped"
+
+    def __init__(self, nome: str, ajuda: str, rotulos: Sequence[str] = ()):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulos = tuple(rotulos)
+        self._trava = threading.Lock()
+        self._series: Dict[Tuple[str, ...], object] = {}
+
+    def _chave(self, rotulos: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(rotulos.get(nome, "")) for nome in self.rotulos)
+
+    def _rotulos_texto(self, chave: Tuple[str, ...], extra: Sequence[Tuple[str, str]] = ()) -> str:
+        pares = list(zip(self.rotulos, chave)) + list(extra)
+        if not pares:
+            return ""
+        return "{" + ",".join(f'{nome}="{_escapar(valor)}"' for nome, valor in pares) + "}"
+
+    def exportar(self) -> list:
+        linhas = [f"# HELP {self.nome} {self.ajuda}", f"# TYPE {self.nome} {self.tipo}"]
+        with self._trava:
+            series = sorted((chave, self._copiar(valor)) for chave, valor in self._series.items())
+        for chave, valor in series:
+            linhas.extend(self._linhas(chave, valor))
+        return linhas
+
+class Contador(_Metrica):
+    """Valor que só cresce (ex.: linhas importadas, emails enviados)"""
+
+    tipo = "counter"
+
+    def inc(self, valor: float = 1, **rotulos):
+        chave = self._chave(rotulos)
+        with self._trava:
+            self._series[chave] = self._series.get(chave, 0) + valor
+
+    def _copiar(self, valor):
+        return valor
+
+    def _linhas(self, chave, valor):
+        return [f"{self.nome}{self._rotulos_texto(chave)} {_numero(valor)}"]
+
+class Histograma(_Metrica):
+    """Distribuição de durações em faixas cumulativas (``le``), com soma e contagem"""
+
+    tipo = "histogram"
+
+    def __init__(self, nome: str, ajuda: str, rotulos: Sequence[str] = (), limites: Sequence[float] = LIMITES_PADRAO):
+        super().__init__(nome, ajuda, rotulos)
+        self.limites = tuple(sorted(limites))
+
+    def observar(self, valor: float, **rotulos):
+        chave = self._chave(rotulos)
+        faixa = bisect.bisect_left(self.limites, valor)
+        with self._trava:
+            serie = self._series.get(chave)
+            if serie is None:
+                serie = self._series[chave] = [[0] * (len(self.limites) + 1), 0.0]
+            serie[0][faixa] += 1
+            serie[1] += valor
+
+    @contextmanager
+    def cronometrar(self, **rotulos):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observar(time.perf_counter() - inicio, **rotulos)
+
+    def _copiar(self, serie):
+        return list(serie[0]), serie[1]
+
+    def _linhas(self, chave, serie):
+        contagens, soma = serie
+        linhas = []
+        acumulado = 0
+        for limite, quantidade in zip(self.limites + (float("inf"),), contagens):
+            acumulado += quantidade
+            linhas.append(f"{self.nome}_bucket{self._rotulos_texto(chave, [('le', _numero(limite))])} {acumulado}")
+        linhas.append(f"{self.nome}_sum{self._rotulos_texto(chave)} {_numero(soma)}")
+        linhas.append(f"{self.nome}_count{self._rotulos_texto(chave)} {acumulado}")
+        return linhas
+
+class RegistroMetricas:
+    """Conjunto das métricas do processo, exportado no formato texto 0.0.4 do Prometheus"""
+
+    def __init__(self):
+        self._metricas = []
+
+    def contador(self, nome: str, ajuda: str, rotulos: Sequence[str] = ()) -> Contador:
+        metrica = Contador(nome, ajuda, rotulos)
+        self._metricas.append(metrica)
+        return metrica
+
+    def histograma(self, nome: str, ajuda: str, rotulos: Sequence[str] = (),
+                   limites: Sequence[float] = LIMITES_PADRAO) -> Histograma:
+        metrica = Histograma(nome, ajuda, rotulos, limites)
+        self._metricas.append(metrica)
+        return metrica
+
+    def exportar(self) -> str:
+        linhas = []
+        for metrica in self._metricas:
+            linhas.extend(metrica.exportar())
+        return "\n".join(linhas) + "\n"
+
+metricas = RegistroMetricas()
+
+duracao_requisicoes = metricas.histograma(
+    "fleetcare_http_request_duration_seconds", "Duração das requisições HTTP por rota",
+    ("method", "route", "status"))
+duracao_sql = metricas.histograma(
+    "fleetcare_db_query_duration_seconds", "Duração dos comandos SQL (execute/executemany)", ("operation",))
+comandos_sql_lentos = metricas.contador(
+    "fleetcare_db_slow_queries_total", "Comandos SQL mais lentos que SQL_LENTO_MS", ("operation",))
+duracao_fases_importacao = metricas.histograma(
+    "fleetcare_import_phase_duration_seconds",
+    "Duração das fases da importação (download, leitura, normalizacao, gravacao, commit, total)",
+    ("phase",), LIMITES_IMPORTACAO)
+importacoes = metricas.contador(
+    "fleetcare_imports_total", "Importações finalizadas por status", ("status",))
+linhas_importadas = metricas.contador(
+    "fleetcare_import_rows_total", "Linhas da planilha processadas pela importação", ("table", "result"))
+downloads_importacao = metricas.contador(
+    "fleetcare_import_downloads_total",
+    "Downloads das planilhas remotas: baixado ou inalterado (cópia do cache reaproveitada)", ("source", "result"))
+emails_enviados = metricas.contador(
+    "fleetcare_emails_total", "Relatórios diários por email, por resultado do envio", ("status",))
+
+@lru_cache(maxsize=1024)
+def _operacao(sql: str) -> str:
+    palavra = sql.lstrip().split(None, 1)[0].upper() if sql.strip() else ""
+    return palavra if palavra in OPERACOES_SQL else "OUTRO"
+
+def medir_sql(sql: str, segundos: float):
+    """Registra a duração de um comando SQL e, acima de SQL_LENTO_MS, avisa no log"""
+    operacao = _operacao(sql)
+    duracao_sql.observar(segundos, operation=operacao)
+    if SQL_LENTO_MS and segundos * 1000 >= SQL_LENTO_MS:
+        comandos_sql_lentos.inc(operation=operacao)
+        logger.warning(f"SQL lento ({segundos * 1000:.0f} ms): {' '.join(sql.split())[:300]}")
+
+_rotas_por_endpoint: Dict[int, Dict[object, str]] = {}
+
+def _rota(scope) -> str:
+    """Caminho declarado da rota (ex.: /equipment/{tag}), para não criar uma série por tag"""
+    app = scope.get("app")
+    rotas = getattr(app, "routes", ())
+    endpoint = scope.get("endpoint")
+    if endpoint is not None:
+        caminhos = _rotas_por_endpoint.get(id(app))
+        if caminhos is None:
+            caminhos = {}
+            for rota in rotas:
+                if hasattr(rota, "endpoint"):
+                    caminhos.setdefault(rota.endpoint, rota.path)
+            _rotas_por_endpoint[id(app)] = caminhos
+        if endpoint in caminhos:
+            return caminhos[endpoint]
+    # resposta dada por um middleware antes do roteamento (ex.: 304 da ETag)
+    for rota in rotas:
+        if rota.matches(scope)[0] == Match.FULL:
+            return rota.path
+    return "sem_rota"
+
+class MiddlewareMetricas:
+    """Middleware ASGI que registra a duração de cada requisição HTTP por método, rota e status"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in ROTAS_SEM_METRICA:
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        inicio = time.perf_counter()
+
+        async def enviar(mensagem):
+            nonlocal status
+            if mensagem["type"] == "http.response.start":
+                status = mensagem["status"]
+            await send(mensagem)
+
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            duracao_requisicoes.observar(time.perf_counter() - inicio, method=scope["method"],
+                                         route=_rota(scope), status=str(status))
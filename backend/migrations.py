@@ -0,0 +1,409 @@
+import hashlib
+import datetime as dt
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Cada migração é (versão, descrição, função que recebe o cursor).
+# As migrações já aplicadas ficam registradas na tabela schema_version; para
+# alterar o schema basta acrescentar um novo passo ao final da lista.
+# Os passos antigos usam IF NOT EXISTS / verificações de coluna porque bancos
+# criados antes do controle de versão já possuem parte dessas estruturas.
+
+def _m001_schema_inicial(cur):
+    cur.execute("""CREATE TABLE IF NOT EXISTS equipamentos(
+        tag TEXT PRIMARY KEY,
+        tipo TEXT NOT NULL,
+        intervalo REAL DEFAULT 0,
+        ultima_manut REAL DEFAULT 0
+    )""")
+
+    cur.execute("""CREATE TABLE IF NOT EXISTS lancamentos(
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        tag TEXT,
+        data DATE,
+        h_final REAL,
+        FOREIGN KEY(tag) REFERENCES equipamentos(tag)
+    )""")
+
+    cur.execute("""CREATE TABLE IF NOT EXISTS fornecedores(
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        nome TEXT NOT NULL,
+        cnpj TEXT UNIQUE,
+        telefone TEXT,
+        email TEXT,
+        endereco TEXT,
+        especialidade TEXT,
+        ativo BOOLEAN DEFAULT 1
+    )""")
+
+    cur.execute("""CREATE TABLE IF NOT EXISTS manutencoes(
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        tag TEXT NOT NULL,
+        tipo_manutencao TEXT NOT NULL,
+        data_agendada DATE,
+        data_realizada DATE,
+        fornecedor_id INTEGER,
+        valor_orcado REAL,
+        valor_real REAL,
+        status TEXT DEFAULT 'AGENDADA',
+        observacoes TEXT,
+        proxima_manutencao DATE,
+        horas_km_manutencao REAL,
+        execucao TEXT,
+        responsavel TEXT,
+        reprogramacao TEXT,
+        numero_os TEXT,
+        FOREIGN KEY(tag) REFERENCES equipamentos(tag),
+        FOREIGN KEY(fornecedor_id) REFERENCES fornecedores(id)
+    )""")
+
+    cur.execute("""CREATE TABLE IF NOT EXISTS checklists_manutencao(
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        manutencao_id INTEGER NOT NULL,
+        item TEXT NOT NULL,
+        status TEXT DEFAULT 'PENDENTE',
+        observacao TEXT,
+        responsavel TEXT,
+        data_conclusao DATETIME,
+        FOREIGN KEY(manutencao_id) REFERENCES manutencoes(id)
+    )""")
+
+    cur.execute("""CREATE TABLE IF NOT EXISTS agendamentos(
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        manutencao_id INTEGER NOT NULL,
+        data_hora DATETIME NOT NULL,
+        duracao_estimada INTEGER DEFAULT 60,
+        local TEXT,
+        responsavel TEXT,
+        status TEXT DEFAULT 'CONFIRMADO',
+        FOREIGN KEY(manutencao_id) REFERENCES manutencoes(id)
+    )""")
+
+# Colunas do hash de conteúdo de uma OS, na ordem usada pelo importador (app._importar_manutencoes)
+COLUNAS_HASH_OS = ["tag", "tipo_manutencao", "data_agendada", "status", "observacoes", "execucao",
+                   "responsavel", "reprogramacao", "numero_os"]
+
+def _chavear_manutencoes_existentes(cur):
+    """Dá a chave e o hash do importador às OS gravadas antes deles, mantendo uma por chave.
+
+    A chave é a mesma do importador: "TAG|nº OS" ou, sem número, o hash do
+    conteúdo. Entre as cópias da mesma chave fica a que tem checklist ou
+    agendamento (ou a mais antiga), com o conteúdo que tiver, inclusive
+    status e observações editados; checklists e agendamentos das demais
+    passam para ela e só então as cópias extras são apagadas. Assim a próxima
+    importação encontra a OS pela chave em vez de inserir outra.
+    """
+    referenciadas = {linha[0] for linha in cur.execute("""
+        SELECT manutencao_id FROM checklists_manutencao
+        UNION SELECT manutencao_id FROM agendamentos
+    """).fetchall()}
+    copias = {}
+    linhas = cur.execute(f"SELECT id, {', '.join(COLUNAS_HASH_OS)} FROM manutencoes ORDER BY id").fetchall()
+    for id_, *valores in linhas:
+        textos = ["" if valor is None else str(valor).strip() for valor in valores]
+        textos[0] = textos[0].upper()
+        hash_os = hashlib.sha1("\x1f".join(textos).encode("utf-8")).hexdigest()
+        numero = textos[-1]
+        chave = f"{textos[0]}|{numero}" if numero and numero.lower() not in ("nan", "none") else f"hash:{hash_os}"
+        copias.setdefault(chave, []).append((id_, hash_os))
+
+    for chave, lista in copias.items():
+        id_mantido, hash_os = next((c for c in lista if c[0] in referenciadas), lista[0])
+        extras = [(id_mantido, id_) for id_, _ in lista if id_ != id_mantido]
+        if extras:
+            cur.executemany("UPDATE checklists_manutencao SET manutencao_id = ? WHERE manutencao_id = ?", extras)
+            cur.executemany("UPDATE agendamentos SET manutencao_id = ? WHERE manutencao_id = ?", extras)
+            cur.executemany("DELETE FROM manutencoes WHERE id = ?", [(id_,) for _, id_ in extras])
+        cur.execute("UPDATE manutencoes SET chave_importacao = ?, hash_importacao = ? WHERE id = ?",
+                    (chave, hash_os, id_mantido))
+
+def _m002_importacao_incremental(cur):
+    # Registro das importações (hash da planilha e contagens)
+    cur.execute("""CREATE TABLE IF NOT EXISTS importacoes(
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        arquivo TEXT,
+        arquivo_hash TEXT NOT NULL,
+        data_importacao DATETIME,
+        inseridos INTEGER DEFAULT 0,
+        atualizados INTEGER DEFAULT 0,
+        ignorados INTEGER DEFAULT 0
+    )""")
+
+    # Chave natural das OS importadas; as duplicatas acumuladas pelas
+    # importações antigas se reduzem a uma OS por chave
+    colunas = [row[1] for row in cur.execute("PRAGMA table_info(manutencoes)")]
+    if "chave_importacao" not in colunas:
+        cur.execute("ALTER TABLE manutencoes ADD COLUMN chave_importacao TEXT")
+        cur.execute("ALTER TABLE manutencoes ADD COLUMN hash_importacao TEXT")
+        _chavear_manutencoes_existentes(cur)
+        cur.execute("DELETE FROM importacoes")
+    cur.execute("""CREATE UNIQUE INDEX IF NOT EXISTS ux_manutencoes_chave
+                   ON manutencoes(chave_importacao)""")
+
+    cur.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND name = 'ux_lancamentos_chave'")
+    if not cur.fetchone():
+        cur.execute("""
+            DELETE FROM lancamentos
+            WHERE id NOT IN (SELECT MIN(id) FROM lancamentos GROUP BY tag, data, h_final)
+        """)
+        cur.execute("""CREATE UNIQUE INDEX ux_lancamentos_chave
+                       ON lancamentos(tag, data, h_final)""")
+
+def _m003_situacao_equipamentos(cur):
+    # Situação atual de cada equipamento, mantida pelo importador e pelos
+    # endpoints de intervalo para evitar agregar todo o histórico a cada leitura
+    cur.execute("""CREATE TABLE IF NOT EXISTS equipment_status(
+        tag TEXT PRIMARY KEY,
+        tipo TEXT,
+        intervalo REAL DEFAULT 0,
+        ultima_manut REAL DEFAULT 0,
+        atual REAL DEFAULT 0,
+        ultima_atualizacao DATE,
+        uso REAL DEFAULT 0,
+        percentual REAL DEFAULT 0,
+        status TEXT,
+        FOREIGN KEY(tag) REFERENCES equipamentos(tag)
+    )""")
+
+def _m004_indices(cur):
+    # (tag, data) já é atendido pelo prefixo de ux_lancamentos_chave
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_lancamentos_tag_h_final ON lancamentos(tag, h_final)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_manutencoes_tag_data ON manutencoes(tag, data_agendada)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_manutencoes_status ON manutencoes(status)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_manutencoes_data ON manutencoes(data_agendada, id)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_manutencoes_fornecedor ON manutencoes(fornecedor_id)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_checklists_manutencao ON checklists_manutencao(manutencao_id)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_agendamentos_manutencao ON agendamentos(manutencao_id)")
+    cur.execute("ANALYZE")
+
+def _m005_historico_importacoes(cur):
+    cur.execute("""CREATE TABLE IF NOT EXISTS importacao_jobs(
+        id TEXT PRIMARY KEY,
+        origem TEXT,
+        status TEXT,
+        fase TEXT,
+        progresso REAL DEFAULT 0,
+        linhas_processadas INTEGER DEFAULT 0,
+        criado_em DATETIME,
+        iniciado_em DATETIME,
+        concluido_em DATETIME,
+        duracao REAL,
+        resultado TEXT,
+        erro TEXT
+    )""")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_importacao_jobs_criado ON importacao_jobs(criado_em)")
+
+def _m006_indices_paginacao(cur):
+    # Filtros + ordenação da paginação por chave (o rowid/id entra implicitamente no fim do índice)
+    cur.execute("DROP INDEX IF EXISTS idx_manutencoes_status")
+    cur.execute("DROP INDEX IF EXISTS idx_manutencoes_fornecedor")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_manutencoes_status_data ON manutencoes(status, data_agendada)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_manutencoes_fornecedor_data ON manutencoes(fornecedor_id, data_agendada)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_equipment_status_status ON equipment_status(status, tag)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_equipment_status_percentual ON equipment_status(percentual, tag)")
+    cur.execute("ANALYZE")
+
+def _m007_resumos_lancamentos(cur):
+    # Resumo diário/semanal/mensal das leituras de cada equipamento, mantido
+    # pelo importador (usage_rollups) para o histórico em /equipment/{tag}/history
+    cur.execute("""CREATE TABLE IF NOT EXISTS lancamentos_resumo(
+        tag TEXT NOT NULL,
+        granularidade TEXT NOT NULL,
+        periodo DATE NOT NULL,
+        primeira_data DATE,
+        ultima_data DATE,
+        leitura_min REAL,
+        leitura_max REAL,
+        lancamentos INTEGER DEFAULT 0,
+        uso REAL,
+        PRIMARY KEY (tag, granularidade, periodo)
+    )""")
+
+MIGRACOES = [
+    (1, "Schema inicial", _m001_schema_inicial),
+    (2, "Importação incremental (registro e chaves naturais)", _m002_importacao_incremental),
+    (3, "Tabela equipment_status", _m003_situacao_equipamentos),
+    (4, "Índices de lancamentos, manutencoes, checklists e agendamentos", _m004_indices),
+    (5, "Histórico de jobs de importação", _m005_historico_importacoes),
+    (6, "Índices para filtros e paginação de manutenções e equipamentos", _m006_indices_paginacao),
+    (7, "Resumos de leituras por período (lancamentos_resumo)", _m007_resumos_lancamentos),
+]
+
+# PostgreSQL: bancos novos recebem de uma vez o schema equivalente à versão 6
+# do SQLite. As próximas migrações devem ser acrescentadas às duas listas com
+# o mesmo número. Datas continuam como TEXT ISO-8601 e booleanos como 0/1,
+# iguais ao SQLite, porque o código compara e ordena esses valores como texto.
+# Também não há chaves estrangeiras: o SQLite nunca as aplicou (foreign_keys
+# desligado) e a importação grava lançamentos e OS antes dos equipamentos.
+
+def _pg006_schema_completo(cur):
+    cur.execute("""CREATE TABLE IF NOT EXISTS equipamentos(
+        tag TEXT PRIMARY KEY,
+        tipo TEXT NOT NULL,
+        intervalo DOUBLE PRECISION DEFAULT 0,
+        ultima_manut DOUBLE PRECISION DEFAULT 0
+    )""")
+
+    cur.execute("""CREATE TABLE IF NOT EXISTS lancamentos(
+        id BIGSERIAL PRIMARY KEY,
+        tag TEXT,
+        data TEXT,
+        h_final DOUBLE PRECISION
+    )""")
+    cur.execute("CREATE UNIQUE INDEX IF NOT EXISTS ux_lancamentos_chave ON lancamentos(tag, data, h_final)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_lancamentos_tag_h_final ON lancamentos(tag, h_final)")
+
+    cur.execute("""CREATE TABLE IF NOT EXISTS fornecedores(
+        id BIGSERIAL PRIMARY KEY,
+        nome TEXT NOT NULL,
+        cnpj TEXT UNIQUE,
+        telefone TEXT,
+        email TEXT,
+        endereco TEXT,
+        especialidade TEXT,
+        ativo INTEGER DEFAULT 1
+    )""")
+
+    cur.execute("""CREATE TABLE IF NOT EXISTS manutencoes(
+        id BIGSERIAL PRIMARY KEY,
+        tag TEXT NOT NULL,
+        tipo_manutencao TEXT NOT NULL,
+        data_agendada TEXT,
+        data_realizada TEXT,
+        fornecedor_id BIGINT,
+        valor_orcado DOUBLE PRECISION,
+        valor_real DOUBLE PRECISION,
+        status TEXT DEFAULT 'AGENDADA',
+        observacoes TEXT,
+        proxima_manutencao TEXT,
+        horas_km_manutencao DOUBLE PRECISION,
+        execucao TEXT,
+        responsavel TEXT,
+        reprogramacao TEXT,
+        numero_os TEXT,
+        chave_importacao TEXT,
+        hash_importacao TEXT
+    )""")
+    cur.execute("CREATE UNIQUE INDEX IF NOT EXISTS ux_manutencoes_chave ON manutencoes(chave_importacao)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_manutencoes_tag_data ON manutencoes(tag, data_agendada)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_manutencoes_data ON manutencoes(data_agendada, id)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_manutencoes_status_data ON manutencoes(status, data_agendada, id)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_manutencoes_fornecedor_data ON manutencoes(fornecedor_id, data_agendada, id)")
+
+    cur.execute("""CREATE TABLE IF NOT EXISTS checklists_manutencao(
+        id BIGSERIAL PRIMARY KEY,
+        manutencao_id BIGINT NOT NULL,
+        item TEXT NOT NULL,
+        status TEXT DEFAULT 'PENDENTE',
+        observacao TEXT,
+        responsavel TEXT,
+        data_conclusao TEXT
+    )""")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_checklists_manutencao ON checklists_manutencao(manutencao_id)")
+
+    cur.execute("""CREATE TABLE IF NOT EXISTS agendamentos(
+        id BIGSERIAL PRIMARY KEY,
+        manutencao_id BIGINT NOT NULL,
+        data_hora TEXT NOT NULL,
+        duracao_estimada INTEGER DEFAULT 60,
+        local TEXT,
+        responsavel TEXT,
+        status TEXT DEFAULT 'CONFIRMADO'
+    )""")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_agendamentos_manutencao ON agendamentos(manutencao_id)")
+
+    cur.execute("""CREATE TABLE IF NOT EXISTS importacoes(
+        id BIGSERIAL PRIMARY KEY,
+        arquivo TEXT,
+        arquivo_hash TEXT NOT NULL,
+        data_importacao TEXT,
+        inseridos INTEGER DEFAULT 0,
+        atualizados INTEGER DEFAULT 0,
+        ignorados INTEGER DEFAULT 0
+    )""")
+
+    cur.execute("""CREATE TABLE IF NOT EXISTS equipment_status(
+        tag TEXT PRIMARY KEY,
+        tipo TEXT,
+        intervalo DOUBLE PRECISION DEFAULT 0,
+        ultima_manut DOUBLE PRECISION DEFAULT 0,
+        atual DOUBLE PRECISION DEFAULT 0,
+        ultima_atualizacao TEXT,
+        uso DOUBLE PRECISION DEFAULT 0,
+        percentual DOUBLE PRECISION DEFAULT 0,
+        status TEXT
+    )""")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_equipment_status_status ON equipment_status(status, tag)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_equipment_status_percentual ON equipment_status(percentual, tag)")
+
+    cur.execute("""CREATE TABLE IF NOT EXISTS importacao_jobs(
+        id TEXT PRIMARY KEY,
+        origem TEXT,
+        status TEXT,
+        fase TEXT,
+        progresso DOUBLE PRECISION DEFAULT 0,
+        linhas_processadas INTEGER DEFAULT 0,
+        criado_em TEXT,
+        iniciado_em TEXT,
+        concluido_em TEXT,
+        duracao DOUBLE PRECISION,
+        resultado TEXT,
+        erro TEXT
+    )""")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_importacao_jobs_criado ON importacao_jobs(criado_em)")
+    cur.execute("ANALYZE")
+
+def _pg007_resumos_lancamentos(cur):
+    cur.execute("""CREATE TABLE IF NOT EXISTS lancamentos_resumo(
+        tag TEXT NOT NULL,
+        granularidade TEXT NOT NULL,
+        periodo TEXT NOT NULL,
+        primeira_data TEXT,
+        ultima_data TEXT,
+        leitura_min DOUBLE PRECISION,
+        leitura_max DOUBLE PRECISION,
+        lancamentos INTEGER DEFAULT 0,
+        uso DOUBLE PRECISION,
+        PRIMARY KEY (tag, granularidade, periodo)
+    )""")
+
+MIGRACOES_POSTGRES = [
+    (6, "Schema completo (PostgreSQL)", _pg006_schema_completo),
+    (7, "Resumos de leituras por período (lancamentos_resumo)", _pg007_resumos_lancamentos),
+]
+
+def versao_atual(cur, tipo_data: str = "DATETIME") -> int:
+    """Retorna a versão do schema registrada no banco (0 se nenhuma)"""
+    cur.execute(f"""CREATE TABLE IF NOT EXISTS schema_version(
+        versao INTEGER PRIMARY KEY,
+        descricao TEXT,
+        aplicada_em {tipo_data}
+    )""")
+    cur.execute("SELECT MAX(versao) FROM schema_version")
+    return cur.fetchone()[0] or 0
+
+def aplicar_migracoes(conn, armazenamento) -> int:
+    """Aplica, em ordem e cada uma em sua própria transação, as migrações pendentes"""
+    postgres = armazenamento.nome == "postgresql"
+    cur = conn.cursor()
+    versao = versao_atual(cur, "TEXT" if postgres else "DATETIME")
+    conn.commit()
+
+    for numero, descricao, passo in (MIGRACOES_POSTGRES if postgres else MIGRACOES):
+        if numero <= versao:
+            continue
+        try:
+            armazenamento.iniciar_transacao(cur)
+            passo(cur)
+            cur.execute("INSERT INTO schema_version (versao, descricao, aplicada_em) VALUES (?, ?, ?)",
+                        (numero, descricao, dt.datetime.now().isoformat()))
+            conn.commit()
+            versao = numero
+            logger.info(f"Migração {numero} aplicada: {descricao}")
+        except Exception as e:
+            conn.rollback()
+            logger.error(f"Erro ao aplicar migração {numero} ({descricao}): {e}")
+            raise
+
+    return versao
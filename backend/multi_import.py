@@ -0,0 +1,176 @@
+import os
+import time
+import logging
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
+from pathlib import Path
+from typing import Any, Dict, List
+
+from advanced_importer import AdvancedImporter
+from spreadsheet_reader import ler_para_importacao, ler_lotes
+
+logger = logging.getLogger(__name__)
+
+# Importação de várias origens (uma planilha de produtividade por site).
+# Configuração (variáveis de ambiente):
+#   IMPORT_DOWNLOADS_PARALELOS   downloads simultâneos (padrão 4)
+#   IMPORT_PROCESSOS_LEITURA     processos que leem as planilhas (padrão: nº de CPUs)
+TIPOS_ORIGEM = ("local", "network", "s3", "ftp")
+
+# Regra para dados já gravados que a origem traz diferentes (intervalo do
+# equipamento e conteúdo de uma OS): "replace" sobrescreve, "keep" mantém o banco
+REGRAS_CONFLITO = ("replace", "keep")
+
+def identificar_origem(config: Dict[str, Any]) -> str:
+    """Identificador da origem no registro de importações (tipo e caminho configurados)"""
+    return f"{config['importType']}:{config.get('filePath', '')}"
+
+class FonteImportacao:
+    """Uma origem da importação de várias fontes e o seu andamento.
+
+    ``config`` tem o mesmo formato de /api/config/import (importType, filePath,
+    username, password) mais ``name``, ``priority`` (maior prevalece) e
+    ``conflictRule`` (replace ou keep).
+    """
+
+    def __init__(self, config: Dict[str, Any]):
+        self.config = config
+        self.origem = identificar_origem(config)
+        self.nome = str(config.get("name") or self.origem)
+        self.prioridade = int(config.get("priority", 0))
+        self.regra = config.get("conflictRule", "replace")
+        self.caminho = None
+        self.importer = None
+        self.dados = None  # retorno de ler_para_importacao
+        self.erro = None
+        self.resultado = None
+        self.tempos = {}
+
+    @property
+    def arquivo_hash(self):
+        return self.dados["arquivo_hash"] if self.dados else None
+
+    @property
+    def linhas(self) -> int:
+        return self.dados["linhas"] if self.dados else 0
+
+    def lotes(self):
+        """A aba PRODUTIVIDADE lida, um lote por vez, do arquivo temporário da leitura"""
+        return ler_lotes(self.dados["lotes"])
+
+    def descartar_lotes(self):
+        """Apaga o arquivo temporário com os lotes lidos (depois da gravação ou de uma falha)"""
+        if self.dados and self.dados.get("lotes"):
+            Path(self.dados["lotes"]).unlink(missing_ok=True)
+
+    def descartar_arquivo(self):
+        # a cópia de uma origem remota fica no cache de downloads; só os temporários são removidos
+        if self.importer is not None:
+            self.importer.cleanup()
+            self.importer = None
+        self.caminho = None
+
+    def para_dict(self) -> Dict[str, Any]:
+        if self.erro:
+            status = "falhou"
+        else:
+            status = self.resultado["status"] if self.resultado else "pendente"
+        return {
+            "nome": self.nome,
+            "origem": self.origem,
+            "prioridade": self.prioridade,
+            "regra_conflito": self.regra,
+            "status": status,
+            "erro": self.erro,
+            "resultado": self.resultado,
+            "tempos": self.tempos
+        }
+
+def preparar_fontes(configs) -> List[FonteImportacao]:
+    """Valida a lista de origens recebida na API; ValueError se alguma for inválida"""
+    if not isinstance(configs, list) or not configs:
+        raise ValueError("Informe ao menos uma origem em sources")
+    fontes = []
+    for numero, config in enumerate(configs, start=1):
+        if not isinstance(config, dict) or config.get("importType") not in TIPOS_ORIGEM:
+            raise ValueError(f"Origem {numero}: tipo de importação não suportado")
+        if config.get("conflictRule", "replace") not in REGRAS_CONFLITO:
+            raise ValueError(f"Origem {numero}: conflictRule deve ser {' ou '.join(REGRAS_CONFLITO)}")
+        try:
+            fontes.append(FonteImportacao(config))
+        except (TypeError, ValueError):
+            raise ValueError(f"Origem {numero}: priority deve ser um número inteiro")
+    nomes = [f.nome for f in fontes]
+    repetidos = sorted({n for n in nomes if nomes.count(n) > 1})
+    if repetidos:
+        raise ValueError(f"Origens repetidas: {', '.join(repetidos)}")
+    return fontes
+
+def _baixar(fonte: FonteImportacao):
+    inicio = time.perf_counter()
+    importer = fonte.importer = AdvancedImporter(fonte.config)
+    caminho = importer.download_file()
+    fonte.tempos["download"] = round(time.perf_counter() - inicio, 3)
+    if not caminho:
+        raise RuntimeError(f"Erro ao baixar arquivo ({fonte.config['importType']})")
+    fonte.caminho = caminho
+
+def baixar_e_ler(fontes: List[FonteImportacao], job, downloads: int = None, processos: int = None):
+    """Baixa as origens em paralelo e lê cada planilha em outro processo assim que chega.
+
+    Os downloads são I/O e rodam em threads. A leitura (calamine/openpyxl e
+    montagem dos DataFrames) usa CPU e prende o GIL; em processos separados
+    ela não disputa o interpretador com as threads que atendem a API e, com
+    mais de um núcleo, as planilhas são lidas ao mesmo tempo. Os lançamentos
+    lidos ficam em um arquivo temporário por origem (``FonteImportacao.lotes``),
+    apagado com ``descartar_lotes``; em memória fica só a aba de OS. Uma origem que
+    falha fica com ``erro`` preenchido sem interromper as demais. O progresso
+    do job vai de 0 a 40.
+    """
+    downloads = downloads or int(os.getenv("IMPORT_DOWNLOADS_PARALELOS", 4))
+    processos = processos or int(os.getenv("IMPORT_PROCESSOS_LEITURA", 0)) or os.cpu_count() or 1
+    total = len(fontes)
+    concluidas = 0
+
+    baixador = ThreadPoolExecutor(min(downloads, total), thread_name_prefix="import-download")
+    # spawn: o processo do servidor tem threads e conexões abertas que não devem ser copiadas por fork
+    leitores = ProcessPoolExecutor(min(processos, total), mp_context=multiprocessing.get_context("spawn"))
+    pendentes = {}
+    try:
+        job.definir_fase("baixando", 0)
+        pendentes.update((baixador.submit(_baixar, fonte), (fonte, "no download")) for fonte in fontes)
+        inicio_leitura = {}
+        while pendentes:
+            prontos, _ = wait(pendentes, timeout=1, return_when=FIRST_COMPLETED)
+            job.verificar_cancelamento()
+            for futuro in prontos:
+                fonte, etapa = pendentes.pop(futuro)
+                try:
+                    retorno = futuro.result()
+                except Exception as e:
+                    logger.error(f"Erro {etapa} da origem {fonte.nome}: {e}")
+                    fonte.erro = f"Erro {etapa}: {e}"
+                    fonte.descartar_arquivo()
+                    concluidas += 1
+                    continue
+                if etapa == "no download":
+                    inicio_leitura[fonte.nome] = time.perf_counter()
+                    pendentes[leitores.submit(ler_para_importacao, str(fonte.caminho))] = (fonte, "na leitura")
+                else:
+                    fonte.dados = retorno
+                    fonte.tempos["leitura"] = retorno["segundos"]
+                    fonte.tempos["espera_leitura"] = round(
+                        time.perf_counter() - inicio_leitura[fonte.nome] - retorno["segundos"], 3)
+                    fonte.descartar_arquivo()
+                    concluidas += 1
+            lendo = any(etapa == "na leitura" for _, etapa in pendentes.values())
+            job.definir_fase("lendo" if lendo else "baixando", 40 * concluidas / total)
+    finally:
+        baixador.shutdown(wait=True, cancel_futures=True)
+        leitores.shutdown(wait=True, cancel_futures=True)
+        for fonte in fontes:
+            fonte.descartar_arquivo()
+        # leituras que terminaram depois de um cancelamento: ninguém vai usar os lotes
+        for futuro, (_, etapa) in pendentes.items():
+            if etapa == "na leitura" and futuro.done() and not futuro.cancelled() and futuro.exception() is None:
+                Path(futuro.result()["lotes"]).unlink(missing_ok=True)
@@ -0,0 +1,71 @@
+import json
+import base64
+from typing import Any, List, Optional, Tuple
+
+# Paginação por chave (keyset): o cursor guarda os valores da ordenação da
+# última linha entregue e a próxima página começa logo depois dela, usando o
+# índice em vez de OFFSET (que relê todas as linhas anteriores a cada página).
+LIMITE_PADRAO = 100
+LIMITE_MAXIMO = 500
+
+def codificar_cursor(ordenar: str, direcao: str, valor: Any, desempate: Any) -> str:
+    dados = json.dumps({"o": ordenar, "s": direcao, "v": valor, "d": desempate}, separators=(",", ":"),
+                       default=str)
+    return base64.urlsafe_b64encode(dados.encode("utf-8")).decode("ascii").rstrip("=")
+
+def decodificar_cursor(cursor: str, ordenar: str, direcao: str) -> Tuple[Any, Any]:
+    """Retorna (valor, desempate) da última linha; ValueError se o cursor for inválido
+    ou tiver sido gerado para outra ordenação ou direção"""
+    try:
+        preenchimento = "=" * (-len(cursor) % 4)
+        dados = json.loads(base64.urlsafe_b64decode(cursor + preenchimento))
+        valor, desempate = dados["v"], dados["d"]
+        origem, sentido = dados["o"], dados["s"]
+    except Exception:
+        raise ValueError("Cursor inválido")
+    if origem != ordenar:
+        raise ValueError("Cursor gerado para outra ordenação")
+    if sentido != direcao:
+        raise ValueError("Cursor gerado para outra direção")
+    return valor, desempate
+
+def condicao_keyset(coluna: str, desempate: str, valor: Any, valor_desempate: Any,
+                    descendente: bool) -> Tuple[str, List[Any]]:
+    """Condição WHERE das linhas posteriores a (valor, valor_desempate) na ordenação
+    ``coluna, desempate`` (ambas ASC ou ambas DESC).
+
+    NULL vem antes de qualquer valor (padrão do SQLite, explícito no ORDER BY
+    para o PostgreSQL), então em ordem DESC os NULL ficam no fim e em ordem ASC no começo.
+    """
+    op = "<" if descendente else ">"
+    if coluna == desempate:
+        return f"{coluna} {op} ?", [valor_desempate]
+    if valor is None:
+        if descendente:
+            return f"({coluna} IS NULL AND {desempate} {op} ?)", [valor_desempate]
+        return f"(({coluna} IS NULL AND {desempate} {op} ?) OR {coluna} IS NOT NULL)", [valor_desempate]
+    condicao = f"({coluna} {op} ? OR ({coluna} = ? AND {desempate} {op} ?)"
+    if descendente:
+        condicao += f" OR {coluna} IS NULL"
+    return condicao + ")", [valor, valor, valor_desempate]
+
+def ordenacao_keyset(condicoes: List[str], params: List[Any], ordenar: str, coluna: str,
+                     desempate: str, descendente: bool, cursor: Optional[str]) -> str:
+    """Acrescenta a condição do cursor (se houver) e retorna a cláusula ORDER BY"""
+    if cursor:
+        valor, valor_desempate = decodificar_cursor(cursor, ordenar, "desc" if descendente else "asc")
+        condicao, valores = condicao_keyset(coluna, desempate, valor, valor_desempate, descendente)
+        condicoes.append(condicao)
+        params.extend(valores)
+    direcao = "DESC" if descendente else "ASC"
+    if coluna == desempate:
+        return f"ORDER BY {coluna} {direcao}"
+    nulos = "NULLS LAST" if descendente else "NULLS FIRST"
+    return f"ORDER BY {coluna} {direcao} {nulos}, {desempate} {direcao}"
+
+def validar_limite(limite: Optional[int]) -> int:
+    if limite is None:
+        return LIMITE_PADRAO
+    if limite < 1:
+        raise ValueError("limit deve ser maior que zero")
+    return min(limite, LIMITE_MAXIMO)
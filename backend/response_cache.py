@@ -0,0 +1,282 @@
+import os
+import json
+import asyncio
+import functools
+import time
+import logging
+import threading
+import datetime as dt
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict
+
+from fastapi.encoders import jsonable_encoder
+from starlette.concurrency import run_in_threadpool
+
+logger = logging.getLogger(__name__)
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+# Configuração (variáveis de ambiente):
+#   CACHE_BACKEND   memoria (padrão), redis ou desligado
+#   CACHE_TTL       validade de cada resposta em segundos (padrão 300)
+#   CACHE_MAX_ITENS respostas mantidas no cache em memória (padrão 256, LRU)
+#   REDIS_URL       conexão do backend redis (padrão redis://redis:6379/0)
+TTL_PADRAO = 300
+MAX_ITENS_PADRAO = 256
+
+class _Estatisticas:
+    def __init__(self):
+        self.acertos = 0
+        self.falhas = 0
+        self.despejos = 0
+        self.expirados = 0
+        self.invalidacoes = 0
+
+    def para_dict(self) -> Dict[str, Any]:
+        total = self.acertos + self.falhas
+        return {
+            "acertos": self.acertos,
+            "falhas": self.falhas,
+            "despejos": self.despejos,
+            "expirados": self.expirados,
+            "invalidacoes": self.invalidacoes,
+            "taxa_acerto": round(self.acertos / total, 3) if total else None,
+        }
+
+class CacheMemoria:
+    """Cache LRU com TTL, local ao processo"""
+
+    backend = "memoria"
+
+    def __init__(self, max_itens: int = MAX_ITENS_PADRAO, ttl: float = TTL_PADRAO):
+        self.max_itens = max_itens
+        self.ttl = ttl
+        self._itens: "OrderedDict[str, tuple]" = OrderedDict()
+        self._trava = threading.Lock()
+        self._geracao = 0
+        self.estatisticas = _Estatisticas()
+
+    def geracao(self) -> int:
+        return self._geracao
+
+    def obter(self, chave: str, geracao: int):
+        """Retorna (encontrado, valor)"""
+        with self._trava:
+            item = self._itens.get(chave)
+            if item is None:
+                self.estatisticas.falhas += 1
+                return False, None
+            expira_em, valor = item
+            if expira_em < time.monotonic():
+                del self._itens[chave]
+                self.estatisticas.expirados += 1
+                self.estatisticas.falhas += 1
+                return False, None
+            self._itens.move_to_end(chave)
+            self.estatisticas.acertos += 1
+            return True, valor
+
+    def gravar(self, chave: str, valor, geracao: int):
+        with self._trava:
+            # descarta resultados calculados antes de uma invalidação
+            if geracao != self._geracao:
+                return
+            self._itens[chave] = (time.monotonic() + self.ttl, valor)
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.max_itens:
+                self._itens.popitem(last=False)
+                self.estatisticas.despejos += 1
+
+    def invalidar(self):
+        with self._trava:
+            self._itens.clear()
+            self._geracao += 1
+            self.estatisticas.invalidacoes += 1
+
+    def info(self) -> Dict[str, Any]:
+        return {"itens": len(self._itens), "max_itens": self.max_itens}
+
+class CacheRedis:
+    """Cache compartilhado entre workers do uvicorn.
+
+    A invalidação incrementa um contador de geração no Redis que faz parte das
+    chaves; as respostas da geração anterior deixam de ser lidas e expiram pelo
+    TTL. O despejo por tamanho fica a cargo da política maxmemory do Redis.
+    """
+
+    backend = "redis"
+
+    def __init__(self, url: str, ttl: float = TTL_PADRAO, prefixo: str = "fleetcare:cache"):
+        self.ttl = ttl
+        self.prefixo = prefixo
+        self._cliente = redis.Redis.from_url(url, socket_timeout=2, socket_connect_timeout=2)
+        self._cliente.ping()
+        # instante da última invalidação, compartilhado pelos workers (Last-Modified)
+        self._cliente.set(f"{self.prefixo}:alterado_em", time.time(), nx=True)
+        self.estatisticas = _Estatisticas()
+
+    def geracao(self) -> int:
+        return int(self._cliente.get(f"{self.prefixo}:geracao") or 0)
+
+    def versao(self) -> tuple:
+        """(geração, instante da última invalidação) em uma única ida ao Redis"""
+        geracao, alterado_em = self._cliente.mget(f"{self.prefixo}:geracao", f"{self.prefixo}:alterado_em")
+        return int(geracao or 0), float(alterado_em) if alterado_em else None
+
+    def obter(self, chave: str, geracao: int):
+        dados = self._cliente.get(f"{self.prefixo}:{geracao}:{chave}")
+        if dados is None:
+            self.estatisticas.falhas += 1
+            return False, None
+        self.estatisticas.acertos += 1
+        return True, json.loads(dados)
+
+    def gravar(self, chave: str, valor, geracao: int):
+        dados = json.dumps(jsonable_encoder(valor))
+        self._cliente.set(f"{self.prefixo}:{geracao}:{chave}", dados, ex=max(1, int(self.ttl)))
+
+    def invalidar(self):
+        with self._cliente.pipeline() as pipe:
+            pipe.incr(f"{self.prefixo}:geracao")
+            pipe.set(f"{self.prefixo}:alterado_em", time.time())
+            pipe.execute()
+        self.estatisticas.invalidacoes += 1
+
+    def info(self) -> Dict[str, Any]:
+        return {"geracao": self.geracao()}
+
+async def _executar_direto(funcao, *args):
+    return funcao(*args)
+
+class CacheRespostas:
+    """Fachada usada pelos endpoints: calcula a resposta só quando não está em cache.
+
+    Erros do backend (ex.: Redis fora do ar) nunca derrubam a requisição; a
+    resposta é calculada normalmente.
+    """
+
+    def __init__(self, backend=None):
+        self._backend = backend
+
+    @property
+    def ativo(self) -> bool:
+        return self._backend is not None
+
+    @property
+    def compartilhado(self) -> bool:
+        """Verdadeiro quando o cache (e sua geração) é compartilhado entre processos"""
+        return self._backend is not None and self._backend.backend == "redis"
+
+    def obter_ou_calcular(self, chave: str, calcular: Callable[[], Any]):
+        if self._backend is None:
+            return calcular()
+        # a data entra na chave porque alertas e prazos mudam na virada do dia
+        chave = f"{dt.date.today().isoformat()}:{chave}"
+        try:
+            geracao = self._backend.geracao()
+            encontrado, valor = self._backend.obter(chave, geracao)
+            if encontrado:
+                return valor
+        except Exception as e:
+            logger.error(f"Erro ao ler cache de respostas: {e}")
+            return calcular()
+        valor = calcular()
+        try:
+            self._backend.gravar(chave, valor, geracao)
+        except Exception as e:
+            logger.error(f"Erro ao gravar cache de respostas: {e}")
+        return valor
+
+    async def obter_ou_calcular_async(self, chave: str, calcular: Callable[[], Awaitable[Any]]):
+        """Versão de ``obter_ou_calcular`` para endpoints ``async def``.
+
+        O cache em memória é consultado no próprio loop; com o Redis as
+        chamadas de rede vão para o threadpool para não bloquear o loop.
+        """
+        if self._backend is None:
+            return await calcular()
+        chave = f"{dt.date.today().isoformat()}:{chave}"
+        executar = run_in_threadpool if self.compartilhado else _executar_direto
+        try:
+            geracao = await executar(self._backend.geracao)
+            encontrado, valor = await executar(self._backend.obter, chave, geracao)
+            if encontrado:
+                return valor
+        except Exception as e:
+            logger.error(f"Erro ao ler cache de respostas: {e}")
+            return await calcular()
+        valor = await calcular()
+        try:
+            await executar(self._backend.gravar, chave, valor, geracao)
+        except Exception as e:
+            logger.error(f"Erro ao gravar cache de respostas: {e}")
+        return valor
+
+    def em_cache(self, nome: str):
+        """Decorador de endpoint: a resposta é guardada por nome + parâmetros da requisição.
+
+        Aceita endpoints ``def`` e ``async def``. Exceções (inclusive
+        HTTPException) não são guardadas.
+        """
+        def decorador(funcao):
+            if asyncio.iscoroutinefunction(funcao):
+                @functools.wraps(funcao)
+                async def envoltorio_async(*args, **kwargs):
+                    chave = f"{nome}:{json.dumps(kwargs, sort_keys=True, default=str)}"
+                    return await self.obter_ou_calcular_async(chave, lambda: funcao(*args, **kwargs))
+                return envoltorio_async
+
+            @functools.wraps(funcao)
+            def envoltorio(*args, **kwargs):
+                chave = f"{nome}:{json.dumps(kwargs, sort_keys=True, default=str)}"
+                return self.obter_ou_calcular(chave, lambda: funcao(*args, **kwargs))
+            return envoltorio
+        return decorador
+
+    def invalidar(self):
+        if self._backend is None:
+            return
+        try:
+            self._backend.invalidar()
+        except Exception as e:
+            logger.error(f"Erro ao invalidar cache de respostas: {e}")
+
+    def geracao(self) -> int:
+        return self._backend.geracao()
+
+    def versao(self) -> tuple:
+        """(geração, instante da última invalidação) do cache compartilhado"""
+        return self._backend.versao()
+
+    def estatisticas(self) -> Dict[str, Any]:
+        if self._backend is None:
+            return {"backend": "desligado"}
+        resultado = {"backend": self._backend.backend, "ttl": self._backend.ttl}
+        resultado.update(self._backend.estatisticas.para_dict())
+        try:
+            resultado.update(self._backend.info())
+        except Exception as e:
+            logger.error(f"Erro ao consultar cache de respostas: {e}")
+        return resultado
+
+def criar_cache() -> CacheRespostas:
+    """Cria o cache conforme CACHE_BACKEND; sem Redis disponível usa o cache em memória"""
+    backend = os.getenv("CACHE_BACKEND", "memoria").strip().lower()
+    ttl = float(os.getenv("CACHE_TTL", TTL_PADRAO))
+    if backend in ("desligado", "off", "0") or ttl <= 0:
+        return CacheRespostas(None)
+    if backend == "redis":
+        url = os.getenv("REDIS_URL", "redis://redis:6379/0")
+        if redis is None:
+            logger.warning("Pacote redis não instalado - usando cache em memória")
+        else:
+            try:
+                cache = CacheRespostas(CacheRedis(url, ttl))
+                logger.info(f"Cache de respostas no Redis ({url})")
+                return cache
+            except Exception as e:
+                logger.warning(f"Redis indisponível ({e}) - usando cache em memória")
+    return CacheRespostas(CacheMemoria(int(os.getenv("CACHE_MAX_ITENS", MAX_ITENS_PADRAO)), ttl))
@@ -0,0 +1,228 @@
+import os
+import re
+import time
+import pickle
+import hashlib
+import logging
+import tempfile
+import unicodedata
+import datetime as dt
+from itertools import islice
+from pathlib import Path
+from typing import Iterator, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Abas e colunas (já slugificadas) usadas pelo importador. Só essas colunas são
+# convertidas em DataFrame; as demais colunas da planilha são descartadas na leitura.
+ABA_PRODUTIVIDADE = "PRODUTIVIDADE"
+CABECALHO_PRODUTIVIDADE = 2  # linha (base 0) do cabeçalho; acima ficam título e linha em branco
+COLUNAS_PRODUTIVIDADE = ["tag", "data", "h_final", "atividade", "tipo"]
+COLUNAS_OBRIGATORIAS_PRODUTIVIDADE = {"tag", "data", "h_final"}
+
+ABA_OS = "CONTROLE DE OS"
+CABECALHO_OS = 0
+COLUNAS_OS = ["equipamento", "n_os", "data", "tipo_de_manutencao", "falha_apresentada",
+              "execucao", "responsavel_da_manutencao", "reprogramacao", "observacoes"]
+
+# Linhas por lote na leitura em streaming (ler_em_lotes)
+TAMANHO_LOTE = 5000
+
+# calamine (python-calamine, em Rust) é bem mais rápido que o openpyxl; se não
+# estiver instalado, o openpyxl é usado em modo somente leitura (streaming)
+MOTORES = ("calamine", "openpyxl")
+
+try:
+    import python_calamine
+except ImportError:
+    python_calamine = None
+
+def slug(c: str) -> str:
+    s = unicodedata.normalize("NFKD", c).encode("ascii", "ignore").decode("ascii")
+    return re.sub(r"[^a-z0-9]+", "_", s.lower()).strip("_")
+
+def motor_padrao() -> str:
+    """Motor definido em MOTOR_PLANILHA (auto, calamine ou openpyxl)"""
+    motor = os.getenv("MOTOR_PLANILHA", "auto").strip().lower()
+    if motor == "auto":
+        return "calamine" if python_calamine is not None else "openpyxl"
+    if motor not in MOTORES:
+        raise ValueError(f"MOTOR_PLANILHA inválido: {motor} (use auto, calamine ou openpyxl)")
+    if motor == "calamine" and python_calamine is None:
+        logger.warning("python-calamine não instalado - usando openpyxl")
+        return "openpyxl"
+    return motor
+
+def _normalizar(valor):
+    # Mesmas conversões do pd.read_excel: célula vazia vira NaN e números
+    # inteiros gravados como float voltam a ser int (ex.: nº de OS 1000.0 -> 1000)
+    if valor is None or valor == "":
+        return np.nan
+    if isinstance(valor, float) and valor.is_integer():
+        return int(valor)
+    if isinstance(valor, dt.date) and not isinstance(valor, dt.datetime):
+        return dt.datetime.combine(valor, dt.time())
+    return valor
+
+class LeitorPlanilha:
+    """Abre a planilha uma única vez e lê as abas projetando apenas as colunas pedidas.
+
+    Uso:
+        with LeitorPlanilha(caminho) as leitor:
+            df = leitor.ler_aba("PRODUTIVIDADE", cabecalho=2, colunas=["tag", "data"])
+    """
+
+    def __init__(self, caminho: Path, motor: str = None):
+        self.caminho = Path(caminho)
+        self.motor = motor or motor_padrao()
+        if self.motor == "calamine":
+            self._livro = python_calamine.CalamineWorkbook.from_path(str(self.caminho))
+            self.abas = list(self._livro.sheet_names)
+        else:
+            from openpyxl import load_workbook
+            self._livro = load_workbook(self.caminho, read_only=True, data_only=True)
+            self.abas = list(self._livro.sheetnames)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fechar()
+
+    def fechar(self):
+        if self.motor == "openpyxl" and self._livro is not None:
+            self._livro.close()
+        self._livro = None
+
+    def linhas(self, aba: str, inicio: int = 0, fim: int = None) -> Iterator[Sequence]:
+        """Itera as linhas físicas [inicio, fim) da aba (valores brutos, base 0)"""
+        if aba not in self.abas:
+            raise ValueError(f"Aba '{aba}' não encontrada na planilha")
+        if self.motor == "calamine":
+            folha = self._livro.get_sheet_by_name(aba)
+            # iter_rows começa na coluna da primeira célula preenchida
+            deslocamento = [""] * folha.start[1] if folha.start else []
+            linhas = (deslocamento + linha for linha in folha.iter_rows())
+        else:
+            linhas = self._livro[aba].iter_rows(values_only=True)
+        return islice(linhas, inicio, fim)
+
+    def total_linhas(self, aba: str) -> Optional[int]:
+        """Quantidade de linhas físicas da aba segundo os metadados (None se desconhecida)"""
+        if self.motor == "calamine":
+            return self._livro.get_sheet_by_name(aba).height
+        return self._livro[aba].max_row
+
+    def cabecalho(self, aba: str, linha: int = 0) -> List[Optional[str]]:
+        """Nomes slugificados da linha de cabeçalho (None para células vazias)"""
+        valores = next(iter(self.linhas(aba, linha, linha + 1)), ())
+        return [slug(str(v)) if v not in (None, "") else None for v in valores]
+
+    def _registros(self, aba: str, cabecalho: int, colunas: Optional[Sequence[str]]):
+        """Retorna (nomes das colunas, gerador das linhas projetadas e normalizadas)"""
+        nomes = self.cabecalho(aba, cabecalho)
+        indices = {}
+        for i, nome in enumerate(nomes):
+            if nome and nome not in indices and (colunas is None or nome in colunas):
+                indices[nome] = i
+        if colunas is not None:
+            indices = {c: indices[c] for c in colunas if c in indices}
+        posicoes = list(indices.values())
+
+        def gerar():
+            for linha in self.linhas(aba, cabecalho + 1):
+                tamanho = len(linha)
+                valores = [_normalizar(linha[p]) if p < tamanho else np.nan for p in posicoes]
+                if any(v is not np.nan for v in valores):
+                    yield valores
+
+        return list(indices.keys()), gerar()
+
+    def ler_aba(self, aba: str, cabecalho: int = 0, colunas: Sequence[str] = None) -> pd.DataFrame:
+        """Lê a aba como DataFrame com cabeçalhos slugificados.
+
+        Com ``colunas``, só essas colunas são lidas (as ausentes na planilha são
+        omitidas); linhas totalmente vazias são descartadas, como no pd.read_excel.
+        """
+        nomes, registros = self._registros(aba, cabecalho, colunas)
+        return pd.DataFrame(list(registros), columns=nomes, dtype=object).infer_objects()
+
+    def ler_em_lotes(self, aba: str, cabecalho: int = 0, colunas: Sequence[str] = None,
+                     tamanho_lote: int = TAMANHO_LOTE) -> Iterator[pd.DataFrame]:
+        """Como ``ler_aba``, mas entrega a aba em DataFrames de até ``tamanho_lote`` linhas.
+
+        Só um lote fica em memória por vez, independentemente do tamanho da aba.
+        """
+        nomes, registros = self._registros(aba, cabecalho, colunas)
+        while True:
+            lote = list(islice(registros, tamanho_lote))
+            if not lote:
+                return
+            yield pd.DataFrame(lote, columns=nomes, dtype=object).infer_objects()
+
+def validar_cabecalho(caminho: Path, aba: str = ABA_PRODUTIVIDADE, linha: int = CABECALHO_PRODUTIVIDADE,
+                      obrigatorias=COLUNAS_OBRIGATORIAS_PRODUTIVIDADE, motor: str = None) -> List[str]:
+    """Lê apenas a linha de cabeçalho; retorna as colunas obrigatórias ausentes"""
+    with LeitorPlanilha(caminho, motor) as leitor:
+        nomes = set(leitor.cabecalho(aba, linha))
+    return sorted(set(obrigatorias) - nomes)
+
+def hash_arquivo(caminho: Path) -> str:
+    """Calcula o SHA-256 do conteúdo da planilha"""
+    h = hashlib.sha256()
+    with open(caminho, "rb") as f:
+        for bloco in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(bloco)
+    return h.hexdigest()
+
+def ler_para_importacao(caminho: str, motor: str = None, pasta: str = None) -> dict:
+    """Lê as abas usadas pelo importador (PRODUTIVIDADE e CONTROLE DE OS).
+
+    Feita para rodar em outro processo (importação de várias fontes): recebe
+    e devolve apenas objetos serializáveis. A aba PRODUTIVIDADE não volta no
+    retorno: é lida em streaming e cada lote é gravado, em sequência, em um
+    arquivo temporário em ``pasta`` (``lotes``, lido de volta com ``ler_lotes``
+    e apagado por quem chamou). Assim nem este processo nem o que grava no
+    banco têm a aba inteira em memória, por maior que seja e por mais origens
+    que haja. A aba de OS, bem menor, volta inteira; é None se não puder ser
+    lida, como na importação de uma planilha. Cabeçalho inválido gera ValueError.
+    """
+    inicio = time.perf_counter()
+    arquivo_hash = hash_arquivo(Path(caminho))
+    fd, lotes = tempfile.mkstemp(prefix="fleetcare-lotes-", suffix=".pickle", dir=pasta)
+    linhas = 0
+    try:
+        with os.fdopen(fd, "wb") as arquivo, LeitorPlanilha(caminho, motor) as leitor:
+            cabecalho = set(leitor.cabecalho(ABA_PRODUTIVIDADE, CABECALHO_PRODUTIVIDADE))
+            if not COLUNAS_OBRIGATORIAS_PRODUTIVIDADE.issubset(cabecalho):
+                raise ValueError("Cabeçalho inesperado na planilha")
+            for lote in leitor.ler_em_lotes(ABA_PRODUTIVIDADE, CABECALHO_PRODUTIVIDADE, COLUNAS_PRODUTIVIDADE):
+                pickle.dump(lote, arquivo, protocol=pickle.HIGHEST_PROTOCOL)
+                linhas += len(lote)
+            try:
+                df_os = leitor.ler_aba(ABA_OS, CABECALHO_OS, COLUNAS_OS)
+            except Exception as e:
+                logger.error(f"Erro ao ler aba {ABA_OS} de {caminho}: {e}")
+                df_os = None
+    except BaseException:
+        Path(lotes).unlink(missing_ok=True)
+        raise
+    return {
+        "arquivo_hash": arquivo_hash,
+        "lotes": lotes,
+        "linhas": linhas,
+        "os": df_os,
+        "segundos": round(time.perf_counter() - inicio, 3),
+    }
+
+def ler_lotes(caminho: str) -> Iterator[pd.DataFrame]:
+    """Os lotes da aba PRODUTIVIDADE gravados por ``ler_para_importacao``, um por vez"""
+    with open(caminho, "rb") as arquivo:
+        while True:
+            try:
+                yield pickle.load(arquivo)
+            except EOFError:
+                return
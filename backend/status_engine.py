@@ -0,0 +1,83 @@
+import datetime as dt
+import numpy as np
+import pandas as pd
+
+# Regra única de classificação da frota:
+#   SEM       -> intervalo de manutenção não definido
+#   VERMELHO  -> uso desde a última manutenção >= intervalo
+#   AMARELO   -> uso >= max(90% do intervalo, intervalo - 20)
+#   OK        -> demais casos
+STATUS_SEM = "SEM"
+STATUS_VERMELHO = "VERMELHO"
+STATUS_AMARELO = "AMARELO"
+STATUS_OK = "OK"
+
+# Uso diário estimado quando não há taxa calculada para o equipamento
+TAXA_PADRAO_HORAS = 8
+TAXA_PADRAO_KM = 100
+
+# Dias sem lançamento a partir dos quais o equipamento é considerado desatualizado
+DIAS_SEM_ATUALIZACAO = 7
+
+def classify_fleet(frota: pd.DataFrame, hoje: dt.date = None, taxa_uso=None) -> pd.DataFrame:
+    """Classifica toda a frota em uma única passada vetorizada.
+
+    ``frota`` deve ter as colunas tipo, intervalo, ultima_manut, atual e
+    ultima_atualizacao (uma linha por equipamento). ``taxa_uso`` é opcional e,
+    se informado, substitui o uso diário padrão por equipamento no cálculo de
+    dias_restantes; posições NaN continuam com o padrão do tipo.
+
+    dias_restantes é 0 para equipamentos com o intervalo já vencido, qualquer
+    que seja a taxa. Sem vencer, uma taxa medida de 0 (equipamento parado)
+    não tem previsão: dias_restantes fica nulo em vez de usar o padrão do
+    tipo, que inventaria um uso que não está acontecendo.
+
+    Retorna uma cópia de ``frota`` com as colunas intervalo, ultima_manut e atual
+    normalizadas e as colunas uso, percentual, status, taxa_uso, dias_restantes
+    e dias_sem_atualizacao.
+    """
+    hoje = hoje or dt.date.today()
+    resultado = frota.copy()
+
+    intv = pd.to_numeric(resultado["intervalo"], errors="coerce").fillna(0).to_numpy(dtype=float)
+    ultima_manut = pd.to_numeric(resultado["ultima_manut"], errors="coerce").fillna(0).to_numpy(dtype=float)
+    atual = pd.to_numeric(resultado["atual"], errors="coerce").to_numpy(dtype=float)
+    atual = np.where(np.isnan(atual), ultima_manut, atual)
+
+    uso = atual - ultima_manut
+    com_intervalo = intv > 0
+    percentual = np.divide(uso * 100, intv, out=np.zeros_like(uso), where=com_intervalo)
+
+    status = np.select(
+        [~com_intervalo, uso >= intv, uso >= np.maximum(intv * 0.9, intv - 20)],
+        [STATUS_SEM, STATUS_VERMELHO, STATUS_AMARELO],
+        default=STATUS_OK,
+    )
+
+    tipo = resultado["tipo"].astype(str).str.upper().to_numpy()
+    taxa = np.where(tipo == "HORAS", TAXA_PADRAO_HORAS, TAXA_PADRAO_KM).astype(float)
+    if taxa_uso is not None:
+        calculada = pd.to_numeric(pd.Series(taxa_uso, index=resultado.index), errors="coerce").to_numpy(dtype=float)
+        taxa = np.where(np.isnan(calculada), taxa, calculada)
+    restante = np.divide(intv - uso, taxa, out=np.full_like(uso, np.nan), where=com_intervalo & (taxa > 0))
+    dias_restantes = np.where(np.isnan(restante), np.nan, np.maximum(0, np.floor(restante)))
+    dias_restantes = np.where(com_intervalo & (intv - uso <= 0), 0, dias_restantes)
+
+    ultima_data = pd.to_datetime(resultado["ultima_atualizacao"], errors="coerce")
+    dias_sem_atualizacao = (pd.Timestamp(hoje) - ultima_data).dt.days.to_numpy(dtype=float)
+
+    resultado["intervalo"] = intv
+    resultado["ultima_manut"] = ultima_manut
+    resultado["atual"] = atual
+    resultado["uso"] = uso
+    resultado["percentual"] = percentual
+    resultado["status"] = status
+    resultado["taxa_uso"] = taxa
+    resultado["dias_restantes"] = pd.array(dias_restantes, dtype="Int64")
+    resultado["dias_sem_atualizacao"] = pd.array(dias_sem_atualizacao, dtype="Int64")
+    return resultado
+
+def para_registros(frota: pd.DataFrame, colunas) -> list:
+    """Converte as linhas selecionadas em dicionários serializáveis (NaN vira None)"""
+    parte = frota[list(colunas)]
+    return parte.astype(object).where(parte.notna(), None).to_dict("records")
@@ -0,0 +1,79 @@
+import datetime as dt
+
+import pytest
+from fastapi.testclient import TestClient
+
+from pagination import LIMITE_MAXIMO
+
+@pytest.fixture
+def cliente(banco):
+    """Um equipamento de cada situação e cinco OS em datas diferentes"""
+    hoje = dt.date.today().isoformat()
+    antiga = (dt.date.today() - dt.timedelta(days=30)).isoformat()
+    frota = [
+        ("EQ-1", "HORAS", 250.0, 1000.0, 1300.0, hoje, "VERMELHO"),
+        ("EQ-2", "HORAS", 250.0, 1000.0, 1240.0, hoje, "AMARELO"),  # a 10 h do vencimento
+        ("EQ-3", "KM", 10000.0, 5000.0, 6000.0, antiga, "OK"),      # sem atualização há 30 dias
+        ("EQ-4", "HORAS", 0.0, 0.0, 500.0, hoje, "SEM"),            # sem intervalo
+    ]
+    with banco.transacao() as conn:
+        cur = conn.cursor()
+        for tag, tipo, intervalo, ultima_manut, atual, data, status in frota:
+            uso = atual - ultima_manut
+            percentual = uso / intervalo * 100 if intervalo else 0
+            cur.execute("INSERT INTO equipamentos (tag, tipo, intervalo) VALUES (?, ?, ?)", (tag, tipo, intervalo))
+            cur.execute("""
+                INSERT INTO equipment_status
+                    (tag, tipo, intervalo, ultima_manut, atual, ultima_atualizacao, uso, percentual, status)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, (tag, tipo, intervalo, ultima_manut, atual, data, uso, percentual, status))
+        for dia in range(1, 6):
+            cur.execute("""
+                INSERT INTO manutencoes (tag, tipo_manutencao, data_agendada, status)
+                VALUES ('EQ-1', 'PREVENTIVA', ?, 'REALIZADA')
+            """, (f"2024-03-0{dia}",))
+    with TestClient(banco.app) as cliente:
+        yield cliente
+
+def _sem_horario(dados: dict) -> dict:
+    return {chave: valor for chave, valor in dados.items() if chave != "gerado_em"}
+
+def test_snapshot_completo_igual_aos_endpoints_separados(cliente):
+    snapshot = cliente.get("/dashboard/snapshot").json()
+    assert set(_sem_horario(snapshot)) == {"resumo", "alertas_criticos", "proximos_manutencao", "sem_atualizacao",
+                                           "estatisticas", "equipamentos", "manutencoes_recentes"}
+
+    resumo = cliente.get("/dashboard").json()
+    assert {s: snapshot["resumo"][s] for s in ("OK", "AMARELO", "VERMELHO", "SEM")} == \
+        {"OK": 1, "AMARELO": 1, "VERMELHO": 1, "SEM": 1} == {s: resumo[s] for s in ("OK", "AMARELO", "VERMELHO", "SEM")}
+
+    alertas = cliente.get("/dashboard/alerts").json()
+    for campo in ("alertas_criticos", "proximos_manutencao", "sem_atualizacao", "estatisticas"):
+        assert snapshot[campo] == alertas[campo]
+    assert [a["tag"] for a in snapshot["alertas_criticos"]] == ["EQ-1"]
+    assert [a["tag"] for a in snapshot["sem_atualizacao"]] == ["EQ-3"]
+    assert [e["tag"] for e in snapshot["equipamentos"]] == ["EQ-1", "EQ-2", "EQ-3", "EQ-4"]
+    assert len(snapshot["manutencoes_recentes"]) == 5
+
+def test_snapshot_so_com_os_campos_pedidos(cliente):
+    snapshot = cliente.get("/dashboard/snapshot",
+                           params={"campos": "resumo, manutencoes_recentes", "limite_manutencoes": 2}).json()
+    assert set(snapshot) == {"resumo", "manutencoes_recentes", "gerado_em"}
+    assert [m["data_agendada"] for m in snapshot["manutencoes_recentes"]] == ["2024-03-05", "2024-03-04"]
+
+def test_snapshot_so_de_manutencoes_nao_carrega_a_frota(cliente, banco, monkeypatch):
+    def carregar_frota():
+        raise AssertionError("a frota não deveria ser carregada")
+
+    monkeypatch.setattr(banco, "carregar_frota", carregar_frota)
+    resposta = cliente.get("/dashboard/snapshot", params={"campos": "manutencoes_recentes"})
+    assert resposta.status_code == 200
+    assert len(resposta.json()["manutencoes_recentes"]) == 5
+
+@pytest.mark.parametrize("params", [
+    {"campos": "resumo,inexistente"},
+    {"limite_manutencoes": 0},
+    {"limite_manutencoes": LIMITE_MAXIMO + 1},
+])
+def test_snapshot_rejeita_campos_e_limites_invalidos(cliente, params):
+    assert cliente.get("/dashboard/snapshot", params=params).status_code == 400
@@ -0,0 +1,110 @@
+import asyncio
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import data_version
+from data_version import VersaoDados, MiddlewareVersaoDados
+
+class VersaoRedisFalsa:
+    """Geração e instante da última alteração como o CacheRedis guarda, contando as leituras"""
+
+    def __init__(self):
+        self.geracao = 7
+        self.alterado_em = 1_700_000_000.0
+        self.leituras = 0
+        self.no_loop = 0
+
+    def __call__(self):
+        self.leituras += 1
+        try:
+            asyncio.get_running_loop()
+            self.no_loop += 1
+        except RuntimeError:
+            pass
+        return self.geracao, self.alterado_em
+
+def _app(versao: VersaoDados, monkeypatch):
+    monkeypatch.setattr(data_version, "versao_dados", versao)
+    app = FastAPI()
+    app.add_middleware(MiddlewareVersaoDados)
+
+    @app.get("/dados")
+    def dados():
+        return {"ok": True}
+
+    @app.get("/export")
+    def exportar():
+        return {"ok": True}
+
+    return TestClient(app)
+
+def test_versao_compartilhada_fora_do_loop_e_igual_entre_workers(monkeypatch):
+    redis = VersaoRedisFalsa()
+    workers = [VersaoDados(), VersaoDados()]
+    for versao in workers:
+        versao.usar_versao_compartilhada(redis)
+
+    respostas = [_app(versao, monkeypatch).get("/dados") for versao in workers]
+    assert redis.leituras == 2 and redis.no_loop == 0
+    assert respostas[0].headers["etag"] == respostas[1].headers["etag"]
+    assert respostas[0].headers["last-modified"] == respostas[1].headers["last-modified"]
+    assert respostas[0].headers["last-modified"] == "Tue, 14 Nov 2023 22:13:20 GMT"
+
+def test_versao_compartilhada_lida_no_maximo_uma_vez_por_intervalo(monkeypatch):
+    redis = VersaoRedisFalsa()
+    versao = VersaoDados()
+    versao.usar_versao_compartilhada(redis)
+    cliente = _app(versao, monkeypatch)
+
+    etag = cliente.get("/dados").headers["etag"]
+    assert cliente.get("/dados", headers={"If-None-Match": etag}).status_code == 304
+    assert redis.leituras == 1
+
+    # outro worker alterou os dados: vale a partir da próxima leitura
+    redis.geracao += 1
+    monkeypatch.setattr(data_version, "INTERVALO_VERSAO_COMPARTILHADA", 0)
+    assert cliente.get("/dados", headers={"If-None-Match": etag}).status_code == 200
+
+def test_alteracao_local_relida_imediatamente(monkeypatch):
+    redis = VersaoRedisFalsa()
+    versao = VersaoDados()
+    versao.usar_versao_compartilhada(redis)
+    versao.ao_invalidar(lambda: setattr(redis, "geracao", redis.geracao + 1))
+    antes = versao.etag()
+    versao.incrementar()
+    assert versao.etag() != antes
+
+def test_sem_versao_compartilhada_usa_o_processo():
+    versao = VersaoDados()
+    antes = versao.etag()
+    versao.incrementar()
+    assert versao.etag() != antes
+
+def test_exportacao_sem_etag(monkeypatch):
+    versao = VersaoDados()
+    cliente = _app(versao, monkeypatch)
+    resposta = cliente.get("/export", headers={"If-None-Match": versao.etag()})
+    assert resposta.status_code == 200
+    assert "etag" not in resposta.headers
+
+def test_leitura_durante_escrita_nunca_recebe_o_cache_antigo_com_a_etag_nova(banco, monkeypatch):
+    cliente = TestClient(banco.app)
+    assert cliente.get("/dashboard").json()["VERMELHO"] == 0  # resposta em cache
+
+    # leituras em cada ponto da escrita: antes e depois de esvaziar o cache e logo após a versão nova
+    durante = []
+    ler = lambda: durante.append(cliente.get("/dashboard"))
+    versao = banco.versao_dados
+    monkeypatch.setattr(versao, "_invalidadores", [ler, *versao._invalidadores, ler])
+    monkeypatch.setattr(versao, "_ouvintes", [ler, *versao._ouvintes])
+    with banco.transacao() as conn:
+        conn.execute("INSERT INTO equipamentos (tag, tipo) VALUES ('EQ-1', 'HORAS')")
+        conn.execute("INSERT INTO equipment_status (tag, tipo, status) VALUES ('EQ-1', 'HORAS', 'VERMELHO')")
+
+    final = cliente.get("/dashboard")
+    assert final.json()["VERMELHO"] == 1
+    assert len(durante) == 3
+    for resposta in durante:
+        if resposta.headers["etag"] == final.headers["etag"]:
+            assert resposta.json() == final.json()
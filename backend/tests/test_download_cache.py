@@ -0,0 +1,196 @@
+import io
+import ftplib
+from types import SimpleNamespace
+
+import pytest
+from botocore.exceptions import ClientError
+
+import advanced_importer
+import download_cache
+from advanced_importer import AdvancedImporter
+from download_cache import CacheDownloads, ConexoesReutilizaveis
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    cache = CacheDownloads(tmp_path / "downloads")
+    monkeypatch.setattr(advanced_importer, "cache_downloads", cache)
+    return cache
+
+class S3Falso:
+    """get_object com GET condicional: 304 quando o If-None-Match é o ETag atual"""
+
+    def __init__(self, conteudo: bytes):
+        self.pedidos = []
+        self.trocar(conteudo)
+
+    def trocar(self, conteudo: bytes):
+        self.conteudo = conteudo
+        self.etag = f'"{len(self.pedidos)}-{len(conteudo)}"'
+
+    def get_object(self, **parametros):
+        self.pedidos.append(parametros)
+        if parametros.get("IfNoneMatch") == self.etag:
+            raise ClientError({"Error": {"Code": "304", "Message": "Not Modified"},
+                               "ResponseMetadata": {"HTTPStatusCode": 304}}, "GetObject")
+        return {"Body": io.BytesIO(self.conteudo), "ETag": self.etag, "ContentLength": len(self.conteudo)}
+
+class FtpFalso:
+    def __init__(self, arquivos: dict, mdtm: bool = True):
+        self.arquivos = arquivos
+        self.mdtm = mdtm
+        self.transferencias = 0
+        self.fechado = False
+
+    def voidcmd(self, comando):
+        return "200 OK"
+
+    def size(self, caminho):
+        return len(self.arquivos[caminho][0])
+
+    def sendcmd(self, comando):
+        if not self.mdtm:
+            raise ftplib.error_perm("502 Command not implemented")
+        return f"213 {self.arquivos[comando.split(' ', 1)[1]][1]}"
+
+    def retrbinary(self, comando, escrever):
+        self.transferencias += 1
+        escrever(self.arquivos[comando.split(" ", 1)[1]][0])
+
+    def quit(self):
+        self.fechado = True
+
+    def close(self):
+        self.fechado = True
+
+class SftpFalso:
+    def __init__(self, arquivos: dict):
+        self.arquivos = arquivos
+        self.transferencias = 0
+
+    def stat(self, caminho):
+        conteudo, mtime = self.arquivos[caminho]
+        return SimpleNamespace(st_size=len(conteudo), st_mtime=mtime)
+
+    def get(self, caminho, destino):
+        self.transferencias += 1
+        with open(destino, "wb") as f:
+            f.write(self.arquivos[caminho][0])
+
+def _importar(url: str, tipo: str):
+    importador = AdvancedImporter({"importType": tipo, "filePath": url, "username": "u", "password": "s"})
+    caminho = importador.download_file()
+    return caminho.read_bytes(), importador.inalterado
+
+def test_s3_pergunta_pelo_etag_e_reaproveita_a_copia_no_304(cache, monkeypatch):
+    s3 = S3Falso(b"versao 1")
+    monkeypatch.setattr(advanced_importer, "_cliente_s3", lambda usuario, senha: s3)
+    url = "s3://bucket/pasta/frota.xlsx"
+
+    assert _importar(url, "s3") == (b"versao 1", False)
+    assert s3.pedidos[0] == {"Bucket": "bucket", "Key": "pasta/frota.xlsx"}
+
+    assert _importar(url, "s3") == (b"versao 1", True)
+    assert s3.pedidos[1]["IfNoneMatch"] == s3.etag
+
+    s3.trocar(b"versao 2")
+    assert _importar(url, "s3") == (b"versao 2", False)
+    assert cache.consultar(url)["etag"] == s3.etag
+
+def test_ftp_compara_size_e_mdtm_e_reaproveita_a_conexao(cache, monkeypatch):
+    arquivos = {"dados/frota.xlsx": (b"versao 1", "20240301120000")}
+    ftp = FtpFalso(arquivos)
+    aberturas = []
+    monkeypatch.setattr(advanced_importer, "conexoes_ftp",
+                        ConexoesReutilizaveis(advanced_importer._ftp_viva, advanced_importer._fechar_ftp))
+    monkeypatch.setattr(AdvancedImporter, "_abrir_ftp", lambda self, host: aberturas.append(host) or ftp)
+    url = "ftp://servidor/dados/frota.xlsx"
+
+    assert _importar(url, "ftp") == (b"versao 1", False)
+    assert _importar(url, "ftp") == (b"versao 1", True)
+    assert ftp.transferencias == 1
+
+    # mesmo tamanho, outra data de modificação
+    arquivos["dados/frota.xlsx"] = (b"versao 2", "20240302120000")
+    assert _importar(url, "ftp") == (b"versao 2", False)
+    assert ftp.transferencias == 2
+    assert aberturas == ["servidor"]
+
+def test_ftp_sem_mdtm_sempre_baixa(cache, monkeypatch):
+    ftp = FtpFalso({"frota.xlsx": (b"versao 1", None)}, mdtm=False)
+    monkeypatch.setattr(advanced_importer, "conexoes_ftp",
+                        ConexoesReutilizaveis(advanced_importer._ftp_viva, advanced_importer._fechar_ftp))
+    monkeypatch.setattr(AdvancedImporter, "_abrir_ftp", lambda self, host: ftp)
+
+    for _ in range(2):
+        assert _importar("ftp://servidor/frota.xlsx", "ftp") == (b"versao 1", False)
+    assert ftp.transferencias == 2
+
+def test_sftp_compara_o_stat(cache, monkeypatch):
+    arquivos = {"dados/frota.xlsx": (b"versao 1", 1709294400)}
+    sftp = SftpFalso(arquivos)
+    monkeypatch.setattr(advanced_importer, "conexoes_sftp", ConexoesReutilizaveis(lambda c: True, lambda c: None))
+    monkeypatch.setattr(AdvancedImporter, "_abrir_sftp", lambda self, host: sftp)
+    url = "sftp://servidor/dados/frota.xlsx"
+
+    assert _importar(url, "ftp") == (b"versao 1", False)
+    assert _importar(url, "ftp") == (b"versao 1", True)
+
+    arquivos["dados/frota.xlsx"] = (b"versao 1 maior", 1709294400)
+    assert _importar(url, "ftp") == (b"versao 1 maior", False)
+    assert sftp.transferencias == 2
+
+def test_falha_no_download_mantem_a_copia_anterior(tmp_path):
+    cache = CacheDownloads(tmp_path)
+    url = "s3://bucket/frota.xlsx"
+
+    def baixar(destino):
+        destino.write_bytes(b"versao 1")
+        return {"etag": "1"}
+
+    def falhar(destino):
+        destino.write_bytes(b"pela met")
+        raise OSError("conexão perdida")
+
+    cache.gravar(url, baixar)
+    with pytest.raises(OSError):
+        cache.gravar(url, falhar)
+
+    assert cache.caminho(url).read_bytes() == b"versao 1"
+    assert cache.consultar(url)["etag"] == "1"
+    assert sorted(p.suffix for p in tmp_path.iterdir()) == [".json", ".xlsx"]
+
+    # cópia que não bate com os metadados não é usada
+    cache.caminho(url).write_bytes(b"outra")
+    assert cache.consultar(url) is None
+
+def test_conexoes_ociosas_reaproveitadas_so_se_vivas(monkeypatch):
+    fechadas = []
+    vivas = {"a": True, "b": False, "c": True}
+    conexoes = ConexoesReutilizaveis(lambda c: vivas[c], fechadas.append)
+    abrir = iter("abcd").__next__
+
+    with conexoes.conexao("host", abrir) as primeira:
+        pass
+    with conexoes.conexao("host", abrir) as segunda:
+        pass
+    assert primeira == segunda == "a"
+
+    # erro durante o uso: a conexão é descartada
+    with pytest.raises(ValueError):
+        with conexoes.conexao("host", abrir):
+            raise ValueError
+    assert fechadas == ["a"]
+
+    # "b" não responde ao ser reaproveitada: é fechada e outra é aberta
+    with conexoes.conexao("host", abrir):
+        pass
+    with conexoes.conexao("host", abrir) as atual:
+        assert atual == "c"
+    assert fechadas == ["a", "b"]
+
+    # ociosa por tempo demais: fechada sem nem perguntar se está viva
+    monkeypatch.setattr(download_cache, "OCIOSA_MAX_SEGUNDOS", -1)
+    with conexoes.conexao("host", abrir) as atual:
+        assert atual == "d"
+    conexoes.fechar()
+    assert fechadas == ["a", "b", "c", "d"]
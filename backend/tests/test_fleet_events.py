@@ -0,0 +1,128 @@
+import json
+import asyncio
+import threading
+
+from fleet_events import (CanalEventos, MonitorFrota, EVENTO_DADOS_ATUALIZADOS, EVENTO_STATUS_ALTERADO,
+                          EVENTO_NOVOS_CRITICOS)
+
+def _ler(mensagem: str) -> dict:
+    """Campos id/event/data de uma mensagem text/event-stream"""
+    campos = dict(linha.split(": ", 1) for linha in mensagem.strip().splitlines())
+    if "data" in campos:
+        campos["data"] = json.loads(campos["data"])
+    return campos
+
+async def _receber(fluxo, quantidade: int) -> list:
+    mensagens = [await asyncio.wait_for(fluxo.__anext__(), 2) for _ in range(quantidade)]
+    await fluxo.aclose()
+    return mensagens
+
+def _reconectar(canal: CanalEventos, ultimo_id, quantidade: int) -> list:
+    """Mensagens recebidas logo após conectar, sem a linha de retry"""
+    mensagens = asyncio.run(_receber(canal.assinar(ultimo_id), quantidade + 1))
+    assert mensagens[0] == "retry: 5000\n\n"
+    return [_ler(m) for m in mensagens[1:]]
+
+def test_cliente_conectado_recebe_eventos_publicados_por_outra_thread():
+    canal = CanalEventos()
+
+    async def cenario():
+        fluxo = canal.assinar()
+        assert await fluxo.__anext__() == "retry: 5000\n\n"
+        proxima = asyncio.ensure_future(fluxo.__anext__())
+        await asyncio.sleep(0)
+        thread = threading.Thread(target=canal.publicar, args=(EVENTO_NOVOS_CRITICOS, {"tags": ["EQ-1"]}))
+        thread.start()
+        thread.join()
+        mensagem = await asyncio.wait_for(proxima, 2)
+        assert canal.conectados == 1
+        await fluxo.aclose()
+        return mensagem
+
+    evento = _ler(asyncio.run(cenario()))
+    assert evento["event"] == EVENTO_NOVOS_CRITICOS
+    assert evento["data"] == {"tags": ["EQ-1"]}
+    assert canal.conectados == 0
+
+def test_reconexao_com_last_event_id_reenvia_so_o_que_foi_perdido():
+    canal = CanalEventos()
+    for numero in range(1, 5):
+        canal.publicar(EVENTO_DADOS_ATUALIZADOS, {"n": numero})
+    # conexão nova: nada do histórico é reenviado
+    assert _reconectar(canal, None, 0) == []
+
+    instancia = canal._instancia
+    eventos = _reconectar(canal, f"{instancia}-2", 2)
+    assert [e["id"] for e in eventos] == [f"{instancia}-3", f"{instancia}-4"]
+    assert [e["data"]["n"] for e in eventos] == [3, 4]
+
+    # já em dia: nada a reenviar
+    assert asyncio.run(_receber(canal.assinar(f"{instancia}-4"), 1)) == ["retry: 5000\n\n"]
+
+def test_last_event_id_fora_do_historico_pede_ressincronizacao():
+    canal = CanalEventos(max_historico=3)
+    for numero in range(1, 7):
+        canal.publicar(EVENTO_DADOS_ATUALIZADOS, {"n": numero})
+    instancia = canal._instancia
+
+    # o histórico cobre a partir do 4: depois do 3 ainda dá para reenviar
+    assert [e["data"]["n"] for e in _reconectar(canal, f"{instancia}-3", 3)] == [4, 5, 6]
+
+    for ultimo_id in (f"{instancia}-2",      # eventos perdidos já saíram do histórico
+                      f"{instancia}-99",     # id maior que o último publicado
+                      "outraexec-5",         # id de antes de o processo reiniciar
+                      f"{instancia}-abc"):
+        eventos = _reconectar(canal, ultimo_id, 1)
+        assert eventos[0]["event"] == EVENTO_DADOS_ATUALIZADOS
+        assert eventos[0]["data"] == {"ressincronizar": True}
+        assert eventos[0]["id"] == f"{instancia}-6"
+
+def test_cliente_lento_recebe_pedido_de_ressincronizacao():
+    canal = CanalEventos(max_fila=2)
+
+    async def cenario():
+        fluxo = canal.assinar()
+        await fluxo.__anext__()
+        for numero in range(1, 5):
+            canal.publicar(EVENTO_DADOS_ATUALIZADOS, {"n": numero})
+        await asyncio.sleep(0.05)
+        return await _receber(fluxo, 2)
+
+    eventos = [_ler(m) for m in asyncio.run(cenario())]
+    # a fila encheu no terceiro evento: o que estava pendente vira um único pedido de recarga
+    assert eventos[0]["data"] == {"ressincronizar": True}
+    assert eventos[0]["id"] == f"{canal._instancia}-3"
+    assert eventos[1]["data"] == {"n": 4}
+
+def test_monitor_publica_mudancas_de_status_e_novos_criticos(banco):
+    canal = CanalEventos()
+    monitor = MonitorFrota(canal)
+
+    def gravar(situacao):
+        with banco.transacao(versionar=False) as conn:
+            conn.execute("DELETE FROM equipment_status")
+            for tag, status, percentual in situacao:
+                conn.execute("INSERT INTO equipamentos (tag, tipo, intervalo) VALUES (?, 'HORAS', 250) "
+                             "ON CONFLICT(tag) DO NOTHING", (tag,))
+                conn.execute("INSERT INTO equipment_status (tag, status, percentual) VALUES (?, ?, ?)",
+                             (tag, status, percentual))
+
+    gravar([("EQ-1", "OK", 50.0), ("EQ-2", "AMARELO", 92.0), ("EQ-3", "OK", 10.0)])
+    monitor._situacao = monitor._ler_situacao()
+
+    gravar([("EQ-1", "OK", 60.0), ("EQ-2", "VERMELHO", 101.0), ("EQ-4", "SEM", 0.0)])
+    monitor.verificar()
+
+    eventos = _reconectar(canal, f"{canal._instancia}-0", 3)
+    assert [e["event"] for e in eventos] == [EVENTO_STATUS_ALTERADO, EVENTO_NOVOS_CRITICOS, EVENTO_DADOS_ATUALIZADOS]
+    alterado, criticos, _ = eventos
+    assert alterado["data"]["mudancas"] == [
+        {"tag": "EQ-2", "de": "AMARELO", "para": "VERMELHO", "percentual": 101.0},
+        {"tag": "EQ-4", "de": None, "para": "SEM", "percentual": 0.0},
+    ]
+    assert alterado["data"]["removidos"] == ["EQ-3"]
+    assert criticos["data"] == {"tags": ["EQ-2"]}
+
+    # sem mudanças só avisa que os dados foram atualizados
+    monitor.verificar()
+    assert [e["event"] for e in _reconectar(canal, eventos[-1]["id"], 1)] == [EVENTO_DADOS_ATUALIZADOS]
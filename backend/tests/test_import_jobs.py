@@ -0,0 +1,43 @@
+import sqlite3
+import threading
+
+import pytest
+
+from import_jobs import GerenciadorImportacoes, STATUS_CONCLUIDO
+
+def _importacao(job):
+    return {"status": "importado"}
+
+def test_falha_ao_registrar_libera_a_origem(banco, monkeypatch):
+    gerenciador = GerenciadorImportacoes()
+    registrar = gerenciador._registrar
+
+    def bloqueado(job):
+        raise sqlite3.OperationalError("database is locked")
+
+    monkeypatch.setattr(gerenciador, "_registrar", bloqueado)
+    with pytest.raises(sqlite3.OperationalError):
+        gerenciador.submeter("x", _importacao)
+    assert gerenciador.ativos() == []
+
+    monkeypatch.setattr(gerenciador, "_registrar", registrar)
+    job, criado = gerenciador.submeter("x", _importacao)
+    assert criado
+    assert job.aguardar(10)
+    assert job.status == STATUS_CONCLUIDO
+    assert gerenciador.obter(job.id)["status"] == STATUS_CONCLUIDO
+
+def test_mesma_origem_ativa_devolve_o_job_existente(banco):
+    gerenciador = GerenciadorImportacoes()
+    liberar = threading.Event()
+
+    def demorada(job):
+        liberar.wait(10)
+        return {}
+
+    primeiro, criado = gerenciador.submeter("x", demorada)
+    segundo, criado_de_novo = gerenciador.submeter("x", demorada)
+    liberar.set()
+    assert criado and not criado_de_novo
+    assert segundo is primeiro
+    assert primeiro.aguardar(10)
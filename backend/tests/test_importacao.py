@@ -0,0 +1,106 @@
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "benchmarks"))
+from gerar_planilha import gerar_planilha  # noqa: E402
+
+from import_jobs import ImportJob  # noqa: E402
+from multi_import import preparar_fontes  # noqa: E402
+from spreadsheet_reader import (ABA_PRODUTIVIDADE, CABECALHO_PRODUTIVIDADE, COLUNAS_PRODUTIVIDADE,  # noqa: E402
+                                LeitorPlanilha, ler_lotes, ler_para_importacao)
+
+@pytest.fixture(scope="module")
+def planilhas(tmp_path_factory):
+    pasta = tmp_path_factory.mktemp("planilhas")
+    return [gerar_planilha(pasta / f"site{semente}.xlsx", equipamentos=5, dias=10, n_os=20, semente=semente)
+            for semente in (1, 2)]
+
+def _fonte(nome, caminho):
+    return {"name": nome, "importType": "local", "filePath": str(caminho)}
+
+def test_planilha_sem_alteracoes_continua_pulada_depois_de_varias_origens(banco, planilhas):
+    a, b = planilhas
+    assert banco.importar_planilha(caminho=a)["status"] == "importado"
+    assert banco.importar_planilha(caminho=a)["status"] == "sem_alteracoes"
+
+    resultado = banco.importar_fontes(preparar_fontes([_fonte("site2", b)]))
+    assert resultado["status"] == "importado"
+    # o último registro de importações agora é de outra origem
+    assert banco.importar_planilha(caminho=a)["status"] == "sem_alteracoes"
+
+def test_origem_que_volta_a_um_arquivo_anterior_e_importada(banco, planilhas, tmp_path):
+    a, b = planilhas
+    caminho = tmp_path / "site.xlsx"
+
+    def importar():
+        fontes = banco.importar_fontes(preparar_fontes([_fonte("site", caminho)]))["fontes"]
+        return fontes[0]["status"]
+
+    caminho.write_bytes(a.read_bytes())
+    assert importar() == "importado"
+    assert importar() == "sem_alteracoes"
+    caminho.write_bytes(b.read_bytes())
+    assert importar() == "importado"
+    caminho.write_bytes(a.read_bytes())
+    assert importar() == "importado"
+
+def test_mesmo_arquivo_em_origens_diferentes(banco, planilhas):
+    a, _ = planilhas
+    assert banco.importar_planilha(caminho=a)["status"] == "importado"
+    fontes = banco.importar_fontes(preparar_fontes([_fonte("site", a)]))["fontes"]
+    assert fontes[0]["status"] == "importado"
+
+def test_reimportacao_forcada_sem_alteracoes_nao_muda_a_versao(banco, planilhas):
+    a, _ = planilhas
+    banco.importar_planilha(caminho=a)
+    versao = banco.versao_dados.versao
+
+    assert banco.importar_planilha(forcar=True, caminho=a)["status"] == "importado"
+    fontes = banco.importar_fontes(preparar_fontes([_fonte("site", a)]), forcar=True)["fontes"]
+    assert fontes[0]["status"] == "importado"
+    assert banco.versao_dados.versao == versao
+
+    # as reimportações continuam registradas, com zero inseridos/atualizados
+    with banco.transacao(versionar=False) as conn:
+        registros = conn.execute("SELECT inseridos, atualizados FROM importacoes ORDER BY id").fetchall()
+    assert [tuple(r) for r in registros] == [(70, 0), (0, 0), (0, 0)]
+
+def test_os_repetida_na_aba_nao_e_atualizada_a_cada_importacao(banco):
+    df_os = pd.DataFrame({
+        "equipamento": ["eq-1", "eq-1"],
+        "n_os": ["10", "10"],
+        "tipo_de_manutencao": ["PREVENTIVA", "CORRETIVA"],
+        "data": [pd.Timestamp("2024-03-01"), pd.Timestamp("2024-03-02")],
+    })
+    contagens = []
+    for _ in range(2):
+        resultado = banco._novo_resultado("hash")
+        with banco.transacao() as conn:
+            banco._importar_manutencoes(conn.cursor(), df_os, ImportJob("teste"), resultado)
+        contagens.append((resultado["manutencoes"]["inseridos"], resultado["manutencoes"]["atualizados"]))
+    assert contagens == [(1, 0), (0, 0)]
+
+    with banco.transacao(versionar=False) as conn:
+        assert conn.execute("SELECT tipo_manutencao FROM manutencoes").fetchall()[0][0] == "CORRETIVA"
+
+def test_leitura_de_uma_origem_devolve_os_lancamentos_em_arquivo(planilhas, tmp_path):
+    a, _ = planilhas
+    dados = ler_para_importacao(str(a), pasta=str(tmp_path))
+    assert "produtividade" not in dados
+
+    with LeitorPlanilha(a) as leitor:
+        esperado = pd.concat(leitor.ler_em_lotes(ABA_PRODUTIVIDADE, CABECALHO_PRODUTIVIDADE, COLUNAS_PRODUTIVIDADE))
+    lido = pd.concat(ler_lotes(dados["lotes"]))
+    assert dados["linhas"] == len(esperado) == 50
+    pd.testing.assert_frame_equal(lido, esperado)
+
+def test_importacao_de_varias_origens_apaga_os_lotes(banco, planilhas, tmp_path, monkeypatch):
+    # os processos de leitura (spawn) herdam o TMPDIR
+    monkeypatch.setenv("TMPDIR", str(tmp_path))
+    a, b = planilhas
+    resultado = banco.importar_fontes(preparar_fontes([_fonte("site1", a), _fonte("site2", b)]))
+    assert [f["resultado"]["lancamentos"]["inseridos"] for f in resultado["fontes"]] == [50, 48]
+    assert not list(tmp_path.glob("fleetcare-lotes-*"))
@@ -0,0 +1,135 @@
+import sys
+import json
+import logging
+import threading
+
+import pandas as pd
+import pytest
+
+import log_config
+from log_config import (HandlerFila, FormatadorJson, FormatadorTexto, FORMATO_TEXTO, configurar_logging,
+                        encerrar_logging, enfileirar_handlers, registrar_amostra)
+
+class HandlerLista(logging.Handler):
+    """Guarda as mensagens formatadas e a thread que as escreveu"""
+
+    def __init__(self, nivel=logging.NOTSET):
+        super().__init__(nivel)
+        self.escritas = []
+
+    def emit(self, record):
+        self.escritas.append((self.format(record), threading.current_thread()))
+
+class Argumento:
+    """Argumento de mensagem que anota em qual thread foi convertido para texto"""
+
+    def __init__(self):
+        self.threads = []
+
+    def __str__(self):
+        self.threads.append(threading.current_thread())
+        return "argumento"
+
+@pytest.fixture(autouse=True)
+def ouvintes(monkeypatch):
+    """Threads de escrita só do teste, para não encerrar as do app"""
+    monkeypatch.setattr(log_config, "_ouvintes", [])
+    yield log_config._ouvintes
+    encerrar_logging()
+
+@pytest.fixture
+def logger_teste(request):
+    logger = logging.getLogger(f"teste_log_config.{request.node.name}")
+    logger.propagate = False
+    logger.setLevel(logging.DEBUG)
+    yield logger
+    logger.handlers.clear()
+
+def test_handlers_escrevem_na_thread_da_fila_com_nivel_e_formato_originais(logger_teste, ouvintes):
+    handler = HandlerLista(logging.INFO)
+    handler.setFormatter(logging.Formatter("%(levelname)s %(message)s"))
+    logger_teste.addHandler(handler)
+
+    enfileirar_handlers(logger_teste)
+    assert [type(h) for h in logger_teste.handlers] == [HandlerFila]
+    assert len(ouvintes) == 1
+
+    argumento = Argumento()
+    logger_teste.debug("abaixo do nível do handler")
+    logger_teste.info("valor %s", argumento)
+    encerrar_logging()
+
+    assert [texto for texto, _ in handler.escritas] == ["INFO valor argumento"]
+    thread_escrita = handler.escritas[0][1]
+    assert thread_escrita is not threading.current_thread()
+    # a mensagem só é montada na thread de escrita
+    assert set(argumento.threads) == {thread_escrita}
+
+def test_enfileirar_de_novo_nao_cria_outra_fila(logger_teste, ouvintes):
+    logger_teste.addHandler(HandlerLista())
+    enfileirar_handlers(logger_teste)
+    fila = logger_teste.handlers[0]
+
+    enfileirar_handlers(logger_teste)
+    assert logger_teste.handlers == [fila]
+    assert len(ouvintes) == 1
+
+def test_configurar_logging_uma_vez_so(monkeypatch, capsys, ouvintes):
+    raiz = logging.getLogger()
+    monkeypatch.setattr(raiz, "handlers", [])
+    monkeypatch.setattr(raiz, "level", raiz.level)
+    monkeypatch.setattr(log_config, "LOG_FORMATO", "json")
+    monkeypatch.setattr(log_config, "LOG_NIVEL", "WARNING")
+
+    configurar_logging()
+    configurar_logging()
+    assert [type(h) for h in raiz.handlers] == [HandlerFila]
+    assert len(ouvintes) == 1
+    assert raiz.level == logging.WARNING
+
+    logging.getLogger("teste_log_config").warning("disco %s cheio", "C:", extra={"livre_mb": 12})
+    encerrar_logging()
+    registro = json.loads(capsys.readouterr().err)
+    assert registro["nivel"] == "WARNING"
+    assert registro["logger"] == "teste_log_config"
+    assert registro["mensagem"] == "disco C: cheio"
+    assert registro["livre_mb"] == 12
+
+def test_formatadores_incluem_campos_estruturados_e_excecao():
+    try:
+        raise ValueError("planilha inválida")
+    except ValueError:
+        registro = logging.LogRecord("importacao", logging.ERROR, __file__, 1, "Falha na aba %s", ("OS",),
+                                     sys.exc_info())
+    registro.fonte = "ftp"
+    registro.linhas = 10
+
+    assert FormatadorTexto(FORMATO_TEXTO).format(registro).splitlines()[0] == \
+        "ERROR:importacao:Falha na aba OS"
+    assert FormatadorTexto(FORMATO_TEXTO).format(registro).endswith(" | fonte=ftp linhas=10")
+
+    dados = json.loads(FormatadorJson().format(registro))
+    assert {chave: dados[chave] for chave in ("nivel", "logger", "mensagem", "fonte", "linhas")} == {
+        "nivel": "ERROR", "logger": "importacao", "mensagem": "Falha na aba OS", "fonte": "ftp", "linhas": 10}
+    assert "ValueError: planilha inválida" in dados["excecao"]
+
+def test_amostra_continua_entre_lotes(logger_teste, monkeypatch):
+    monkeypatch.setattr(log_config, "LOG_AMOSTRA_LINHAS", 3)
+    capturados = []
+    handler = HandlerLista()
+    handler.emit = lambda record: capturados.append((record.linha, record.tag, record.aba))
+    logger_teste.addHandler(handler)
+
+    for inicio, tags in ((0, ["A", "B", "C", "D"]), (4, ["E", "F", "G", "H", "I"])):
+        registrar_amostra(logger_teste, "Lançamento lido", pd.DataFrame({"tag": tags}), inicio, aba="Lancamentos")
+
+    # 1 a cada 3 linhas da aba: 0, 3, 6
+    assert capturados == [(0, "A", "Lancamentos"), (3, "D", "Lancamentos"), (6, "G", "Lancamentos")]
+
+def test_amostra_nao_percorre_o_lote_sem_debug(logger_teste):
+    class LoteIntocavel:
+        def __len__(self):
+            raise AssertionError("o lote não deveria ser lido")
+
+    logger_teste.setLevel(logging.INFO)
+    registrar_amostra(logger_teste, "Lançamento lido", LoteIntocavel())
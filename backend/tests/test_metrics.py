@@ -0,0 +1,103 @@
+import re
+import asyncio
+
+from fastapi.testclient import TestClient
+
+import metrics
+from metrics import RegistroMetricas, MiddlewareMetricas, medir_sql
+
+def _contagens(cliente) -> dict:
+    """Contagem de requisições por (método, rota, status) no /metrics"""
+    texto = cliente.get("/metrics").text
+    padrao = (r'^fleetcare_http_request_duration_seconds_count'
+              r'\{method="(\w+)",route="([^"]*)",status="(\d+)"\} (\d+)$')
+    return {serie[:3]: int(serie[3]) for serie in re.findall(padrao, texto, re.MULTILINE)}
+
+def _novas(antes: dict, depois: dict) -> dict:
+    return {serie: depois[serie] - antes.get(serie, 0) for serie in depois if depois[serie] != antes.get(serie, 0)}
+
+def test_exportacao_no_formato_texto_do_prometheus():
+    registro = RegistroMetricas()
+    contador = registro.contador("teste_total", "Eventos de teste", ("origem",))
+    histograma = registro.histograma("teste_segundos", "Durações de teste", limites=(0.1, 1.0))
+
+    contador.inc(origem='planilha "A"\n')
+    contador.inc(2, origem='planilha "A"\n')
+    contador.inc(origem="ftp")
+    for valor in (0.05, 0.1, 0.5, 3.0):
+        histograma.observar(valor)
+
+    assert registro.exportar().splitlines() == [
+        "# HELP teste_total Eventos de teste",
+        "# TYPE teste_total counter",
+        'teste_total{origem="ftp"} 1',
+        'teste_total{origem="planilha \\"A\\"\\n"} 3',
+        "# HELP teste_segundos Durações de teste",
+        "# TYPE teste_segundos histogram",
+        'teste_segundos_bucket{le="0.1"} 2',
+        'teste_segundos_bucket{le="1.0"} 3',
+        'teste_segundos_bucket{le="+Inf"} 4',
+        "teste_segundos_sum 3.65",
+        "teste_segundos_count 4",
+    ]
+
+def test_requisicoes_agrupadas_pela_rota_declarada(banco):
+    with TestClient(banco.app) as cliente:
+        antes = _contagens(cliente)
+        for tag in ("EQ-1", "EQ-2", "EQ-3"):
+            cliente.get(f"/equipment/{tag}")
+        cliente.get("/nao-existe")
+        depois = _contagens(cliente)
+
+    # uma série por rota declarada, e não por tag; o /metrics de ``antes`` entra na contagem
+    assert _novas(antes, depois) == {
+        ("GET", "/metrics", "200"): 1,
+        ("GET", "/equipment/{tag}", "404"): 3,
+        ("GET", "sem_rota", "404"): 1,
+    }
+
+def test_resposta_304_do_middleware_usa_a_rota_declarada(banco):
+    with TestClient(banco.app) as cliente:
+        etag = cliente.get("/dashboard").headers["etag"]
+        antes = _contagens(cliente)
+        assert cliente.get("/dashboard", headers={"If-None-Match": etag}).status_code == 304
+        depois = _contagens(cliente)
+
+    assert _novas(antes, depois)[("GET", "/dashboard", "304")] == 1
+
+def test_fluxo_de_eventos_fica_fora_do_histograma():
+    async def aplicacao(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    async def enviar(mensagem):
+        pass
+
+    async def requisitar(caminho):
+        scope = {"type": "http", "method": "GET", "path": caminho, "app": None}
+        await MiddlewareMetricas(aplicacao)(scope, None, enviar)
+
+    antes = metrics.duracao_requisicoes.exportar()
+    asyncio.run(requisitar("/events"))
+    assert metrics.duracao_requisicoes.exportar() == antes
+    asyncio.run(requisitar("/qualquer"))
+    assert any('route="sem_rota",status="200"' in linha for linha in metrics.duracao_requisicoes.exportar())
+
+def test_sql_por_operacao_e_sql_lento(monkeypatch):
+    def lentos():
+        return {linha.split()[0]: float(linha.split()[1])
+                for linha in metrics.comandos_sql_lentos.exportar() if not linha.startswith("#")}
+
+    monkeypatch.setattr(metrics, "SQL_LENTO_MS", 100)
+    antes = lentos()
+    medir_sql("  select 1", 0.01)
+    medir_sql("with x as (select 1) select * from x", 0.2)
+    medir_sql("VACUUM", 0.5)
+    depois = lentos()
+
+    assert depois['fleetcare_db_slow_queries_total{operation="WITH"}'] == \
+        antes.get('fleetcare_db_slow_queries_total{operation="WITH"}', 0) + 1
+    assert depois['fleetcare_db_slow_queries_total{operation="OUTRO"}'] == \
+        antes.get('fleetcare_db_slow_queries_total{operation="OUTRO"}', 0) + 1
+    assert depois.get('fleetcare_db_slow_queries_total{operation="SELECT"}') == \
+        antes.get('fleetcare_db_slow_queries_total{operation="SELECT"}')
@@ -0,0 +1,71 @@
+import pandas as pd
+
+import app
+import migrations
+from conftest import transacao_em
+from import_jobs import ImportJob
+from migrations import MIGRACOES, aplicar_migracoes
+from storage import ArmazenamentoSQLite
+
+def _banco_na_versao_1(tmp_path):
+    armazenamento = ArmazenamentoSQLite(tmp_path / "antigo.db")
+    armazenamento.preparar()
+    with transacao_em(armazenamento) as conn:
+        cur = conn.cursor()
+        migrations.versao_atual(cur)
+        migrations._m001_schema_inicial(cur)
+        cur.execute("INSERT INTO schema_version (versao, descricao) VALUES (1, 'Schema inicial')")
+    return armazenamento
+
+def _os(cur, tag, numero, status="REALIZADA", observacoes=""):
+    cur.execute("""
+        INSERT INTO manutencoes (tag, tipo_manutencao, data_agendada, status, observacoes, numero_os)
+        VALUES (?, 'PREVENTIVA', '2024-03-01', ?, ?, ?)
+    """, (tag, status, observacoes, numero))
+    return cur.lastrowid
+
+def test_migracao_mantem_uma_os_por_chave_com_edicoes_e_checklists(tmp_path):
+    armazenamento = _banco_na_versao_1(tmp_path)
+    with transacao_em(armazenamento) as conn:
+        cur = conn.cursor()
+        # OS 10 importada três vezes; a segunda tem checklist e a terceira um agendamento
+        copias_10 = [_os(cur, "EQ-1", "10") for _ in range(3)]
+        cur.execute("INSERT INTO checklists_manutencao (manutencao_id, item) VALUES (?, 'Óleo')", (copias_10[1],))
+        cur.execute("INSERT INTO agendamentos (manutencao_id, data_hora) VALUES (?, '2024-03-01 08:00')",
+                    (copias_10[2],))
+        # OS 11 editada pelo usuário (PUT /maintenance), sem checklist nem agendamento
+        editada = _os(cur, "EQ-1", "11", status="CANCELADA", observacoes="peça em falta")
+        # OS sem número, repetida
+        sem_numero = [_os(cur, "EQ-2", None) for _ in range(2)]
+
+    with transacao_em(armazenamento) as conn:
+        aplicar_migracoes(conn, armazenamento)
+        cur = conn.cursor()
+        linhas = cur.execute("""
+            SELECT id, chave_importacao, status, observacoes FROM manutencoes ORDER BY id
+        """).fetchall()
+        assert [tuple(l) for l in linhas] == [
+            (copias_10[1], "EQ-1|10", "REALIZADA", ""),
+            (editada, "EQ-1|11", "CANCELADA", "peça em falta"),
+            (sem_numero[0], linhas[2][1], "REALIZADA", ""),
+        ]
+        assert linhas[2][1].startswith("hash:")
+        assert cur.execute("SELECT manutencao_id FROM checklists_manutencao").fetchall() == [(copias_10[1],)]
+        assert cur.execute("SELECT manutencao_id FROM agendamentos").fetchall() == [(copias_10[1],)]
+        assert cur.execute("SELECT COUNT(*) FROM manutencoes WHERE hash_importacao IS NULL").fetchone()[0] == 0
+        assert aplicar_migracoes(conn, armazenamento) == MIGRACOES[-1][0]
+
+    # a importação seguinte encontra as OS pela chave em vez de inserir outras
+    df_os = pd.DataFrame({
+        "equipamento": ["EQ-1", "EQ-1"],
+        "n_os": ["10", "11"],
+        "tipo_de_manutencao": ["PREVENTIVA", "PREVENTIVA"],
+        "data": [pd.Timestamp("2024-03-01")] * 2,
+    })
+    resultado = app._novo_resultado("hash")
+    with transacao_em(armazenamento) as conn:
+        cur = conn.cursor()
+        app._importar_manutencoes(cur, df_os, ImportJob("teste"), resultado)
+        assert resultado["manutencoes"]["inseridos"] == 0
+        assert cur.execute("SELECT COUNT(*) FROM manutencoes").fetchone()[0] == 3
+    armazenamento.fechar()
@@ -0,0 +1,62 @@
+import pytest
+from fastapi.testclient import TestClient
+
+@pytest.fixture
+def cliente(banco):
+    """25 equipamentos e 30 OS, com percentuais e datas repetidos e nulos"""
+    with banco.transacao() as conn:
+        cur = conn.cursor()
+        for i in range(25):
+            tag = f"EQ-{i:02d}"
+            percentual = None if i % 6 == 0 else float(i % 4 * 30)
+            cur.execute("INSERT INTO equipamentos (tag, tipo) VALUES (?, 'HORAS')", (tag,))
+            cur.execute("INSERT INTO equipment_status (tag, tipo, status, percentual) VALUES (?, 'HORAS', ?, ?)",
+                        (tag, "VERMELHO" if i % 3 == 0 else "OK", percentual))
+        for i in range(30):
+            data = None if i % 7 == 0 else f"2024-0{1 + i % 3}-1{i % 5}"
+            cur.execute("""
+                INSERT INTO manutencoes (tag, tipo_manutencao, data_agendada, status)
+                VALUES (?, 'PREVENTIVA', ?, ?)
+            """, (f"EQ-{i % 5:02d}", data, "REALIZADA" if i % 2 else "AGENDADA"))
+    with TestClient(banco.app) as cliente:
+        yield cliente
+
+def _paginas(cliente, caminho, chave, **params):
+    itens, cursor = [], None
+    while True:
+        resposta = cliente.get(caminho, params={**params, "limit": 4, "cursor": cursor})
+        assert resposta.status_code == 200
+        pagina = resposta.json()
+        assert len(pagina[chave]) <= 4
+        itens.extend(pagina[chave])
+        cursor = pagina["proximo_cursor"]
+        if cursor is None:
+            return itens
+
+@pytest.mark.parametrize("ordenar", ["tag", "percentual"])
+@pytest.mark.parametrize("direcao", ["asc", "desc"])
+@pytest.mark.parametrize("filtros", [{}, {"status": "vermelho"}, {"busca": "eq-1"}])
+def test_paginas_de_equipamentos_cobrem_a_lista_completa(cliente, ordenar, direcao, filtros):
+    params = {"ordenar": ordenar, "direcao": direcao, **filtros}
+    completa = cliente.get("/equipment", params=params).json()
+    assert completa
+    assert _paginas(cliente, "/equipment", "equipamentos", **params) == completa
+
+@pytest.mark.parametrize("ordenar", ["data", "id"])
+@pytest.mark.parametrize("direcao", ["asc", "desc"])
+@pytest.mark.parametrize("filtros", [{}, {"tag": "eq-01"}, {"data_inicio": "2024-02-01", "status": "realizada"}])
+def test_paginas_de_manutencoes_cobrem_a_lista_completa(cliente, ordenar, direcao, filtros):
+    params = {"ordenar": ordenar, "direcao": direcao, **filtros}
+    completa = cliente.get("/maintenance", params=params).json()["manutencoes"]
+    assert completa
+    assert _paginas(cliente, "/maintenance", "manutencoes", **params) == completa
+
+def test_cursor_de_outra_ordenacao_ou_direcao_e_rejeitado(cliente):
+    cursor = cliente.get("/equipment", params={"ordenar": "percentual", "direcao": "asc", "limit": 4}) \
+        .json()["proximo_cursor"]
+    assert cliente.get("/equipment", params={"ordenar": "percentual", "direcao": "asc", "cursor": cursor}) \
+        .status_code == 200
+    for params in ({"ordenar": "tag", "direcao": "asc"}, {"ordenar": "percentual", "direcao": "desc"}):
+        resposta = cliente.get("/equipment", params={**params, "cursor": cursor})
+        assert resposta.status_code == 400
+    assert cliente.get("/maintenance", params={"cursor": "nao-e-um-cursor"}).status_code == 400
@@ -0,0 +1,45 @@
+import datetime as dt
+
+import pandas as pd
+from fastapi.testclient import TestClient
+
+from status_engine import classify_fleet, STATUS_VERMELHO, STATUS_OK, TAXA_PADRAO_HORAS
+
+HOJE = dt.date(2024, 6, 10)
+
+def _frota(*equipamentos):
+    return pd.DataFrame([
+        {"tag": tag, "tipo": "HORAS", "intervalo": intervalo, "ultima_manut": 1000.0, "atual": 1000.0 + uso,
+         "ultima_atualizacao": "2024-06-09"}
+        for tag, intervalo, uso in equipamentos
+    ])
+
+def test_vencido_e_parado_tem_zero_dias_restantes():
+    # uso 300 de 250 e horímetro parado nos últimos dias (taxa medida 0)
+    frota = classify_fleet(_frota(("EQ-1", 250, 300)), HOJE, taxa_uso=[0.0])
+    assert frota.loc[0, "status"] == STATUS_VERMELHO
+    assert frota.loc[0, "dias_restantes"] == 0
+
+def test_parado_sem_vencer_fica_sem_previsao():
+    frota = classify_fleet(_frota(("EQ-1", 250, 100)), HOJE, taxa_uso=[0.0])
+    assert frota.loc[0, "status"] == STATUS_OK
+    assert pd.isna(frota.loc[0, "dias_restantes"])
+
+def test_taxa_medida_e_padrao_do_tipo():
+    frota = classify_fleet(_frota(("EQ-1", 250, 100), ("EQ-2", 250, 100)), HOJE, taxa_uso=[10.0, float("nan")])
+    assert frota.loc[0, "dias_restantes"] == 15
+    assert frota.loc[1, "dias_restantes"] == 150 // TAXA_PADRAO_HORAS
+
+def test_vencido_aparece_nas_previsoes_dentro_do_horizonte(banco):
+    from database import transacao
+
+    with transacao() as conn:
+        conn.execute("INSERT INTO equipamentos (tag, tipo, intervalo, ultima_manut) VALUES ('EQ-1', 'HORAS', 250, 1000)")
+        conn.executemany("INSERT INTO lancamentos (tag, data, h_final) VALUES ('EQ-1', ?, 1300)",
+                         [((dt.date.today() - dt.timedelta(days=d)).isoformat(),) for d in range(9)])
+        banco.atualizar_status_equipamentos(conn.cursor())
+
+    resposta = TestClient(banco.app).get("/maintenance/predictions", params={"horizonte_dias": 7})
+    assert resposta.status_code == 200
+    previsoes = resposta.json()["previsoes"]
+    assert [(p["tag"], p["status"], p["dias_restantes"]) for p in previsoes] == [("EQ-1", STATUS_VERMELHO, 0)]
@@ -0,0 +1,128 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import app
+import usage_rollups
+from conftest import transacao_em
+from import_jobs import ImportJob
+from migrations import MIGRACOES, aplicar_migracoes
+from spreadsheet_reader import TAMANHO_LOTE
+from storage import converter_sql, ArmazenamentoPostgres
+
+@pytest.mark.parametrize("sql, esperado", [
+    ("SELECT * FROM t WHERE a = ? AND b = ?", "SELECT * FROM t WHERE a = %s AND b = %s"),
+    ("SELECT '?' , ? FROM t", "SELECT '?' , %s FROM t"),
+    ("SELECT 'it''s ?' FROM t WHERE a LIKE 'x%' AND b = ?", "SELECT 'it''s ?' FROM t WHERE a LIKE 'x%' AND b = %s"),
+    ("SELECT a % 2 FROM t", "SELECT a %% 2 FROM t"),
+    ("UPDATE t SET a = ? WHERE b IS NOT ?", "UPDATE t SET a = %s WHERE b IS DISTINCT FROM %s"),
+])
+def test_converter_sql(sql, esperado):
+    assert converter_sql(sql) == esperado
+
+def test_migracoes_chegam_a_versao_atual_e_sao_idempotentes(armazenamento_teste):
+    with transacao_em(armazenamento_teste) as conn:
+        assert aplicar_migracoes(conn, armazenamento_teste) == MIGRACOES[-1][0]
+        tabelas = ("equipamentos", "lancamentos", "lancamentos_resumo", "equipment_status", "manutencoes",
+                   "importacoes", "importacao_jobs", "fornecedores")
+        for tabela in tabelas:
+            assert conn.execute(f"SELECT COUNT(*) FROM {tabela}").fetchone()[0] == 0
+
+@pytest.mark.parametrize("quantidade", [10, ArmazenamentoPostgres.MINIMO_COPY + 100])
+def test_inserir_novos_ignora_existentes_e_repetidas(armazenamento_teste, quantidade):
+    # abaixo de MINIMO_COPY o PostgreSQL usa INSERT ... ON CONFLICT; acima, COPY
+    linhas = [(f"EQ-{i % 7}", f"2024-01-{1 + i // 7 % 28:02d}", float(i)) for i in range(quantidade)]
+    with transacao_em(armazenamento_teste) as conn:
+        cur = conn.cursor()
+        inseridos = armazenamento_teste.inserir_novos(cur, "lancamentos", ("tag", "data", "h_final"),
+                                                      linhas + linhas[:5])
+        assert inseridos == quantidade
+    with transacao_em(armazenamento_teste) as conn:
+        cur = conn.cursor()
+        assert armazenamento_teste.inserir_novos(cur, "lancamentos", ("tag", "data", "h_final"), linhas) == 0
+        assert cur.execute("SELECT COUNT(*) FROM lancamentos WHERE tag = ?", ("EQ-0",)).fetchone()[0] == \
+            len([l for l in linhas if l[0] == "EQ-0"])
+
+@pytest.mark.parametrize("quantidade", [10, ArmazenamentoPostgres.MINIMO_COPY + 100])
+def test_inserir_novos_grava_texto_vazio_e_nulo_como_recebidos(armazenamento_teste, quantidade):
+    # o mesmo valor deve ser gravado igual no SQLite, no INSERT e no COPY do PostgreSQL
+    textos = ["", None, "com\ttab", "duas\nlinhas\r", "barra \\N", "\\N", "aspas \"'"]
+    linhas = [(f"EQ-{i}", "PREVENTIVA", textos[i % len(textos)], textos[(i + 1) % len(textos)])
+              for i in range(quantidade)]
+    with transacao_em(armazenamento_teste) as conn:
+        cur = conn.cursor()
+        armazenamento_teste.inserir_novos(cur, "manutencoes", ("tag", "tipo_manutencao", "observacoes", "execucao"),
+                                          linhas)
+        gravadas = cur.execute("SELECT tag, tipo_manutencao, observacoes, execucao FROM manutencoes").fetchall()
+    assert sorted(map(tuple, gravadas), key=lambda l: l[0]) == sorted(linhas, key=lambda l: l[0])
+
+def test_substituir_e_inserir_retornando_id(armazenamento_teste):
+    colunas = ("tag", "tipo", "intervalo")
+    with transacao_em(armazenamento_teste) as conn:
+        cur = conn.cursor()
+        armazenamento_teste.substituir(cur, "equipamentos", colunas, "tag", [("EQ-1", "HORAS", 250.0)])
+        armazenamento_teste.substituir(cur, "equipamentos", colunas, "tag",
+                                       [("EQ-1", "HORAS", 500.0), ("EQ-2", "KM", None)])
+        assert cur.execute("SELECT tag, intervalo FROM equipamentos ORDER BY tag").fetchall() == \
+            [("EQ-1", 500.0), ("EQ-2", None)]
+        ids = [armazenamento_teste.inserir_retornando_id(cur, "INSERT INTO fornecedores (nome) VALUES (?)", (nome,))
+               for nome in ("A", "B")]
+        assert ids[1] > ids[0]
+        assert cur.execute("SELECT nome FROM fornecedores WHERE id = ?", (ids[1],)).fetchone() == ("B",)
+
+def _planilha(equipamentos: int = 40, dias: int = 150, n_os: int = 300):
+    """Abas PRODUTIVIDADE e CONTROLE DE OS como saem da leitura"""
+    rng = np.random.default_rng(7)
+    tags = np.array([f"EQ-{i:03d}" for i in range(equipamentos)])
+    dia = np.repeat(np.arange(dias), equipamentos)
+    produtividade = pd.DataFrame({
+        "tag": np.tile(tags, dias),
+        "data": pd.Timestamp("2024-01-01") + pd.to_timedelta(dia, unit="D"),
+        "h_final": 1000.0 + dia * 8 + np.round(rng.uniform(0, 8, len(dia)), 1),
+        "atividade": "HORAS",
+        "tipo": 250.0,
+    })
+    manutencoes = pd.DataFrame({
+        "equipamento": rng.choice(tags, n_os),
+        "n_os": np.arange(1, n_os + 1).astype(float),
+        "data": pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, dias, n_os), unit="D"),
+        "tipo_de_manutencao": rng.choice(["PREVENTIVA", "CORRETIVA"], n_os),
+        "execucao": "TROCA DE ÓLEO",
+        "responsavel_da_manutencao": "OFICINA",
+    })
+    return produtividade, manutencoes
+
+def _importar(armazenamento, produtividade, manutencoes) -> dict:
+    job, resultado = ImportJob("teste"), app._novo_resultado("teste")
+    lotes = (produtividade.iloc[i:i + TAMANHO_LOTE] for i in range(0, len(produtividade), TAMANHO_LOTE))
+    with transacao_em(armazenamento) as conn:
+        cur = conn.cursor()
+        tags = app._importar_lancamentos(cur, lotes, len(produtividade), job, resultado)
+        tags |= app._resumir_lancamentos_novos(cur, 0, job)
+        app.atualizar_status_equipamentos(cur, tags)
+        app._importar_manutencoes(cur, manutencoes, job, resultado)
+    return resultado
+
+def test_importacao_completa(armazenamento_teste, monkeypatch):
+    # os gravadores da importação usam o armazenamento do módulo; aqui, o do teste
+    monkeypatch.setattr(app, "armazenamento", armazenamento_teste)
+    monkeypatch.setattr(usage_rollups, "armazenamento", armazenamento_teste)
+    produtividade, manutencoes = _planilha()
+
+    primeira = _importar(armazenamento_teste, produtividade, manutencoes)
+    assert primeira["lancamentos"] == {"inseridos": len(produtividade), "ignorados": 0}
+    assert primeira["manutencoes"]["inseridos"] == len(manutencoes)
+
+    manutencoes.loc[0, "execucao"] = "REVISÃO GERAL"
+    segunda = _importar(armazenamento_teste, produtividade, manutencoes)
+    assert segunda["lancamentos"] == {"inseridos": 0, "ignorados": len(produtividade)}
+    assert segunda["manutencoes"]["inseridos"] == 0
+    assert segunda["manutencoes"]["atualizados"] == 1
+
+    with transacao_em(armazenamento_teste) as conn:
+        contagem = lambda sql: conn.execute(sql).fetchone()[0]  # noqa: E731
+        assert contagem("SELECT COUNT(*) FROM equipamentos") == 40
+        assert contagem("SELECT COUNT(*) FROM equipment_status") == 40
+        assert contagem("SELECT COUNT(*) FROM lancamentos_resumo WHERE granularidade = 'dia'") == len(produtividade)
+        assert conn.execute("SELECT execucao FROM manutencoes WHERE chave_importacao = ?",
+                            (f"{manutencoes.loc[0, 'equipamento']}|1.0",)).fetchone() == ("REVISÃO GERAL",)
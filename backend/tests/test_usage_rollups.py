@@ -0,0 +1,86 @@
+import datetime as dt
+
+import pytest
+from fastapi.testclient import TestClient
+
+import usage_rollups
+from conftest import transacao_em
+from usage_rollups import atualizar_resumos
+
+def _lancamentos(tags, inicio: dt.date, dias: int, leitura_inicial: float = 1000.0):
+    # 8 h/dia, com a tag no horímetro para distinguir os equipamentos
+    return [(tag, (inicio + dt.timedelta(days=d)).isoformat(), leitura_inicial + i * 100 + d * 8.0)
+            for i, tag in enumerate(tags) for d in range(dias)]
+
+def _resumos(cur):
+    return cur.execute(f"""
+        SELECT {', '.join(usage_rollups.COLUNAS_RESUMO)} FROM lancamentos_resumo
+        ORDER BY tag, granularidade, periodo
+    """).fetchall()
+
+@pytest.fixture
+def armazenamento_resumos(armazenamento_teste, monkeypatch):
+    monkeypatch.setattr(usage_rollups, "armazenamento", armazenamento_teste)
+    # lotes de uma tag para que a leitura anterior passe por vários lotes
+    monkeypatch.setattr(usage_rollups, "LOTE_ANTERIORES", 1)
+    return armazenamento_teste
+
+def test_importacao_posterior_reagrega_so_o_periodo_novo(armazenamento_resumos):
+    tags = ["EQ-1", "EQ-2", "EQ-3"]
+    colunas = ("tag", "data", "h_final")
+    with transacao_em(armazenamento_resumos) as conn:
+        cur = conn.cursor()
+        armazenamento_resumos.inserir_novos(cur, "lancamentos", colunas, _lancamentos(tags, dt.date(2024, 1, 1), 45))
+        atualizar_resumos(cur, {tag: "2024-01-01" for tag in tags})
+
+        # importação seguinte: mais 30 dias a partir de 15/02 (meio do mês e de uma semana)
+        novos = [(tag, data, h + 45 * 8.0) for tag, data, h in _lancamentos(tags, dt.date(2024, 2, 15), 30)]
+        armazenamento_resumos.inserir_novos(cur, "lancamentos", colunas, novos)
+        atualizar_resumos(cur, {tag: "2024-02-15" for tag in tags})
+        incremental = _resumos(cur)
+
+        cur.execute("DELETE FROM lancamentos_resumo")
+        atualizar_resumos(cur, {tag: "2024-01-01" for tag in tags})
+        assert incremental == _resumos(cur)
+
+        meses = cur.execute("""
+            SELECT periodo, leitura_max, uso FROM lancamentos_resumo
+            WHERE tag = 'EQ-1' AND granularidade = 'mes' ORDER BY periodo
+        """).fetchall()
+    # o uso de cada mês é medido a partir da leitura final do mês anterior
+    assert [(periodo, uso) for periodo, _, uso in meses] == [
+        ("2024-01-01", 30 * 8.0), ("2024-02-01", 29 * 8.0), ("2024-03-01", 15 * 8.0)]
+
+@pytest.fixture
+def historico(banco):
+    """Cliente do app (com startup/shutdown, que fecha o pool de leitura assíncrono) e 90 dias de EQ-1"""
+    with banco.transacao() as conn:
+        cur = conn.cursor()
+        cur.execute("INSERT INTO equipamentos (tag, tipo) VALUES ('EQ-1', 'HORAS')")
+        cur.execute("INSERT INTO equipment_status (tag, tipo, status) VALUES ('EQ-1', 'HORAS', 'OK')")
+        cur.executemany("INSERT INTO lancamentos (tag, data, h_final) VALUES (?, ?, ?)",
+                        _lancamentos(["EQ-1"], dt.date(2024, 1, 1), 90))
+        atualizar_resumos(cur, {"EQ-1": "2024-01-01"})
+    with TestClient(banco.app) as cliente:
+        yield cliente
+
+def test_historico_por_periodo_com_from_e_to(historico):
+    resposta = historico.get("/equipment/EQ-1/history", params={"granularity": "monthly"})
+    assert resposta.status_code == 200
+    dados = resposta.json()
+    assert dados["granularidade"] == "mes"
+    assert [p["periodo"] for p in dados["pontos"]] == ["2024-01-01", "2024-02-01", "2024-03-01"]
+    assert dados["uso_total"] == 89 * 8.0
+
+    # o período que contém ``from`` entra inteiro; ``to`` é inclusivo
+    dados = historico.get("/equipment/EQ-1/history",
+                          params={"granularity": "semana", "from": "2024-01-10", "to": "2024-01-22"}).json()
+    assert [p["periodo"] for p in dados["pontos"]] == ["2024-01-08", "2024-01-15", "2024-01-22"]
+    assert dados["pontos"][0]["primeira_data"] == "2024-01-08"
+
+@pytest.mark.parametrize("params", [{"granularity": "ano"}, {"from": "10/01/2024"}])
+def test_historico_rejeita_granularidade_e_data_invalidas(historico, params):
+    assert historico.get("/equipment/EQ-1/history", params=params).status_code == 400
+
+def test_historico_de_equipamento_inexistente(historico):
+    assert historico.get("/equipment/EQ-9/history").status_code == 404
@@ -0,0 +1,132 @@
+import logging
+import threading
+import datetime as dt
+from typing import Dict, Iterable
+
+import numpy as np
+import pandas as pd
+
+from database import transacao
+from data_version import versao_dados
+
+logger = logging.getLogger(__name__)
+
+# Taxa de uso diária de cada equipamento, calculada a partir dos lançamentos
+# dos últimos JANELA_DIAS dias anteriores à sua última leitura (e não à data
+# de hoje, para que equipamentos parados ou sem lançamento recente mantenham
+# a taxa de quando estavam em operação).
+JANELA_DIAS = 30
+# Dias cobertos pelos lançamentos válidos abaixo dos quais a taxa não é confiável
+MINIMO_DIAS_AMOSTRA = 3
+# Uso diário máximo plausível por tipo de medidor; saltos maiores são erros de digitação
+LIMITE_DIARIO = {"HORAS": 24.0}
+
+def calcular_taxas(lancamentos: pd.DataFrame, tipos: Dict[str, str] = None,
+                   janela_dias: int = JANELA_DIAS) -> pd.DataFrame:
+    """Calcula a taxa de uso diária de toda a frota em uma única passada vetorizada.
+
+    ``lancamentos`` deve ter as colunas tag, data e h_final. A taxa é o uso
+    somado entre leituras consecutivas dividido pelos dias entre elas, de modo
+    que intervalos sem lançamento entram com o peso dos dias que cobrem.
+    Diferenças negativas (troca ou zeragem do medidor) e saltos acima de
+    ``LIMITE_DIARIO`` são descartados.
+
+    Retorna um DataFrame indexado por tag com taxa_diaria (NaN se a amostra
+    cobre menos de ``MINIMO_DIAS_AMOSTRA`` dias) e dias_amostra.
+    """
+    if lancamentos.empty:
+        return pd.DataFrame({"taxa_diaria": pd.Series(dtype=float), "dias_amostra": pd.Series(dtype=float)})
+
+    df = lancamentos.assign(
+        data=pd.to_datetime(lancamentos["data"], errors="coerce"),
+        h_final=pd.to_numeric(lancamentos["h_final"], errors="coerce"),
+    ).dropna(subset=["data", "h_final"])
+    df = df.sort_values(["tag", "data", "h_final"], kind="stable").reset_index(drop=True)
+
+    tag = df["tag"]
+    mesma_tag = tag.eq(tag.shift())
+    inicio = df["data"].shift()
+    delta_uso = df["h_final"].diff()
+    delta_dias = (df["data"] - inicio).dt.days
+
+    ultima = df.groupby("tag")["data"].transform("max")
+    na_janela = inicio >= ultima - pd.Timedelta(days=janela_dias)
+
+    tipo = tag.map(tipos or {}).astype(str).str.upper()
+    limite = tipo.map(LIMITE_DIARIO).fillna(np.inf)
+    plausivel = (delta_uso >= 0) & (delta_uso <= limite * delta_dias.clip(lower=1))
+
+    validos = mesma_tag & na_janela & plausivel
+    soma = pd.DataFrame({
+        "uso": delta_uso.where(validos, 0.0),
+        "dias": delta_dias.where(validos, 0.0),
+    }).groupby(tag).sum()
+
+    taxas = pd.DataFrame(index=soma.index)
+    taxas["dias_amostra"] = soma["dias"]
+    taxas["taxa_diaria"] = np.where(soma["dias"] >= MINIMO_DIAS_AMOSTRA,
+                                    soma["uso"] / soma["dias"].where(soma["dias"] > 0), np.nan)
+    return taxas[["taxa_diaria", "dias_amostra"]]
+
+def ler_lancamentos_recentes(cur, ultimas: Dict[str, str], janela_dias: int = JANELA_DIAS) -> pd.DataFrame:
+    """Lançamentos da janela de cada tag, dada a data da sua última leitura.
+
+    As tags são agrupadas pela data de corte; como a importação diária deixa
+    quase toda a frota com a mesma última leitura, bastam poucas consultas,
+    todas atendidas pelo índice (tag, data).
+    """
+    por_corte: Dict[str, list] = {}
+    for tag, ultima in ultimas.items():
+        if not ultima:
+            continue
+        corte = dt.date.fromisoformat(str(ultima)[:10]) - dt.timedelta(days=janela_dias)
+        por_corte.setdefault(corte.isoformat(), []).append(tag)
+
+    linhas = []
+    for corte, tags in por_corte.items():
+        for i in range(0, len(tags), 500):
+            lote = tags[i:i + 500]
+            cur.execute(f"""
+                SELECT tag, data, h_final FROM lancamentos
+                WHERE tag IN ({','.join('?' * len(lote))}) AND data >= ?
+            """, lote + [corte])
+            linhas.extend(cur.fetchall())
+    return pd.DataFrame(linhas, columns=["tag", "data", "h_final"])
+
+class PrevisorUso:
+    """Guarda as taxas de uso da frota enquanto os dados não mudam.
+
+    As taxas são recalculadas na primeira consulta após uma nova versão dos
+    dados (mesma chave das ETags, que também vira a cada dia), de modo que
+    alertas, snapshot e previsões compartilham um único cálculo.
+    """
+
+    def __init__(self, janela_dias: int = JANELA_DIAS):
+        self.janela_dias = janela_dias
+        self._trava = threading.Lock()
+        self._chave = None
+        self._taxas = None
+
+    def taxas(self) -> pd.DataFrame:
+        chave = versao_dados.etag()
+        with self._trava:
+            if self._chave != chave:
+                self._taxas = self._calcular()
+                self._chave = chave
+            return self._taxas
+
+    def taxas_para(self, tags: Iterable[str]) -> pd.Series:
+        """Taxa diária de cada tag informada, na mesma ordem (NaN se não houver)"""
+        return pd.Series(list(tags)).map(self.taxas()["taxa_diaria"]).to_numpy(dtype=float)
+
+    def _calcular(self) -> pd.DataFrame:
+        with transacao(versionar=False) as conn:
+            cur = conn.cursor()
+            cur.execute("SELECT tag, tipo, ultima_atualizacao FROM equipment_status")
+            situacao = cur.fetchall()
+            tipos = {tag: tipo for tag, tipo, _ in situacao}
+            lancamentos = ler_lancamentos_recentes(cur, {tag: ultima for tag, _, ultima in situacao},
+                                                   self.janela_dias)
+        return calcular_taxas(lancamentos, tipos, self.janela_dias)
+
+previsor_uso = PrevisorUso()
@@ -0,0 +1,163 @@
+import datetime as dt
+from typing import Dict
+
+import numpy as np
+import pandas as pd
+
+from database import armazenamento
+
+# Resumos do horímetro/hodômetro por equipamento e período (tabela
+# lancamentos_resumo), mantidos pelo importador para que o histórico de anos
+# seja servido sem reler os lançamentos brutos. O período é identificado pela
+# data inicial: o próprio dia, a segunda-feira da semana ou o dia 1º do mês.
+GRANULARIDADES = ("dia", "semana", "mes")
+
+# Nomes aceitos no parâmetro ``granularity`` da API
+SINONIMOS_GRANULARIDADE = {
+    "day": "dia", "daily": "dia", "diario": "dia",
+    "week": "semana", "weekly": "semana", "semanal": "semana",
+    "month": "mes", "monthly": "mes", "mensal": "mes", "mês": "mes",
+}
+
+# Tags por consulta da leitura anterior: dois parâmetros por tag, abaixo do limite de 999 do SQLite
+LOTE_ANTERIORES = 400
+
+COLUNAS_RESUMO = ["tag", "granularidade", "periodo", "primeira_data", "ultima_data",
+                  "leitura_min", "leitura_max", "lancamentos", "uso"]
+
+def normalizar_granularidade(valor: str) -> str:
+    """Converte o nome recebido na API; ValueError se não for reconhecido"""
+    valor = (valor or "").strip().lower()
+    valor = SINONIMOS_GRANULARIDADE.get(valor, valor)
+    if valor not in GRANULARIDADES:
+        raise ValueError(f"Granularidade inválida: use {', '.join(GRANULARIDADES)}")
+    return valor
+
+def inicio_periodo(data: dt.date, granularidade: str) -> dt.date:
+    if granularidade == "semana":
+        return data - dt.timedelta(days=data.weekday())
+    if granularidade == "mes":
+        return data.replace(day=1)
+    return data
+
+def _como_data(valor) -> dt.date:
+    if isinstance(valor, dt.datetime):
+        return valor.date()
+    if isinstance(valor, dt.date):
+        return valor
+    return dt.date.fromisoformat(str(valor)[:10])
+
+def _inicios(datas: pd.Series, granularidade: str) -> pd.Series:
+    dias = datas.dt.normalize()
+    if granularidade == "semana":
+        return dias - pd.to_timedelta(dias.dt.weekday, unit="D")
+    if granularidade == "mes":
+        return dias.dt.to_period("M").dt.start_time
+    return dias
+
+def _resumir(lancamentos: pd.DataFrame, granularidade: str, inicios: Dict[str, dt.date],
+             anteriores: Dict[str, float]) -> pd.DataFrame:
+    """Agrega os lançamentos por (tag, período) a partir do período inicial de cada tag.
+
+    O uso do período é a leitura máxima menos a do período anterior com
+    lançamentos (ou menos a leitura mínima, no primeiro período da tag).
+    """
+    df = lancamentos.assign(periodo=_inicios(lancamentos["data"], granularidade))
+    resumo = (df.groupby(["tag", "periodo"], sort=True)
+                .agg(primeira_data=("data", "min"), ultima_data=("data", "max"),
+                     leitura_min=("h_final", "min"), leitura_max=("h_final", "max"),
+                     lancamentos=("h_final", "size"))
+                .reset_index())
+    limite = pd.to_datetime(resumo["tag"].map(inicios))
+    resumo = resumo[resumo["periodo"] >= limite].reset_index(drop=True)
+
+    anterior = resumo.groupby("tag")["leitura_max"].shift(1)
+    primeiro = anterior.isna() & ~resumo["tag"].duplicated()
+    anterior = anterior.where(~primeiro, resumo["tag"].map(anteriores))
+    anterior = anterior.fillna(resumo["leitura_min"])
+    resumo["uso"] = resumo["leitura_max"] - anterior
+
+    resumo["granularidade"] = granularidade
+    for coluna in ("periodo", "primeira_data", "ultima_data"):
+        resumo[coluna] = resumo[coluna].dt.strftime("%Y-%m-%d")
+    return resumo[COLUNAS_RESUMO]
+
+def _leituras_anteriores(cur, granularidade: str, inicios: Dict[str, dt.date]) -> Dict[str, float]:
+    """Leitura final do último período de cada tag antes do seu período inicial.
+
+    Uma consulta por lote de tags (e não uma por tag): o início de cada tag vai
+    em uma lista VALUES, aceita tanto pelo SQLite quanto pelo PostgreSQL.
+    """
+    anteriores = {}
+    itens = [(tag, inicio.isoformat()) for tag, inicio in inicios.items()]
+    for i in range(0, len(itens), LOTE_ANTERIORES):
+        lote = itens[i:i + LOTE_ANTERIORES]
+        cur.execute(f"""
+            WITH limites(tag, inicio) AS (VALUES {', '.join(['(?, ?)'] * len(lote))})
+            SELECT r.tag, r.leitura_max
+            FROM lancamentos_resumo r
+            JOIN (SELECT r.tag, MAX(r.periodo) AS periodo
+                  FROM lancamentos_resumo r
+                  JOIN limites l ON l.tag = r.tag
+                  WHERE r.granularidade = ? AND r.periodo < l.inicio
+                  GROUP BY r.tag) ultimo ON ultimo.tag = r.tag AND ultimo.periodo = r.periodo
+            WHERE r.granularidade = ?
+        """, [valor for item in lote for valor in item] + [granularidade, granularidade])
+        anteriores.update(cur.fetchall())
+    return anteriores
+
+def atualizar_resumos(cur, desde: Dict[str, dt.date]) -> int:
+    """Recalcula os resumos das tags informadas a partir do período que contém a data de cada uma.
+
+    ``desde`` é {tag: data (ou texto ISO) do lançamento novo mais antigo}; os períodos
+    anteriores continuam valendo e só a leitura final do último deles é
+    consultada, de modo que a importação diária reagrega apenas o mês corrente.
+    Retorna o número de linhas de resumo gravadas.
+    """
+    desde = {tag: _como_data(data) for tag, data in desde.items() if data is not None}
+    if not desde:
+        return 0
+    inicios = {g: {tag: inicio_periodo(data, g) for tag, data in desde.items()} for g in GRANULARIDADES}
+    inicio_geral = min(min(por_tag.values()) for por_tag in inicios.values())
+
+    tags = list(desde)
+    linhas = []
+    for i in range(0, len(tags), 500):
+        lote = tags[i:i + 500]
+        cur.execute(f"""
+            SELECT tag, data, h_final FROM lancamentos
+            WHERE tag IN ({','.join('?' * len(lote))}) AND data >= ?
+        """, lote + [inicio_geral.isoformat()])
+        linhas.extend(cur.fetchall())
+    lancamentos = pd.DataFrame(linhas, columns=["tag", "data", "h_final"])
+    lancamentos["data"] = pd.to_datetime(lancamentos["data"], errors="coerce")
+    lancamentos["h_final"] = pd.to_numeric(lancamentos["h_final"], errors="coerce")
+    lancamentos = lancamentos.dropna()
+
+    registros = []
+    for granularidade, por_tag in inicios.items():
+        anteriores = _leituras_anteriores(cur, granularidade, por_tag)
+        cur.executemany("""
+            DELETE FROM lancamentos_resumo WHERE tag = ? AND granularidade = ? AND periodo >= ?
+        """, [(tag, granularidade, inicio.isoformat()) for tag, inicio in por_tag.items()])
+        if not lancamentos.empty:
+            resumo = _resumir(lancamentos, granularidade, por_tag, anteriores)
+            registros.extend(resumo.astype(object).where(resumo.notna(), None).values.tolist())
+
+    # os períodos regravados acabaram de ser apagados, então nenhuma linha é ignorada
+    return armazenamento.inserir_novos(cur, "lancamentos_resumo", COLUNAS_RESUMO, registros)
+
+def converter_registros(linhas) -> list:
+    """Linhas de lancamentos_resumo (sem tag/granularidade) no formato da API"""
+    pontos = []
+    for periodo, primeira, ultima, minimo, maximo, quantidade, uso in linhas:
+        pontos.append({
+            "periodo": periodo,
+            "primeira_data": primeira,
+            "ultima_data": ultima,
+            "leitura_min": minimo,
+            "leitura_max": maximo,
+            "lancamentos": quantidade,
+            "uso": round(uso, 2) if uso is not None and not np.isnan(uso) else None,
+        })
+    return pontos
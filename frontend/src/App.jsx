@@ -54,6 +54,7 @@ import PredictiveAnalysis from './components/PredictiveAnalysis'
 import AdvancedReports from './components/AdvancedReports'
 import WidgetSettingsModal from './components/WidgetSettingsModal'
 import { ToastProvider, useToast } from './components/ToastContainer'
+import useMaintenanceList from './hooks/useMaintenanceList'
 
 const API_BASE = 'http://localhost:8000'
 
@@ -69,7 +70,14 @@ function AppContent() {
   const [showMaintenanceModal, setShowMaintenanceModal] = useState(false)
   const [showIntervalModal, setShowIntervalModal] = useState(false)
   const [showMaintenanceDetail, setShowMaintenanceDetail] = useState(false)
-  const [maintenanceData, setMaintenanceData] = useState([])
+  // Manutenções carregadas por página (/maintenance?limit=&cursor=)
+  const {
+    maintenances: maintenanceData,
+    setMaintenances: setMaintenanceData,
+    hasMore: hasMoreMaintenance,
+    loadMore: loadMoreMaintenance,
+    loading: loadingMaintenance
+  } = useMaintenanceList()
   const [supplierData, setSupplierData] = useState([])
   const [theme, setTheme] = useState('light')
   const [showGlobalSearch, setShowGlobalSearch] = useState(false)
@@ -186,22 +194,6 @@ function AppContent() {
     }
   }
 
-  const fetchMaintenanceData = async () => {
-    try {
-      const response = await axios.get(`${API_BASE}/maintenance`)
-      if (response.data && Array.isArray(response.data)) {
-        setMaintenanceData(response.data)
-      }
-    } catch (err) {
-      console.error('Erro ao buscar manutenções:', err)
-      setMaintenanceData([
-        { id: 1, equipamento: 'Equipamento 1', tipo: 'Preventiva', status: 'Pendente', data: '2024-01-15', prioridade: 'Alta' },
-        { id: 2, equipamento: 'Equipamento 2', tipo: 'Corretiva', status: 'Em Andamento', data: '2024-01-10', prioridade: 'Média' },
-        { id: 3, equipamento: 'Equipamento 3', tipo: 'Preventiva', status: 'Concluída', data: '2024-01-05', prioridade: 'Baixa' }
-      ])
-    }
-  }
-
   const fetchSupplierData = async () => {
     try {
       const response = await axios.get(`${API_BASE}/suppliers`)
@@ -223,7 +215,6 @@ function AppContent() {
       await Promise.all([
         fetchDashboardData(),
         fetchEquipmentData(),
-        fetchMaintenanceData(),
         fetchSupplierData()
       ])
       setLoading(false)
@@ -402,6 +393,9 @@ function AppContent() {
         {activeTab === 'maintenance' && (
           <MaintenanceList
             maintenanceData={maintenanceData}
+            hasMore={hasMoreMaintenance}
+            onLoadMore={loadMoreMaintenance}
+            loadingMore={loadingMaintenance}
             onViewDetails={(maintenance) => {
               setSelectedMaintenance(maintenance)
               setShowMaintenanceDetail(true)
@@ -1,5 +1,6 @@
 import React, { useState, useEffect } from 'react'
 import axios from 'axios'
+import { subscribeFleetEvents, isFleetEventsConnected } from '../hooks/useFleetEvents'
 import { 
   AlertTriangle, 
   Clock, 
@@ -50,9 +51,15 @@ const CriticalAlerts = () => {
 
   useEffect(() => {
     fetchAlerts()
-    // Atualizar a cada 5 minutos
-    const interval = setInterval(fetchAlerts, 5 * 60 * 1000)
-    return () => clearInterval(interval)
+    // Recarregar quando os dados mudarem; a cada 5 minutos se o canal de eventos estiver fora
+    const unsubscribe = subscribeFleetEvents(['dados_atualizados'], fetchAlerts)
+    const interval = setInterval(() => {
+      if (!isFleetEventsConnected()) fetchAlerts()
+    }, 5 * 60 * 1000)
+    return () => {
+      clearInterval(interval)
+      unsubscribe()
+    }
   }, [])
 
   const toggleSection = (section) => {
@@ -6,8 +6,6 @@ import { equipmentService } from '../services/equipmentService'
 const EquipmentSelect = ({ 
   value, 
   onChange,
-  tenantId,
-  isActive = true,
   className,
   placeholder = "Selecione um equipamento"
 }) => {
@@ -34,8 +32,6 @@ const EquipmentSelect = ({
 
         const result = await equipmentService.list({
           search: inputValue,
-          tenantId,
-          active: isActive,
           signal: abortController.current.signal
         })
 
@@ -48,7 +44,7 @@ const EquipmentSelect = ({
         setIsLoading(false)
       }
     }, 300),
-    [tenantId, isActive]
+    []
   )
 
   // Limpa controller ao desmontar
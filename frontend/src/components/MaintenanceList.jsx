@@ -24,7 +24,7 @@ import {
 } from 'lucide-react'
 import { useToast } from './ToastContainer'
 
-function MaintenanceList({ maintenanceData, onAddMaintenance, onViewDetail }) {
+function MaintenanceList({ maintenanceData, onAddMaintenance, onViewDetail, hasMore, onLoadMore, loadingMore }) {
   const { showSuccess, showError, showInfo } = useToast()
   const [filteredData, setFilteredData] = useState([])
   const [searchTerm, setSearchTerm] = useState('')
@@ -583,6 +583,16 @@ function MaintenanceList({ maintenanceData, onAddMaintenance, onViewDetail }) {
           </div>
         )}
 
+        {/* Próxima página (os filtros acima valem para as manutenções já carregadas) */}
+        {hasMore && (
+          <div className="load-more-maintenance">
+            <button onClick={onLoadMore} className="btn-primary-maintenance" disabled={loadingMore}>
+              <RefreshCw size={16} />
+              {loadingMore ? 'Carregando...' : 'Carregar mais'}
+            </button>
+          </div>
+        )}
+
         {/* Estado Vazio */}
         {filteredData.length === 0 && (
           <div className="empty-state-maintenance">
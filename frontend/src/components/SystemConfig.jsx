@@ -71,7 +71,7 @@ const SystemConfig = () => {
     
     try {
       const response = await axios.post(`${API_BASE}/api/config/import`, config)
-      setMessage('✅ Importação realizada com sucesso! ' + response.data.detail)
+      setMessage('✅ ' + response.data.detail)
     } catch (err) {
       setMessage('❌ Erro na importação: ' + (err.response?.data?.detail || err.message))
     } finally {
@@ -0,0 +1,21 @@
+import useData from './useData'
+
+// Carrega em uma única requisição os dados da visão geral (/dashboard/snapshot).
+// `campos` limita a resposta ao que o widget exibe, ex.: ['resumo', 'equipamentos']
+export const useDashboardSnapshot = (campos = []) => {
+  const query = campos.length ? `?campos=${campos.join(',')}` : ''
+  const { data, error, loading, refetch } = useData(`/dashboard/snapshot${query}`, {
+    refetchInterval: 30000 // Atualiza a cada 30 segundos
+  })
+
+  return {
+    snapshot: data,
+    resumo: data?.resumo,
+    equipamentos: data?.equipamentos || [],
+    error,
+    loading,
+    refetch
+  }
+}
+
+export default useDashboardSnapshot
@@ -1,5 +1,6 @@
-import { useState, useEffect, useCallback } from 'react'
+import { useState, useEffect, useCallback, useRef } from 'react'
 import axios from 'axios'
+import { subscribeFleetEvents, isFleetEventsConnected } from './useFleetEvents'
 
 const API_BASE = import.meta.env.VITE_API_BASE_URL || 'http://localhost:8000'
 
@@ -7,12 +8,19 @@ const useData = (endpoint, options = {}) => {
   const [data, setData] = useState(null)
   const [error, setError] = useState(null)
   const [loading, setLoading] = useState(true)
+  // ETag da última resposta: o navegador revalida com If-None-Match e, se os
+  // dados não mudaram, a mesma ETag volta e o estado não é atualizado
+  const etagRef = useRef(null)
 
   const fetchData = useCallback(async () => {
     try {
       setLoading(true)
       const response = await axios.get(`${API_BASE}${endpoint}`)
-      setData(response.data)
+      const etag = response.headers.etag
+      if (!etag || etag !== etagRef.current) {
+        etagRef.current = etag || null
+        setData(response.data)
+      }
       setError(null)
     } catch (err) {
       setError(err.message)
@@ -22,16 +30,28 @@ const useData = (endpoint, options = {}) => {
     }
   }, [endpoint])
 
+  useEffect(() => {
+    etagRef.current = null
+  }, [endpoint])
+
   const mutate = useCallback((newData) => {
+    etagRef.current = null
     setData(newData)
   }, [])
 
   useEffect(() => {
     fetchData()
+    if (!options.refetchInterval) return
 
-    if (options.refetchInterval) {
-      const interval = setInterval(fetchData, options.refetchInterval)
-      return () => clearInterval(interval)
+    // Com o canal de eventos (/events) conectado, recarrega só quando os dados
+    // mudam; a consulta periódica fica como reserva enquanto ele estiver fora
+    const unsubscribe = subscribeFleetEvents(['dados_atualizados'], fetchData)
+    const interval = setInterval(() => {
+      if (!isFleetEventsConnected()) fetchData()
+    }, options.refetchInterval)
+    return () => {
+      clearInterval(interval)
+      unsubscribe()
     }
   }, [fetchData, options.refetchInterval])
 
@@ -1,26 +1,24 @@
-import { useState, useEffect, useCallback } from 'react'
+import { useState, useCallback } from 'react'
 import { equipmentService } from '../services/api'
 import { ERROR_MESSAGES, SUCCESS_MESSAGES } from '../config/constants'
+import usePagedList from './usePagedList'
 
-export const useEquipment = () => {
-  const [equipments, setEquipments] = useState([])
-  const [loading, setLoading] = useState(true)
+// filtros (no servidor): tag, busca, status, tipo, ordenar (tag|percentual), direcao
+export const useEquipment = (filters = {}) => {
+  const [loading, setLoading] = useState(false)
   const [error, setError] = useState(null)
   const [selectedEquipment, setSelectedEquipment] = useState(null)
 
-  // Buscar todos os equipamentos
-  const fetchEquipments = useCallback(async () => {
-    try {
-      setLoading(true)
-      const response = await equipmentService.getAll()
-      setEquipments(response.data)
-      setError(null)
-    } catch (err) {
-      setError(err.message || ERROR_MESSAGES.general)
-    } finally {
-      setLoading(false)
-    }
-  }, [])
+  // Equipamentos carregados página a página (loadMore busca a próxima)
+  const {
+    items: equipments,
+    setItems: setEquipments,
+    loading: listLoading,
+    error: listError,
+    hasMore,
+    loadMore,
+    refetch: fetchEquipments
+  } = usePagedList(equipmentService.getPage, 'equipamentos', filters)
 
   // Buscar um equipamento específico
   const fetchEquipmentById = useCallback(async (id) => {
@@ -111,10 +109,10 @@ export const useEquipment = () => {
   }, [])
 
   // Buscar histórico de um equipamento
-  const fetchEquipmentHistory = useCallback(async (id) => {
+  const fetchEquipmentHistory = useCallback(async (id, options) => {
     try {
       setLoading(true)
-      const response = await equipmentService.getHistory(id)
+      const response = await equipmentService.getHistory(id, options)
       setError(null)
       return response.data
     } catch (err) {
@@ -154,17 +152,14 @@ export const useEquipment = () => {
     })
   }, [])
 
-  // Carregar equipamentos ao montar o componente
-  useEffect(() => {
-    fetchEquipments()
-  }, [fetchEquipments])
-
   return {
     equipments,
-    loading,
-    error,
+    loading: loading || listLoading,
+    error: error || listError,
     selectedEquipment,
     fetchEquipments,
+    hasMore,
+    loadMore,
     fetchEquipmentById,
     createEquipment,
     updateEquipment,
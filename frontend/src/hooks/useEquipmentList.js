@@ -1,9 +1,33 @@
-import useData from './useData'
+import { useEffect } from 'react'
+import { equipmentService } from '../services/api'
+import usePagedList from './usePagedList'
+import { subscribeFleetEvents, isFleetEventsConnected } from './useFleetEvents'
 
-export const useEquipmentList = () => {
-  const { data, error, loading, refetch } = useData('/equipment', {
-    refetchInterval: 30000 // Atualiza a cada 30 segundos
-  })
+const REFETCH_INTERVAL = 30000 // consulta periódica enquanto o canal de eventos estiver fora
+
+// Equipamentos paginados no servidor (filtros: tag, busca, status, tipo,
+// ordenar, direcao); loadMore traz a próxima página
+export const useEquipmentList = (serverFilters = {}) => {
+  const {
+    items: data,
+    error,
+    loading,
+    hasMore,
+    loadMore,
+    refetch
+  } = usePagedList(equipmentService.getPage, 'equipamentos', serverFilters)
+
+  // Com o canal de eventos (/events) conectado, recarrega só quando os dados mudam
+  useEffect(() => {
+    const unsubscribe = subscribeFleetEvents(['dados_atualizados'], refetch)
+    const interval = setInterval(() => {
+      if (!isFleetEventsConnected()) refetch()
+    }, REFETCH_INTERVAL)
+    return () => {
+      clearInterval(interval)
+      unsubscribe()
+    }
+  }, [refetch])
 
   const getFilteredEquipments = (filters = {}) => {
     if (!data) return []
@@ -50,9 +74,11 @@ export const useEquipmentList = () => {
   }
 
   return {
-    equipments: data || [],
+    equipments: data,
     error,
     loading,
+    hasMore,
+    loadMore,
     refetch,
     getFilteredEquipments,
     getStatusSummary,
@@ -0,0 +1,81 @@
+import { useEffect, useRef } from 'react'
+
+const API_BASE = import.meta.env.VITE_API_BASE_URL || 'http://localhost:8000'
+
+// Uma única conexão EventSource (/events) compartilhada por todos os hooks da
+// página; é aberta com o primeiro assinante e fechada quando o último sai.
+const handlers = new Map()
+let source = null
+let connected = false
+
+const dispatch = (type, event) => {
+  let data = null
+  try {
+    data = JSON.parse(event.data)
+  } catch (err) {
+    console.error(`Evento ${type} inválido:`, err)
+    return
+  }
+  ;(handlers.get(type) || []).forEach(handler => handler(data))
+}
+
+const listen = (type) => {
+  source.addEventListener(type, event => dispatch(type, event))
+}
+
+const open = () => {
+  if (source || typeof EventSource === 'undefined') return
+  source = new EventSource(`${API_BASE}/events`)
+  source.onopen = () => {
+    const reconnected = connected === null
+    connected = true
+    // eventos perdidos durante a queda chegam pelo Last-Event-ID; se o
+    // servidor reiniciou, ele envia dados_atualizados com ressincronizar
+    if (reconnected) dispatch('dados_atualizados', { data: '{"ressincronizar": true}' })
+  }
+  source.onerror = () => {
+    // o navegador reconecta sozinho; enquanto isso os hooks voltam a consultar periodicamente
+    connected = null
+  }
+  handlers.forEach((_, type) => listen(type))
+}
+
+const close = () => {
+  if (!source) return
+  source.close()
+  source = null
+  connected = false
+}
+
+export const isFleetEventsConnected = () => connected === true
+
+// Registra `handler` para os tipos de evento informados; retorna a função que cancela
+export const subscribeFleetEvents = (types, handler) => {
+  types.forEach(type => {
+    if (!handlers.has(type)) {
+      handlers.set(type, new Set())
+      if (source) listen(type)
+    }
+    handlers.get(type).add(handler)
+  })
+  open()
+
+  return () => {
+    types.forEach(type => handlers.get(type)?.delete(handler))
+    const remaining = [...handlers.values()].some(set => set.size > 0)
+    if (!remaining) close()
+  }
+}
+
+// Tipos: dados_atualizados, status_alterado, novos_criticos, importacao_finalizada
+export const useFleetEvents = (types, handler) => {
+  const handlerRef = useRef(handler)
+  handlerRef.current = handler
+  const key = types.join(',')
+
+  useEffect(() => {
+    return subscribeFleetEvents(key.split(','), (data) => handlerRef.current(data))
+  }, [key])
+}
+
+export default useFleetEvents
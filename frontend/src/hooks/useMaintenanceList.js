@@ -0,0 +1,28 @@
+import { maintenanceService } from '../services/api'
+import usePagedList from './usePagedList'
+
+// Manutenções paginadas; filtros: tag, status, data_inicio, data_fim,
+// fornecedor_id, ordenar (data|id), direcao
+export const useMaintenanceList = (filters = {}) => {
+  const {
+    items,
+    setItems,
+    loading,
+    error,
+    hasMore,
+    loadMore,
+    refetch
+  } = usePagedList(maintenanceService.getPage, 'manutencoes', filters)
+
+  return {
+    maintenances: items,
+    setMaintenances: setItems,
+    loading,
+    error,
+    hasMore,
+    loadMore,
+    refetch
+  }
+}
+
+export default useMaintenanceList
@@ -0,0 +1,54 @@
+import { useState, useEffect, useCallback, useRef } from 'react'
+import { ERROR_MESSAGES } from '../config/constants'
+
+// Lista paginada por cursor (keyset) a partir de um getPage de services/api:
+// carrega a primeira página e as seguintes sob demanda (loadMore). Mudar os
+// filtros ou chamar refetch volta à primeira página; respostas de uma busca
+// anterior que chegam depois são descartadas.
+const usePagedList = (fetchPage, itemsKey, filters = {}) => {
+  const [items, setItems] = useState([])
+  const [cursor, setCursor] = useState(null)
+  const [loading, setLoading] = useState(true)
+  const [error, setError] = useState(null)
+  const requestRef = useRef(0)
+  const filtersKey = JSON.stringify(filters)
+
+  const load = useCallback(async (pageCursor) => {
+    const request = ++requestRef.current
+    try {
+      setLoading(true)
+      const response = await fetchPage({ ...JSON.parse(filtersKey), cursor: pageCursor || undefined })
+      if (request !== requestRef.current) return
+      const page = response.data[itemsKey] || []
+      setItems(prev => (pageCursor ? [...prev, ...page] : page))
+      setCursor(response.data.proximo_cursor)
+      setError(null)
+    } catch (err) {
+      if (request === requestRef.current) setError(err.message || ERROR_MESSAGES.general)
+    } finally {
+      if (request === requestRef.current) setLoading(false)
+    }
+  }, [fetchPage, itemsKey, filtersKey])
+
+  const refetch = useCallback(() => load(null), [load])
+
+  const loadMore = useCallback(() => {
+    if (cursor) return load(cursor)
+  }, [load, cursor])
+
+  useEffect(() => {
+    refetch()
+  }, [refetch])
+
+  return {
+    items,
+    setItems,
+    loading,
+    error,
+    hasMore: Boolean(cursor),
+    loadMore,
+    refetch
+  }
+}
+
+export default usePagedList
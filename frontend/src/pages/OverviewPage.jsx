@@ -2,8 +2,7 @@ import React, { useMemo } from 'react';
 import { Settings, Cog, RefreshCw, Download, Upload, FileSpreadsheet } from 'lucide-react';
 import { useToast } from '../components/ToastContainer';
 import StatusCard from '../components/StatusCard';
-import { useDashboardData } from '../hooks/useDashboardData';
-import { useEquipmentList } from '../hooks/useEquipmentList';
+import { useDashboardSnapshot } from '../hooks/useDashboardSnapshot';
 import WidgetFrame from '../components/WidgetFrame';
 import ExecutiveSummaryWidget from '../components/ExecutiveSummaryWidget';
 import PriorityAlertsWidget from '../components/PriorityAlertsWidget';
@@ -19,8 +18,8 @@ export default function OverviewPage({
   setActiveTab,
   // ... outros handlers e props
 }) {
-  const { data: dashboardData, isLoading: loadingDashboard } = useDashboardData();
-  const { data: equipmentList, isLoading: loadingEquipment } = useEquipmentList();
+  // resumo e lista de equipamentos vêm de uma única leitura da frota
+  const { resumo: dashboardData, equipamentos: equipmentList, loading } = useDashboardSnapshot(['resumo', 'equipamentos']);
   const { showSuccess, showError, showInfo } = useToast();
 
   // Função para exportar dados
@@ -77,7 +76,7 @@ export default function OverviewPage({
   );
 
   // Progressive loading: skeleton global
-  if (loadingDashboard || loadingEquipment) {
+  if (loading && !dashboardData) {
     return <div className="dashboard-skeleton">Carregando dashboard...</div>;
   }
 
@@ -129,7 +128,7 @@ export default function OverviewPage({
             <ExecutiveSummaryWidget dashboardData={dashboardData} equipmentList={equipmentList} />
           )}
           {widget.type === 'priority-alerts' && (
-            <PriorityAlertsWidget equipmentList={equipmentList} loading={loadingEquipment} />
+            <PriorityAlertsWidget equipmentList={equipmentList} loading={loading} />
           )}
           {widget.type === 'status-overview' && (
             <StatusOverviewWidget dashboardData={dashboardData} />
@@ -1,5 +1,5 @@
 import axios from 'axios'
-import { API_BASE, ERROR_MESSAGES } from '../config/constants'
+import { API_BASE, ERROR_MESSAGES, DEFAULT_PAGINATION } from '../config/constants'
 
 const api = axios.create({
   baseURL: API_BASE,
@@ -20,19 +20,30 @@ api.interceptors.response.use(
 )
 
 // Serviços de Equipamentos
+// Paginação por cursor: a resposta traz proximo_cursor (null na última página)
+const getPage = (path) => ({ cursor, limit = DEFAULT_PAGINATION.pageSize, ...filters } = {}) =>
+  api.get(path, { params: { ...filters, cursor, limit } })
+
 export const equipmentService = {
-  getAll: () => api.get('/equipment'),
+  // filtros: tag, busca (prefixo), status, tipo, ordenar (tag|percentual), direcao
+  getAll: (filters = {}) => api.get('/equipment', { params: filters }),
+  getPage: getPage('/equipment'),
   getById: (id) => api.get(`/equipment/${id}`),
   create: (data) => api.post('/equipment', data),
   update: (id, data) => api.put(`/equipment/${id}`, data),
   delete: (id) => api.delete(`/equipment/${id}`),
   updateInterval: (id, interval) => api.put(`/equipment/${id}/interval`, { interval }),
-  getHistory: (id) => api.get(`/equipment/${id}/history`)
+  // granularity: dia | semana | mes; from/to: AAAA-MM-DD
+  getHistory: (id, { granularity, from, to } = {}) => api.get(`/equipment/${id}/history`, {
+    params: { granularity, from, to }
+  })
 }
 
 // Serviços de Manutenção
 export const maintenanceService = {
-  getAll: () => api.get('/maintenance'),
+  // filtros: tag, status, data_inicio, data_fim, fornecedor_id, ordenar (data|id), direcao
+  getAll: (filters = {}) => api.get('/maintenance', { params: filters }),
+  getPage: getPage('/maintenance'),
   getById: (id) => api.get(`/maintenance/${id}`),
   create: (data) => api.post('/maintenance', data),
   update: (id, data) => api.put(`/maintenance/${id}`, data),
@@ -45,6 +56,10 @@ export const maintenanceService = {
 export const dashboardService = {
   getSummary: () => api.get('/dashboard'),
   getAlerts: () => api.get('/dashboard/alerts'),
+  // campos: ['resumo', 'alertas_criticos', 'proximos_manutencao', 'sem_atualizacao', 'estatisticas', 'equipamentos', 'manutencoes_recentes']
+  getSnapshot: (campos = [], limiteManutencoes) => api.get('/dashboard/snapshot', {
+    params: { campos: campos.length ? campos.join(',') : undefined, limite_manutencoes: limiteManutencoes }
+  }),
   getMetrics: (timeRange) => api.get('/dashboard/metrics', { params: { timeRange } }),
   getCharts: (type) => api.get('/dashboard/charts', { params: { type } })
 }
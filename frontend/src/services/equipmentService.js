@@ -5,42 +5,36 @@ export const equipmentService = {
   /**
    * Lista equipamentos com suporte a busca e paginação
    * @param {Object} params Parâmetros de busca
-   * @param {string} params.search Termo de busca
-   * @param {string} params.tenantId ID do tenant
-   * @param {boolean} params.active Filtrar por ativos
-   * @param {number} params.page Número da página
+   * @param {string} params.search Início da tag
+   * @param {string} params.cursor Cursor retornado pela página anterior
    * @param {number} params.pageSize Tamanho da página
    * @param {AbortSignal} params.signal Sinal para cancelar a requisição
    */
   list: async (params = {}) => {
     const {
       search,
-      tenantId,
-      active,
-      page = 1,
+      cursor,
       pageSize = DEFAULT_PAGINATION.pageSize,
       signal
     } = params
 
     const queryParams = new URLSearchParams()
-    if (search) queryParams.append('search', search)
-    if (tenantId) queryParams.append('tenantId', tenantId)
-    if (active !== undefined) queryParams.append('active', active)
-    queryParams.append('page', page)
-    queryParams.append('pageSize', pageSize)
+    if (search) queryParams.append('busca', search)
+    if (cursor) queryParams.append('cursor', cursor)
+    queryParams.append('limit', pageSize)
 
     const response = await api.get(`/equipment?${queryParams.toString()}`, { signal })
     
     // Mapear para o formato esperado pelo react-select
-    const options = (response.data.items || response.data).map(equipment => ({
-      value: equipment.id,
-      label: equipment.nome || equipment.name || equipment.tag
+    const options = response.data.equipamentos.map(equipment => ({
+      value: equipment.tag,
+      label: equipment.tag
     }))
 
     return {
       options,
-      hasMore: response.data.hasMore,
-      total: response.data.total
+      hasMore: Boolean(response.data.proximo_cursor),
+      cursor: response.data.proximo_cursor
     }
   },
 